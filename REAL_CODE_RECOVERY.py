@@ -5,65 +5,56 @@ Uses local Java tools to analyze structure
 """
 import subprocess
 import zipfile
-import struct
 from pathlib import Path
 
+from dex_analyze import analyze, merge
+from dex_index import build_index
+
 def analyze_dex_classes():
-    """Extract class names from DEX files"""
+    """Summarize every DEX file in apk-extracted/"""
     print("🔍 ANALYZING DEX FILES FOR YOUR CLASSES...\n")
-    
-    dex_path = Path("apk-extracted/classes.dex")
-    
-    try:
-        with open(dex_path, 'rb') as f:
-            # Read DEX header
-            magic = f.read(8)
-            if magic[:4] == b'dex\n':
-                print("✓ Valid DEX file detected\n")
-                
-                # Read important offsets
-                f.seek(0x20)  # String IDs section
-                string_offset = struct.unpack('<I', f.read(4))[0]
-                string_count = struct.unpack('<I', f.read(4))[0]
-                
-                type_offset = struct.unpack('<I', f.read(4))[0]
-                type_count = struct.unpack('<I', f.read(4))[0]
-                
-                class_offset = struct.unpack('<I', f.read(4))[0]
-                class_count = struct.unpack('<I', f.read(4))[0]
-                
-                print(f"DEX Statistics:")
-                print(f"  Strings: {string_count}")
-                print(f"  Types: {type_count}")
-                print(f"  Classes: {class_count}")
-                print()
-                
-                return True
-    except Exception as e:
-        print(f"Error: {e}")
+
+    report = merge(analyze(["apk-extracted"]))
+    if not report["dex_files"]:
+        print("❌ No DEX files found in apk-extracted/")
         return False
 
-def list_class_files():
-    """List what's in the compiled classes"""
-    print("📦 YOUR COMPILED CLASSES CONTAIN:")
-    print()
-    print("Main Application Activity:")
-    print("  ✓ MainActivity")
-    print("  ✓ ExaminerAIApplication")
-    print()
-    print("UI Screens (IN SOURCE FILES - need recovery):")
-    print("  ✓ QuizScreen")
-    print("  ✓ ChatScreen")
-    print("  ✓ SettingsScreen")
-    print("  ✓ UploadScreen")
-    print()
-    print("Business Logic:")
-    print("  ✓ LocalStudyEngine")
-    print("  ✓ ProgressScreen")
-    print("  ✓ Multiple compose UI components")
-    print()
-    print("Plus 20+ supporting classes and utilities")
+    totals = report["totals"]
+    print(f"DEX Statistics ({totals['dex_files']} files):")
+    print(f"  Strings: {totals['strings']}")
+    print(f"  Types: {totals['types']}")
+    print(f"  Methods: {totals['methods']}")
+    print(f"  Fields: {totals['fields']}")
+    print(f"  Classes: {totals['classes']}")
     print()
+    for name, error in report["errors"].items():
+        print(f"  ⚠️  {name}: {error}")
+    return not report["errors"]
+
+def list_class_files(prefix="com.examinerai."):
+    """List the app classes found in the DEX files (via the class index)"""
+    dex_files = sorted(Path("apk-extracted").glob("classes*.dex"))
+    if not dex_files:
+        print("❌ No DEX files found in apk-extracted/")
+        return
+    with build_index(dex_files) as index:
+        rows = index.find_classes(prefix)
+        print(f"📦 YOUR COMPILED CLASSES CONTAIN ({len(rows)} under {prefix}):")
+        print()
+
+        packages = {}
+        for name, dex_name, _ in rows:
+            if '$' in name:
+                continue  # inner classes are recovered with their outer class
+            package, _, simple = name.rpartition('.')
+            packages.setdefault(package, []).append((simple, name, dex_name))
+
+        for package, classes in sorted(packages.items()):
+            print(f"{package}:")
+            for simple, name, dex_name in classes:
+                methods, fields = index.class_members(name)
+                print(f"  ✓ {simple}  ({len(methods)} methods, {len(fields)} fields, {dex_name})")
+            print()
 
 def show_recovery_paths():
     """Show different recovery methods"""
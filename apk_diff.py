@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Bytecode-level diff between two APK builds, without decompiling
+Compares per-method code_item hashes of every class in every DEX, plus
+resource and asset sizes from the zip central directories
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dex_diff import Symbols, class_hash
+from dex_index import DEFAULT_INDEX, DexIndex
+from dex_reader import DexFile
+
+MethodDiff = namedtuple('MethodDiff', 'added removed changed')
+EntryDelta = namedtuple('EntryDelta', 'name old_size new_size old_compressed new_compressed')
+
+DEX_PATTERNS = ("classes*.dex", "*/dex/classes*.dex")
+
+
+def _is_dex(name):
+    return any(fnmatch.fnmatchcase(name, p) for p in DEX_PATTERNS)
+
+
+def dex_code_hashes(dex):
+    """{class: {'': class fingerprint, method signature: code hash}} for one DEX"""
+    symbols = Symbols(dex)
+    hashes = {}
+    for class_def in dex.iter_class_defs():
+        methods = {}
+        fingerprint = class_hash(dex, class_def, symbols, methods)
+        methods[""] = fingerprint
+        hashes[dex.type_name(class_def.class_idx)] = methods
+    return hashes
+
+
+def hash_member(job):
+    """Worker: (sha256, hashes, freshly computed?) for one DEX inside an APK"""
+    apk_path, member, index_path = job
+    with DexFile.from_zip(apk_path, member) as dex:
+        sha256 = hashlib.sha256(dex.buffer).hexdigest()
+        if index_path:
+            with DexIndex(index_path) as index:
+                cached = index.load_code_hashes(sha256)
+            if cached is not None:
+                return sha256, cached, False
+        return sha256, dex_code_hashes(dex), True
+
+
+def apk_code_hashes(apk_paths, index_path=DEFAULT_INDEX, workers=None):
+    """Hash every DEX of every APK in parallel; returns one {class: members} map per APK"""
+    jobs = []
+    for apk_path in apk_paths:
+        with zipfile.ZipFile(apk_path) as zf:
+            jobs += [(str(apk_path), name, str(index_path) if index_path else None)
+                     for name in sorted(zf.namelist()) if _is_dex(name)]
+
+    if index_path:
+        DexIndex(index_path).close()  # create the schema before the workers read it
+    results = {str(p): {} for p in apk_paths}
+    fresh = {}
+    workers = workers or min(len(jobs), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (apk_path, _, _), (sha256, hashes, computed) in zip(jobs, executor.map(hash_member, jobs)):
+            results[apk_path].update(hashes)
+            if computed:
+                fresh[sha256] = hashes
+
+    if index_path and fresh:
+        with DexIndex(index_path) as index:
+            for sha256, hashes in fresh.items():
+                index.store_code_hashes(sha256, hashes)
+    return [results[str(p)] for p in apk_paths]
+
+
+def diff_code(old, new):
+    """Compare two {class: {member: hash}} maps
+
+    Returns ((added, removed, changed) class lists, MethodDiff).
+    """
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(c for c in set(old) & set(new) if old[c][""] != new[c][""])
+
+    methods = MethodDiff([], [], [])
+    for class_name in changed:
+        before = {k: v for k, v in old[class_name].items() if k}
+        after = {k: v for k, v in new[class_name].items() if k}
+        methods.added.extend(f"{class_name}.{m}" for m in sorted(set(after) - set(before)))
+        methods.removed.extend(f"{class_name}.{m}" for m in sorted(set(before) - set(after)))
+        methods.changed.extend(f"{class_name}.{m}" for m in sorted(set(before) & set(after))
+                               if before[m] != after[m])
+    return (added, removed, changed), methods
+
+
+def entry_sizes(apk_path):
+    """{name: (uncompressed, compressed)} of every non-DEX entry, from the central directory"""
+    with zipfile.ZipFile(apk_path) as zf:
+        return {info.filename: (info.file_size, info.compress_size)
+                for info in zf.infolist() if not info.is_dir() and not _is_dex(info.filename)}
+
+
+def diff_entries(old, new):
+    """Size deltas of every added, removed or changed entry, largest first"""
+    deltas = []
+    for name in set(old) | set(new):
+        old_size, old_compressed = old.get(name, (0, 0))
+        new_size, new_compressed = new.get(name, (0, 0))
+        if (name in old) != (name in new) or old_size != new_size or old_compressed != new_compressed:
+            deltas.append(EntryDelta(name, old_size, new_size, old_compressed, new_compressed))
+    deltas.sort(key=lambda d: abs(d.new_compressed - d.old_compressed), reverse=True)
+    return deltas
+
+
+def entry_group(name):
+    """'res/drawable/x.png' -> 'res', 'lib/arm64-v8a/libfoo.so' -> 'lib'"""
+    return name.split('/', 1)[0] if '/' in name else '(root)'
+
+
+def diff_apks(old_apk, new_apk, index_path=DEFAULT_INDEX, workers=None):
+    """Full report as a JSON-serializable dict"""
+    old_code, new_code = apk_code_hashes([old_apk, new_apk], index_path, workers)
+    (added, removed, changed), methods = diff_code(old_code, new_code)
+    deltas = diff_entries(entry_sizes(old_apk), entry_sizes(new_apk))
+
+    groups = Counter()
+    for d in deltas:
+        groups[entry_group(d.name)] += d.new_compressed - d.old_compressed
+    return {
+        "old": str(old_apk),
+        "new": str(new_apk),
+        "classes": {"added": added, "removed": removed, "changed": changed},
+        "methods": methods._asdict(),
+        "entries": [d._asdict() for d in deltas],
+        "entry_groups": dict(groups),
+        "size": {"old": Path(old_apk).stat().st_size, "new": Path(new_apk).stat().st_size},
+    }
+
+
+def _kb(value):
+    return f"{value / 1024:+.1f} KB"
+
+
+def print_report(report, top=20):
+    classes, methods = report["classes"], report["methods"]
+    print(f"📊 {Path(report['old']).name} → {Path(report['new']).name} "
+          f"({_kb(report['size']['new'] - report['size']['old'])})\n")
+    print(f"Classes: {len(classes['added'])} added, {len(classes['removed'])} removed, "
+          f"{len(classes['changed'])} changed")
+    print(f"Methods: {len(methods['added'])} added, {len(methods['removed'])} removed, "
+          f"{len(methods['changed'])} changed\n")
+    for label, key in (("+", "added"), ("-", "removed"), ("~", "changed")):
+        for name in classes[key][:top]:
+            print(f"  {label} {name}")
+        if len(classes[key]) > top:
+            print(f"    ... and {len(classes[key]) - top} more")
+    for label, key in (("+", "added"), ("-", "removed"), ("~", "changed")):
+        for name in methods[key][:top]:
+            print(f"  {label} {name}")
+
+    if report["entries"]:
+        print(f"\nResources/assets ({len(report['entries'])} entries changed, compressed size):")
+        for group, delta in sorted(report["entry_groups"].items(), key=lambda g: -abs(g[1])):
+            print(f"  {group:12s} {_kb(delta)}")
+        for entry in report["entries"][:top]:
+            print(f"    {_kb(entry['new_compressed'] - entry['old_compressed']):>12s}  {entry['name']}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the bytecode and resources of two APKs")
+    parser.add_argument("old_apk")
+    parser.add_argument("new_apk")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="DEX index used as the hash cache")
+    parser.add_argument("--no-index", action="store_true", help="Do not read or write cached hashes")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--json", metavar="FILE", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    for apk in (args.old_apk, args.new_apk):
+        if not Path(apk).exists():
+            print(f"❌ APK not found: {apk}")
+            return 1
+
+    report = diff_apks(args.old_apk, args.new_apk, None if args.no_index else args.index, args.workers)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report saved: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
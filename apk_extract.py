@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Streaming APK extraction
+Walks the zip central directory once and writes only the entries the
+recovery pipeline needs, yielding each file as soon as it is on disk
+"""
+import fnmatch
+import os
+import shutil
+import sys
+import zipfile
+from pathlib import Path
+
+DEFAULT_SELECTOR = ("classes*.dex", "AndroidManifest.xml")
+EXTRACT_ALL = ("*",)
+CHUNK_SIZE = 1024 * 1024
+
+
+def make_selector(selector=DEFAULT_SELECTOR):
+    """Turn a glob pattern list (or a callable) into a name predicate"""
+    if callable(selector):
+        return selector
+    if isinstance(selector, str):
+        selector = (selector,)
+    patterns = tuple(selector)
+    return lambda name: any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+
+def _safe_target(target_dir, name):
+    dest = (target_dir / name).resolve()
+    if os.path.commonpath([dest, target_dir]) != str(target_dir):
+        raise ValueError(f"Refusing to extract outside target: {name}")
+    return dest
+
+
+def iter_extract(zip_path, target_dir, selector=DEFAULT_SELECTOR, chunk_size=CHUNK_SIZE):
+    """Extract matching entries, yielding (ZipInfo, Path) as each one lands.
+
+    Entries are inflated straight to a temporary file and renamed into
+    place, so a consumer never sees a partially written DEX.
+    """
+    target_dir = Path(target_dir).resolve()
+    target_dir.mkdir(parents=True, exist_ok=True)
+    wanted = make_selector(selector)
+
+    with zipfile.ZipFile(zip_path, 'r') as z:
+        for info in z.infolist():
+            if info.is_dir() or not wanted(info.filename):
+                continue
+
+            dest = _safe_target(target_dir, info.filename)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            partial = dest.with_name(dest.name + ".part")
+            with z.open(info) as src, open(partial, 'wb') as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+            os.replace(partial, dest)
+            yield info, dest
+
+
+def extract(zip_path, target_dir, selector=DEFAULT_SELECTOR, on_entry=None):
+    """Extract matching entries and return their paths.
+
+    on_entry(path) is called for every file as soon as it is written, so
+    the caller can start work on classes.dex while classes2.dex inflates.
+    """
+    extracted = []
+    for _, path in iter_extract(zip_path, target_dir, selector):
+        extracted.append(path)
+        if on_entry:
+            on_entry(path)
+    return extracted
+
+
+def is_dex(path):
+    name = Path(path).name
+    return name.startswith("classes") and name.endswith(".dex")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: apk_extract.py <apk> [target_dir] [pattern ...]")
+        return 1
+
+    apk = argv[0]
+    target = argv[1] if len(argv) > 1 else "apk-extracted"
+    selector = argv[2:] or DEFAULT_SELECTOR
+
+    print(f"📦 Streaming {apk} -> {target}")
+    for info, path in iter_extract(apk, target, selector):
+        print(f"   - {info.filename} ({info.file_size / (1024*1024):.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Binary AndroidManifest.xml (AXML) and resources.arsc decoder
+Reads package, version, SDK levels, activities and permissions straight
+from the APK's zip members, without extracting the APK or running apktool
+"""
+import json
+import struct
+import sys
+import zipfile
+from collections import namedtuple
+
+ApkManifest = namedtuple('ApkManifest', 'package version_code version_name min_sdk target_sdk label '
+                                        'activities launcher permissions')
+Element = namedtuple('Element', 'tag attrs children')
+
+ANDROID_NS = "http://schemas.android.com/apk/res/android"
+
+# Chunk types (ResourceTypes.h)
+RES_STRING_POOL = 0x0001
+RES_TABLE = 0x0002
+RES_XML = 0x0003
+RES_XML_START_ELEMENT = 0x0102
+RES_XML_END_ELEMENT = 0x0103
+RES_XML_RESOURCE_MAP = 0x0180
+RES_TABLE_PACKAGE = 0x0200
+RES_TABLE_TYPE = 0x0201
+
+# Res_value data types
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_FLOAT = 0x04
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+TYPE_INT_BOOLEAN = 0x12
+
+UTF8_FLAG = 0x100
+NO_ENTRY = 0xFFFFFFFF
+
+# Attribute resource ids, used when the string pool names are obfuscated
+ATTR_IDS = {0x01010003: "name", 0x01010001: "label", 0x0101021b: "versionCode",
+            0x0101021c: "versionName", 0x0101020c: "minSdkVersion", 0x01010270: "targetSdkVersion"}
+
+_CHUNK = struct.Struct('<HHI')
+_ATTR = struct.Struct('<IIIHBBI')
+
+
+class AxmlError(ValueError):
+    """Raised when a binary XML or resource table cannot be decoded"""
+
+
+class StringPool:
+    """ResStringPool decoded lazily by index"""
+
+    def __init__(self, buf, offset):
+        _, header_size, size, count, _, flags, strings_start, _ = struct.unpack_from('<HHIIIIII', buf, offset)
+        self.buf = buf
+        self.count = count
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self._offsets = struct.unpack_from(f'<{count}I', buf, offset + header_size)
+        self._data = offset + strings_start
+        self._cache = {}
+
+    def get(self, idx):
+        if idx == NO_ENTRY or idx >= self.count:
+            return None
+        value = self._cache.get(idx)
+        if value is None:
+            value = self._decode(self._data + self._offsets[idx])
+            self._cache[idx] = value
+        return value
+
+    def _decode(self, pos):
+        buf = self.buf
+        if self.utf8:
+            # UTF-16 length then UTF-8 length, each 1 or 2 bytes
+            pos += 2 if buf[pos] & 0x80 else 1
+            length = buf[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | buf[pos + 1]
+                pos += 1
+            pos += 1
+            return bytes(buf[pos:pos + length]).decode('utf-8', 'replace')
+        (length,) = struct.unpack_from('<H', buf, pos)
+        pos += 2
+        if length & 0x8000:
+            (low,) = struct.unpack_from('<H', buf, pos)
+            length = ((length & 0x7FFF) << 16) | low
+            pos += 2
+        return bytes(buf[pos:pos + 2 * length]).decode('utf-16-le', 'replace')
+
+
+def _chunks(buf, start, end):
+    """Yield (type, offset, header_size, size) of the chunks in buf[start:end]"""
+    pos = start
+    while pos + _CHUNK.size <= end:
+        chunk_type, header_size, size = _CHUNK.unpack_from(buf, pos)
+        if size < _CHUNK.size:
+            raise AxmlError(f"bad chunk size {size} at 0x{pos:x}")
+        yield chunk_type, pos, header_size, size
+        pos += size
+
+
+class ResourceTable:
+    """Minimal resources.arsc reader: resolves resource ids to simple values"""
+
+    def __init__(self, data):
+        self.buf = memoryview(data)
+        chunk_type, header_size, size = _CHUNK.unpack_from(self.buf, 0)
+        if chunk_type != RES_TABLE:
+            raise AxmlError("not a resource table")
+        self.strings = None
+        self._types = {}  # (package id, type id) -> [type chunk offsets]
+        try:
+            for kind, pos, hsize, csize in _chunks(self.buf, header_size, min(size, len(self.buf))):
+                if kind == RES_STRING_POOL and self.strings is None:
+                    self.strings = StringPool(self.buf, pos)
+                elif kind == RES_TABLE_PACKAGE:
+                    self._index_package(pos, hsize, csize)
+        except (struct.error, IndexError) as e:
+            raise AxmlError(f"truncated resource table: {e}") from e
+
+    def _index_package(self, offset, header_size, size):
+        (package_id,) = struct.unpack_from('<I', self.buf, offset + 8)
+        for kind, pos, _, _ in _chunks(self.buf, offset + header_size, offset + size):
+            if kind == RES_TABLE_TYPE:
+                type_id = self.buf[pos + 8]
+                self._types.setdefault((package_id, type_id), []).append(pos)
+
+    def _entry(self, chunk, index):
+        """Offset of entry index in one ResTable_type chunk (None when absent)"""
+        buf = self.buf
+        _, header_size, _ = _CHUNK.unpack_from(buf, chunk)
+        flags = buf[chunk + 9]
+        entry_count, entries_start = struct.unpack_from('<II', buf, chunk + 12)
+        table = chunk + header_size
+        if flags & 0x01:  # FLAG_SPARSE: sorted (index, offset / 4) pairs
+            for i in range(entry_count):
+                idx, off = struct.unpack_from('<HH', buf, table + 4 * i)
+                if idx == index:
+                    return chunk + entries_start + off * 4
+            return None
+        if index >= entry_count:
+            return None
+        if flags & 0x02:  # FLAG_OFFSET16
+            (off,) = struct.unpack_from('<H', buf, table + 2 * index)
+            return None if off == 0xFFFF else chunk + entries_start + off * 4
+        (off,) = struct.unpack_from('<I', buf, table + 4 * index)
+        return None if off == NO_ENTRY else chunk + entries_start + off
+
+    def resolve(self, res_id, depth=0):
+        """Value of a resource id in the first configuration that defines it"""
+        key = (res_id >> 24, (res_id >> 16) & 0xFF)
+        for chunk in self._types.get(key, ()):
+            pos = self._entry(chunk, res_id & 0xFFFF)
+            if pos is None:
+                continue
+            size, flags = struct.unpack_from('<HH', self.buf, pos)
+            if flags & 0x0008:  # FLAG_COMPACT: type in the flags, data inline
+                data_type, (data,) = flags >> 8, struct.unpack_from('<I', self.buf, pos + 4)
+            elif flags & 0x0001:  # FLAG_COMPLEX: styles, arrays, ...
+                return None
+            else:
+                _, _, data_type, data = struct.unpack_from('<HBBI', self.buf, pos + size)
+            if data_type == TYPE_REFERENCE and depth < 8:
+                return self.resolve(data, depth + 1)
+            return _typed_value(data_type, data, self.strings)
+        return None
+
+
+def _typed_value(data_type, data, strings):
+    if data_type == TYPE_STRING:
+        return strings.get(data) if strings else None
+    if data_type == TYPE_INT_BOOLEAN:
+        return data != 0
+    if data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return data - (1 << 32) if data & 0x80000000 else data
+    if data_type == TYPE_FLOAT:
+        return struct.unpack('<f', struct.pack('<I', data))[0]
+    if data_type == TYPE_REFERENCE:
+        return f"@0x{data:08x}"
+    return data
+
+
+def parse_axml(data, resources=None):
+    """Decode a binary XML document into an Element tree
+
+    Attributes are keyed by local name (android: prefix dropped); resource
+    references are resolved through resources when it is given. Truncated
+    or corrupt input raises AxmlError.
+    """
+    try:
+        return _parse_axml(data, resources)
+    except (struct.error, IndexError) as e:
+        raise AxmlError(f"truncated binary XML: {e}") from e
+
+
+def _parse_axml(data, resources):
+    buf = memoryview(data)
+    chunk_type, header_size, size = _CHUNK.unpack_from(buf, 0)
+    if chunk_type != RES_XML:
+        raise AxmlError("not a binary XML document")
+
+    strings = None
+    resource_ids = ()
+    root = Element("", {}, [])
+    stack = [root]
+    for kind, pos, hsize, csize in _chunks(buf, header_size, min(size, len(buf))):
+        if kind == RES_STRING_POOL:
+            strings = StringPool(buf, pos)
+        elif kind == RES_XML_RESOURCE_MAP:
+            resource_ids = struct.unpack_from(f'<{(csize - hsize) // 4}I', buf, pos + hsize)
+        elif kind == RES_XML_START_ELEMENT:
+            ext = pos + hsize
+            _, name_idx, attr_start, attr_size, attr_count = struct.unpack_from('<IIHHH', buf, ext)
+            attrs = {}
+            for i in range(attr_count):
+                _, attr_name, raw, _, _, data_type, value = _ATTR.unpack_from(buf, ext + attr_start + i * attr_size)
+                name = strings.get(attr_name) if strings else None
+                if attr_name < len(resource_ids) and resource_ids[attr_name] in ATTR_IDS:
+                    name = ATTR_IDS[resource_ids[attr_name]]
+                if raw != NO_ENTRY:
+                    attrs[name] = strings.get(raw)
+                elif data_type == TYPE_REFERENCE and resources:
+                    resolved = resources.resolve(value)
+                    attrs[name] = resolved if resolved is not None else f"@0x{value:08x}"
+                else:
+                    attrs[name] = _typed_value(data_type, value, strings)
+            element = Element(strings.get(name_idx), attrs, [])
+            stack[-1].children.append(element)
+            stack.append(element)
+        elif kind == RES_XML_END_ELEMENT and len(stack) > 1:
+            stack.pop()
+    if not root.children:
+        raise AxmlError("empty document")
+    return root.children[0]
+
+
+def _iter(element, tag):
+    for child in element.children:
+        if child.tag == tag:
+            yield child
+        yield from _iter(child, tag)
+
+
+def _qualify(name, package):
+    if name and name.startswith("."):
+        return package + name
+    if name and "." not in name:
+        return f"{package}.{name}"
+    return name
+
+
+def manifest_info(manifest):
+    """Extract the interesting fields of a decoded manifest Element"""
+    package = manifest.attrs.get("package")
+    sdk = next(_iter(manifest, "uses-sdk"), Element("", {}, []))
+    application = next(_iter(manifest, "application"), Element("", {}, []))
+
+    activities = []
+    launcher = None
+    for tag in ("activity", "activity-alias"):
+        for activity in _iter(application, tag):
+            name = _qualify(activity.attrs.get("name"), package)
+            activities.append(name)
+            for intent_filter in _iter(activity, "intent-filter"):
+                actions = {a.attrs.get("name") for a in _iter(intent_filter, "action")}
+                categories = {c.attrs.get("name") for c in _iter(intent_filter, "category")}
+                if "android.intent.action.MAIN" in actions and "android.intent.category.LAUNCHER" in categories:
+                    launcher = launcher or name
+
+    permissions = sorted({p.attrs.get("name") for tag in ("uses-permission", "uses-permission-sdk-23")
+                          for p in _iter(manifest, tag) if p.attrs.get("name")})
+    return ApkManifest(package, manifest.attrs.get("versionCode"), manifest.attrs.get("versionName"),
+                       sdk.attrs.get("minSdkVersion"), sdk.attrs.get("targetSdkVersion"),
+                       application.attrs.get("label"), activities, launcher, permissions)
+
+
+def read_manifest(apk_path, manifest_name="AndroidManifest.xml"):
+    """Decode the binary XML manifest of an APK"""
+    with zipfile.ZipFile(apk_path) as zf:
+        names = set(zf.namelist())
+        if manifest_name not in names and "base/manifest/AndroidManifest.xml" in names:
+            # App bundles store the manifest as protobuf, not binary XML
+            raise AxmlError(f"{apk_path} is an app bundle; build an APK from it to read the manifest")
+        manifest = zf.read(manifest_name)
+        resources = None
+        if "resources.arsc" in names:
+            try:
+                resources = ResourceTable(zf.read("resources.arsc"))
+            except (AxmlError, struct.error):
+                resources = None
+    return manifest_info(parse_axml(manifest, resources))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the manifest metadata of APKs")
+    parser.add_argument("apks", nargs="+")
+    parser.add_argument("--json", action="store_true", help="One JSON object per APK")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for apk in args.apks:
+        try:
+            info = read_manifest(apk)
+        except (OSError, KeyError, zipfile.BadZipFile, AxmlError, struct.error) as e:
+            print(f"❌ {apk}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        if args.json:
+            print(json.dumps({"apk": apk, **info._asdict()}))
+            continue
+        print(f"📦 {apk}")
+        print(f"   Package: {info.package}")
+        print(f"   Version: {info.version_name} ({info.version_code})")
+        print(f"   SDK: min {info.min_sdk}, target {info.target_sdk}")
+        print(f"   Label: {info.label}")
+        print(f"   Launcher: {info.launcher}")
+        print(f"   Activities ({len(info.activities)}):")
+        for activity in info.activities:
+            print(f"     - {activity}")
+        print(f"   Permissions ({len(info.permissions)}):")
+        for permission in info.permissions:
+            print(f"     - {permission}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Size attribution for APK and AAB archives
+Breaks the compressed and uncompressed bytes of every archive down by
+DEX file, by package inside the DEX files (code_item bytes), and by
+resources, native libraries and assets, and diffs two such breakdowns
+"""
+import fnmatch
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dex_analyze import DEX_PATTERNS, package_of
+from dex_reader import DexFile
+
+KINDS = ("dex", "res", "lib", "assets", "other")
+KIND_DIRS = {"res": "res", "lib": "lib", "assets": "assets"}
+RESOURCE_TABLES = ("resources.arsc", "resources.pb")
+
+
+def entry_kind(name):
+    """'classes2.dex' -> 'dex', 'base/lib/arm64-v8a/libx.so' -> 'lib', 'resources.arsc' -> 'res'"""
+    if any(fnmatch.fnmatchcase(name, p) for p in DEX_PATTERNS):
+        return "dex"
+    parts = name.split('/')
+    if parts[-1] in RESOURCE_TABLES:
+        return "res"
+    # AAB modules nest the APK layout one level down: base/res/..., feature/lib/...
+    for part in parts[:min(2, len(parts) - 1)]:
+        if part in KIND_DIRS:
+            return KIND_DIRS[part]
+    return "other"
+
+
+def dex_package_sizes(job):
+    """Worker: ({package: [classes, code bytes]}, error) for one DEX inside an archive"""
+    archive, member = job
+    packages = {}
+    try:
+        with DexFile.from_zip(archive, member) as dex:
+            seen = set()  # R8 can share one code_item between identical methods
+            for class_def in dex.iter_class_defs():
+                code_bytes = 0
+                data = dex.class_data(class_def)
+                if data:
+                    for method in data.direct_methods + data.virtual_methods:
+                        if method.code_off and method.code_off not in seen:
+                            seen.add(method.code_off)
+                            code_bytes += dex.code_item_size(method.code_off)
+                entry = packages.setdefault(package_of(dex.type_name(class_def.class_idx)), [0, 0])
+                entry[0] += 1
+                entry[1] += code_bytes
+    except Exception as e:
+        return packages, str(e) or type(e).__name__
+    return packages, None
+
+
+def size_breakdowns(archives, workers=None):
+    """One JSON-serializable size breakdown per archive; DEX files are parsed in parallel"""
+    reports = {}
+    jobs = []
+    for archive in map(str, archives):
+        groups = {kind: {"entries": 0, "uncompressed": 0, "compressed": 0} for kind in KINDS}
+        dex_files = {}
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                kind = entry_kind(info.filename)
+                group = groups[kind]
+                group["entries"] += 1
+                group["uncompressed"] += info.file_size
+                group["compressed"] += info.compress_size
+                if kind == "dex":
+                    dex_files[info.filename] = {"uncompressed": info.file_size, "compressed": info.compress_size}
+                    jobs.append((archive, info.filename))
+        reports[archive] = {
+            "size": os.path.getsize(archive),
+            "uncompressed": sum(g["uncompressed"] for g in groups.values()),
+            "compressed": sum(g["compressed"] for g in groups.values()),
+            "groups": groups,
+            "dex": dex_files,
+            "packages": {},
+            "errors": {},
+        }
+
+    if jobs:
+        workers = workers or min(len(jobs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for (archive, member), (packages, error) in zip(jobs, executor.map(dex_package_sizes, jobs)):
+                report = reports[archive]
+                if error:
+                    report["errors"][member] = error
+                for package, (classes, code_bytes) in packages.items():
+                    entry = report["packages"].setdefault(package, {"classes": 0, "code_bytes": 0})
+                    entry["classes"] += classes
+                    entry["code_bytes"] += code_bytes
+
+    for report in reports.values():
+        report["packages"] = dict(sorted(report["packages"].items(), key=lambda p: -p[1]["code_bytes"]))
+    return [reports[str(a)] for a in archives]
+
+
+def _deltas(before, after, fields):
+    """{key: {field: after - before}} for every key with a nonzero change, largest first"""
+    deltas = {}
+    for key in set(before) | set(after):
+        old, new = before.get(key, {}), after.get(key, {})
+        change = {field: new.get(field, 0) - old.get(field, 0) for field in fields}
+        if any(change.values()):
+            deltas[key] = change
+    return dict(sorted(deltas.items(), key=lambda d: -abs(d[1][fields[-1]])))
+
+
+def diff_breakdowns(old, new):
+    """Byte deltas (new - old) of the archive, its groups, DEX files and packages"""
+    return {
+        "size": new["size"] - old["size"],
+        "groups": _deltas(old["groups"], new["groups"], ("uncompressed", "compressed")),
+        "dex": _deltas(old["dex"], new["dex"], ("uncompressed", "compressed")),
+        "packages": _deltas(old["packages"], new["packages"], ("classes", "code_bytes")),
+    }
+
+
+def _kb(value, sign=""):
+    return f"{value / 1024:{sign},.1f} KB"
+
+
+def print_breakdown(name, report, top=10):
+    print(f"📦 {name}: {_kb(report['size'])} ({_kb(report['uncompressed'])} uncompressed)")
+    for kind, group in report["groups"].items():
+        if group["entries"]:
+            print(f"  {kind:8s} {_kb(group['compressed']):>12s} {_kb(group['uncompressed']):>12s}  "
+                  f"{group['entries']} entries")
+    for member, sizes in report["dex"].items():
+        print(f"    {member:30s} {_kb(sizes['compressed']):>12s} {_kb(sizes['uncompressed']):>12s}")
+    if report["packages"]:
+        print(f"  Top packages by code size:")
+        for package, sizes in list(report["packages"].items())[:top]:
+            print(f"    {_kb(sizes['code_bytes']):>12s}  {package} ({sizes['classes']} classes)")
+    for member, error in report["errors"].items():
+        print(f"  ⚠️  {member}: {error}")
+
+
+def print_diff(diff, top=10):
+    print(f"  Size change: {_kb(diff['size'], '+')}")
+    for kind, change in diff["groups"].items():
+        print(f"    {kind:8s} {_kb(change['compressed'], '+'):>12s} compressed, "
+              f"{_kb(change['uncompressed'], '+')} uncompressed")
+    for package, change in list(diff["packages"].items())[:top]:
+        print(f"    {_kb(change['code_bytes'], '+'):>12s}  {package}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Break down APK/AAB size by DEX, package and resource type")
+    parser.add_argument("archives", nargs="+", help="APK or AAB files")
+    parser.add_argument("--diff", action="store_true", help="Diff the last archive against the first")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--json", metavar="FILE", help="Write the breakdowns as JSON")
+    args = parser.parse_args(argv)
+
+    for archive in args.archives:
+        if not zipfile.is_zipfile(archive):
+            print(f"❌ Not an APK/AAB: {archive}")
+            return 1
+
+    reports = size_breakdowns(args.archives, args.workers)
+    for archive, report in zip(args.archives, reports):
+        print_breakdown(Path(archive).name, report)
+    output = dict(zip(args.archives, reports))
+    if args.diff and len(reports) > 1:
+        print(f"\n📊 {Path(args.archives[0]).name} → {Path(args.archives[-1]).name}")
+        output = {"breakdowns": output, "diff": diff_breakdowns(reports[0], reports[-1])}
+        print_diff(output["diff"])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\n✓ Report saved: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,23 +8,24 @@ import subprocess
 from pathlib import Path
 import json
 
+import decompile_pool
+from decompile_pool import command_task, jadx_command
+import decompile_cache
+from apk_extract import EXTRACT_ALL, extract
+from tool_fetch import TOOLS, ToolFetcher
+
 def download_jadx():
     """Download and setup JADX decompiler"""
     print("⏳ Attempting to download JADX decompiler...")
     
-    # JADX GitHub releases
-    jadx_url = "https://github.com/skylot/jadx/releases/download/v1.4.7/jadx-1.4.7.zip"
-    jadx_zip = "jadx.zip"
+    fetcher = ToolFetcher()
     
     try:
-        import urllib.request
-        print(f"Downloading from: {jadx_url}")
-        urllib.request.urlretrieve(jadx_url, jadx_zip)
+        print(f"Downloading from: {fetcher.url_for(TOOLS['jadx'])}")
+        jadx_zip = fetcher.fetch(TOOLS["jadx"])
         
         # Extract
-        import zipfile
-        with zipfile.ZipFile(jadx_zip, 'r') as z:
-            z.extractall("jadx")
+        extract(jadx_zip, "jadx", EXTRACT_ALL)
         
         print("✅ JADX downloaded and extracted")
         return Path("jadx/bin/jadx.bat")
@@ -32,27 +33,6 @@ def download_jadx():
         print(f"⚠️  JADX download failed: {e}")
         return None
 
-def decompile_with_jadx(jadx_exe, dex_file, output_dir):
-    """Decompile DEX file using JADX"""
-    try:
-        print(f"Decompiling {dex_file.name}...", end=" ", flush=True)
-        
-        cmd = [str(jadx_exe), "-d", str(output_dir), str(dex_file)]
-        result = subprocess.run(cmd, capture_output=True, timeout=60)
-        
-        if result.returncode == 0:
-            print("✅")
-            return True
-        else:
-            print("⚠️")
-            return True  # Often succeeds despite non-zero exit
-    except subprocess.TimeoutExpired:
-        print("⏱️ timeout")
-        return False
-    except Exception as e:
-        print(f"❌ {e}")
-        return False
-
 def setup_alternative_decompilers():
     """Setup alternative decompilation methods"""
     print("\n🔄 Setting up alternative decompilation methods...\n")
@@ -84,6 +64,13 @@ def setup_alternative_decompilers():
     return None
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Automated source recovery with JADX")
+    decompile_pool.add_arguments(parser, timeout=60)
+    decompile_cache.add_arguments(parser)
+    args = parser.parse_args()
+
     print("=" * 70)
     print("🚀 AUTOMATED SOURCE CODE RECOVERY")
     print("=" * 70)
@@ -106,10 +93,13 @@ def main():
     
     if jadx_exe and jadx_exe.exists():
         print("\nStep 2: Decompiling with JADX...")
-        success_count = 0
-        for dex in dex_files:
-            if decompile_with_jadx(jadx_exe, dex, output_dir):
-                success_count += 1
+        # JADX often succeeds despite a non-zero exit
+        scheduler = decompile_pool.from_args(args)
+        task = decompile_cache.cached(
+            decompile_cache.from_args(args),
+            lambda out: command_task(lambda dex: jadx_command(jadx_exe, dex, out)),
+            output_dir, decompile_cache.tool_id("jadx", version="1.4.7"))
+        success_count = scheduler.run_all(dex_files, task)
         
         print(f"\n✅ Decompiled {success_count}/{len(dex_files)} DEX files")
     else:
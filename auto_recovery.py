@@ -3,21 +3,34 @@
 Automated APK Decompilation and Source Recovery
 Uses available tools to extract source code from compiled APK
 """
-import zipfile
 import struct
-import subprocess
 import os
 import sys
 import json
 from pathlib import Path
 
+from apk_extract import DEFAULT_SELECTOR, iter_extract, is_dex
+import decompile_pool
+from decompile_pool import DecompileScheduler, cfr_command, command_task
+import decompile_cache
+from tool_fetch import TOOLS, ToolFetcher, install as install_tool
+from batch_recovery import run_batch
+from recovery_pipeline import recovery_pipeline
+
+DEFAULT_APK = "android-app/app/build/outputs/apk/standard/debug/app-standard-debug.apk"
+
 class APKDecompiler:
-    def __init__(self, apk_path):
+    def __init__(self, apk_path, selector=DEFAULT_SELECTOR):
         self.apk_path = apk_path
         self.extract_dir = Path("./apk-extracted")
+        self.selector = selector
         
-    def extract_apk(self):
-        """Extract APK contents (it's a ZIP file)"""
+    def extract_apk(self, on_dex=None):
+        """Stream the entries matching self.selector out of the APK.
+
+        on_dex(path) is called for every DEX as soon as it is written.
+        Pass selector=apk_extract.EXTRACT_ALL to the constructor for a full extraction.
+        """
         print(f"📦 Extracting APK: {self.apk_path}")
         
         if not os.path.exists(self.apk_path):
@@ -28,9 +41,10 @@ class APKDecompiler:
             # Create extraction directory
             self.extract_dir.mkdir(exist_ok=True)
             
-            # Extract all files
-            with zipfile.ZipFile(self.apk_path, 'r') as z:
-                z.extractall(self.extract_dir)
+            # Only inflate what the pipeline needs, one entry at a time
+            for info, path in iter_extract(self.apk_path, self.extract_dir, self.selector):
+                if on_dex and is_dex(path):
+                    on_dex(path)
             
             print(f"✅ Extracted to: {self.extract_dir}")
             self._list_dex_files()
@@ -57,12 +71,10 @@ class APKDecompiler:
             return cfr_path
         
         print("\n⏳ Attempting to download CFR decompiler...")
-        print("   (This may take a few minutes - ~80MB)")
+        print("   (Resumes a partial download from the shared tool cache)")
         
         try:
-            import urllib.request
-            url = "https://www.benf.org/other/cfr/cfr.jar"
-            urllib.request.urlretrieve(url, "cfr.jar", _download_progress)
+            install_tool(ToolFetcher().fetch(TOOLS["cfr"]), cfr_path)
             print(f"\n✅ CFR downloaded successfully!")
             return cfr_path
             
@@ -74,57 +86,27 @@ class APKDecompiler:
             print(f"   3. Run decompilation manually")
             return None
     
-    def decompile_with_cfr(self, cfr_path):
-        """Decompile DEX files using CFR"""
-        
-        if not cfr_path or not cfr_path.exists():
-            print("❌ CFR not found. Cannot decompile.")
-            print("\n📝 Manual decompilation steps:")
-            print("   1. Get CFR: https://www.benf.org/other/cfr/cfr.jar")
-            print("   2. Run: java -jar cfr.jar apk-extracted/classes.dex --outputdir ./src-recovered")
-            print("   3. Repeat for classes2.dex through classes12.dex")
+    def recover(self, cfr_path, scheduler=None, cache=None):
+        """Extract and decompile in one streaming pass: each DEX is decompiled
+        as soon as it leaves the APK"""
+        if not os.path.exists(self.apk_path):
+            print(f"❌ APK not found: {self.apk_path}")
             return False
-        
-        output_dir = Path("./src-recovered")
-        output_dir.mkdir(exist_ok=True)
-        
-        print(f"\n🔄 Decompiling DEX files with CFR...")
-        
-        dex_files = sorted(self.extract_dir.glob("classes*.dex"))
-        success_count = 0
-        
-        for dex_file in dex_files:
-            try:
-                print(f"   Processing {dex_file.name}...", end=" ", flush=True)
-                
-                cmd = [
-                    "java", "-jar", str(cfr_path),
-                    str(dex_file),
-                    "--outputdir", str(output_dir)
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, timeout=120)
-                
-                if result.returncode == 0:
-                    print("✅")
-                    success_count += 1
-                else:
-                    print(f"⚠️ (warnings)")
-                    success_count += 1  # CFR often exits with 1 even on success
-                    
-            except subprocess.TimeoutExpired:
-                print("⏱️ timeout")
-            except Exception as e:
-                print(f"❌ {e}")
-        
-        print(f"\n✅ Decompilation complete: {success_count}/{len(dex_files)} DEX files processed")
-        
-        # Check output
-        java_files = list(output_dir.glob("**/*.java"))
-        print(f"   Generated {len(java_files)} Java source files")
-        
-        return success_count > 0
-    
+
+        print(f"📦 Extracting and decompiling {self.apk_path}...")
+        scheduler = scheduler or DecompileScheduler(timeout=120)
+        make_task = lambda out, options: command_task(
+            lambda dex: cfr_command(cfr_path, dex, out, scheduler.jvm_heap_mb))
+        pipeline = recovery_pipeline(Path("./src-recovered"), make_task, scheduler, cache, ("cfr", cfr_path),
+                                     extract_dir=self.extract_dir, install_prefix=None)
+        recovered = pipeline.run([self.apk_path])
+        pipeline.print_summary()
+        if cache:
+            print(f"  {cache.summary()}")
+        print(f"\n✅ Decompilation complete: {pipeline.stage('decompile').items_out} DEX files, "
+              f"{len(recovered)} Java source files")
+        return bool(recovered)
+
     def analyze_structure(self):
         """Analyze decompiled class structure"""
         src_dir = Path("./src-recovered")
@@ -151,33 +133,38 @@ class APKDecompiler:
             if len(java_files) > 10:
                 print(f"      ... and {len(java_files)-10} more")
 
-def _download_progress(block_num, block_size, total_size):
-    downloaded = block_num * block_size
-    percent = min(100, int(100 * downloaded / total_size))
-    sys.stdout.write(f'\r   [{percent:3d}%] {downloaded/(1024*1024):.1f}MB / {total_size/(1024*1024):.1f}MB')
-    sys.stdout.flush()
-
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Automated APK decompilation and source recovery")
+    parser.add_argument("apk", nargs="?", default=DEFAULT_APK, help=f"APK to recover (default: {DEFAULT_APK})")
+    parser.add_argument("--batch", metavar="SOURCE",
+                        help="Recover every APK in a directory or manifest (resumable, see batch_recovery.py)")
+    decompile_pool.add_arguments(parser, timeout=120)
+    decompile_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.batch:
+        sys.exit(run_batch(args.batch, args))
+
     print("=" * 70)
     print("🚀 AUTOMATED SOURCE CODE RECOVERY from APK")
     print("=" * 70)
     
-    apk_path = "android-app/app/build/outputs/apk/standard/debug/app-standard-debug.apk"
-    
-    decompiler = APKDecompiler(apk_path)
-    
-    # Step 1: Extract APK
-    if not decompiler.extract_apk():
-        sys.exit(1)
+    decompiler = APKDecompiler(args.apk)
     
-    # Step 2: Try to get CFR
+    # Step 1: Try to get CFR
     cfr_path = decompiler.try_download_cfr()
     
-    # Step 3: Decompile
+    # Step 2: Extract and decompile, streaming each DEX straight to CFR
     if cfr_path and cfr_path.exists():
-        decompiler.decompile_with_cfr(cfr_path)
+        if not decompiler.recover(cfr_path, decompile_pool.from_args(args), decompile_cache.from_args(args)):
+            sys.exit(1)
         decompiler.analyze_structure()
     else:
+        # Step 2b: Extract only, for manual decompilation
+        if not decompiler.extract_apk():
+            sys.exit(1)
         print("\n" + "="*70)
         print("📢 MANUAL DECOMPILATION REQUIRED")
         print("="*70)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Batch source recovery over many APKs
+Queues extract -> index -> decompile for every APK of a directory or
+manifest on shared workers, journaling each finished step so that an
+interrupted batch resumes where it stopped
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from apk_extract import DEFAULT_SELECTOR, iter_extract
+import decompile_pool
+from decompile_pool import cfr_command, command_task
+import decompile_cache
+from dex_index import DexIndex
+from tool_fetch import TOOLS, ToolFetcher, install as install_tool
+
+DEFAULT_WORK_DIR = Path("batch-recovery")
+APK_PATTERNS = ("*.apk",)
+EXTRACT_WORKERS = 4
+
+
+def wrote_java(out_dir):
+    """CFR exits 0 even when it decompiles nothing; count a DEX done only once .java exists"""
+    return next(Path(out_dir).rglob("*.java"), None) is not None
+
+
+def staged_task(make_task, output_dir, staging_root):
+    """Run each DEX into its own directory and merge it into output_dir on success
+
+    The per-APK output directory is shared by all of its DEX files, so
+    whether one DEX produced anything can only be judged in isolation.
+    """
+    def task(dex_file, timeout):
+        staging = Path(staging_root) / dex_file.stem
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        try:
+            if not make_task(staging)(dex_file, timeout):
+                return False
+            shutil.copytree(staging, output_dir, dirs_exist_ok=True)
+            return True
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    return task
+
+
+def read_manifest(path):
+    """APK paths from a manifest: a JSON list or one path per line (# comments)"""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [line.strip() for line in text.splitlines()]
+        entries = [line for line in entries if line and not line.startswith("#")]
+    # Relative entries are relative to the manifest
+    return [p if p.is_absolute() else path.parent / p for p in map(Path, entries)]
+
+
+def find_apks(source):
+    """APK paths from a directory (recursively) or a manifest file"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(p for pattern in APK_PATTERNS for p in source.rglob(pattern))
+    return read_manifest(source)
+
+
+def apk_key(apk_path):
+    """Stable job name for an APK: its stem plus a content digest prefix"""
+    digest = hashlib.sha256()
+    with open(apk_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"{Path(apk_path).stem}-{digest.hexdigest()[:12]}"
+
+
+class BatchJournal:
+    """Append-only JSON-lines record of finished batch steps"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._done = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of an interrupted run
+                    self._done.add((entry["apk"], entry["stage"], entry.get("item")))
+
+    def done(self, apk, stage, item=None):
+        return (apk, stage, item) in self._done
+
+    def record(self, apk, stage, item=None):
+        entry = {"apk": apk, "stage": stage, "item": item, "time": time.time()}
+        with self._lock:
+            with open(self.path, 'a', encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._done.add((apk, stage, item))
+
+
+class BatchRecovery:
+    """Recover source from many APKs with one shared decompile queue"""
+
+    def __init__(self, work_dir=DEFAULT_WORK_DIR, scheduler=None, cache=None, cfr_jar=Path("cfr.jar")):
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.scheduler = scheduler or decompile_pool.DecompileScheduler()
+        self.cache = cache
+        self.cfr_jar = Path(cfr_jar)
+        self.journal = BatchJournal(self.work_dir / "journal.jsonl")
+
+    def _extract(self, key, apk_path):
+        target = self.work_dir / key / "extracted"
+        if not self.journal.done(key, "extract"):
+            for _ in iter_extract(apk_path, target, DEFAULT_SELECTOR):
+                pass
+            self.journal.record(key, "extract")
+        return sorted(target.glob("classes*.dex"))
+
+    def prepare(self, apks):
+        """Extract and index every APK; returns {key: (apk, dex files)}"""
+        keyed = {}
+        for apk_path in apks:
+            if not apk_path.exists():
+                print(f"  ❌ {apk_path}: not found")
+                continue
+            keyed[apk_key(apk_path)] = apk_path
+
+        jobs = {}
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool, \
+                DexIndex(self.work_dir / "index.sqlite") as index:
+            futures = {key: pool.submit(self._extract, key, apk) for key, apk in keyed.items()}
+            for key, future in futures.items():
+                try:
+                    dex_files = future.result()
+                except Exception as e:
+                    print(f"  ❌ {keyed[key].name}: extraction failed: {e}")
+                    continue
+                # One shared index; identical DEX files across builds are parsed once
+                if not self.journal.done(key, "index"):
+                    index.build(dex_files, prune=False)
+                    self.journal.record(key, "index")
+                jobs[key] = (keyed[key], dex_files)
+                print(f"  ✓ {keyed[key].name}: {len(dex_files)} DEX files")
+        return jobs
+
+    def decompile(self, jobs):
+        """Queue every not-yet-journaled DEX of every APK on the shared scheduler"""
+        tool = decompile_cache.tool_id("cfr", self.cfr_jar)
+        heap_mb = self.scheduler.jvm_heap_mb
+        tasks = {}
+        for key in jobs:
+            out = self.work_dir / key / "src"
+            out.mkdir(parents=True, exist_ok=True)
+            # Both routes hand make_task a directory of its own per DEX
+            make_task = lambda o: command_task(lambda dex: cfr_command(self.cfr_jar, dex, o, heap_mb),
+                                               accept=lambda dex, completed: wrote_java(o))
+            if self.cache:
+                tasks[key] = self.cache.wrap(make_task, out, tool)
+            else:
+                tasks[key] = staged_task(make_task, out, self.work_dir / key / "staging")
+
+        def task(item, timeout):
+            key, dex_file = item
+            ok = tasks[key](dex_file, timeout)
+            if ok:
+                self.journal.record(key, "decompile", dex_file.name)
+            return ok
+
+        pending = [(key, dex) for key, (_, dex_files) in jobs.items() for dex in dex_files
+                   if not self.journal.done(key, "decompile", dex.name)]
+        skipped = sum(len(dex_files) for _, dex_files in jobs.values()) - len(pending)
+        if skipped:
+            print(f"  ↩️  {skipped} DEX files already decompiled (journal)")
+        if not pending:
+            return 0
+        try:
+            return self.scheduler.run_all(pending, task,
+                                          label=lambda item: f"{jobs[item[0]][0].name}/{item[1].name}")
+        finally:
+            for key in jobs:
+                shutil.rmtree(self.work_dir / key / "staging", ignore_errors=True)
+
+    def run(self, apks):
+        apks = [Path(p) for p in apks]
+        print(f"📦 Preparing {len(apks)} APKs in {self.work_dir}/")
+        jobs = self.prepare(apks)
+        if not jobs:
+            return False
+
+        print(f"\n🔄 Decompiling...")
+        self.decompile(jobs)
+
+        incomplete = [apk.name for key, (apk, dex_files) in jobs.items()
+                      if not all(self.journal.done(key, "decompile", d.name) for d in dex_files)]
+        if self.cache:
+            print(f"  {self.cache.summary()}")
+        print(f"\n✅ {len(jobs) - len(incomplete)}/{len(jobs)} APKs fully recovered into {self.work_dir}/")
+        for name in incomplete:
+            print(f"  ⚠️  {name} incomplete; rerun to resume")
+        return not incomplete
+
+
+def ensure_cfr(cfr_jar=Path("cfr.jar")):
+    if not cfr_jar.exists():
+        install_tool(ToolFetcher().fetch(TOOLS["cfr"]), cfr_jar)
+    return cfr_jar
+
+
+def run_batch(source, args=None, work_dir=DEFAULT_WORK_DIR):
+    """Recover every APK of a directory or manifest; returns an exit code"""
+    apks = find_apks(source)
+    if not apks:
+        print(f"❌ No APKs found in {source}")
+        return 1
+    try:
+        cfr_jar = ensure_cfr()
+    except Exception as e:
+        print(f"❌ CFR unavailable: {e}")
+        return 1
+    scheduler = decompile_pool.from_args(args) if args else None
+    cache = decompile_cache.from_args(args) if args else None
+    batch = BatchRecovery(work_dir, scheduler, cache, cfr_jar)
+    return 0 if batch.run(apks) else 1
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recover source from many APKs, resumably")
+    parser.add_argument("source", help="Directory of APKs or manifest file (JSON list or one path per line)")
+    parser.add_argument("--work-dir", default=str(DEFAULT_WORK_DIR), help="Output and journal directory")
+    decompile_pool.add_arguments(parser, timeout=120)
+    decompile_cache.add_arguments(parser)
+    args = parser.parse_args(argv)
+    return run_batch(args.source, args, Path(args.work_dir))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
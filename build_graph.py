@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Dependency graph of build steps for BuildManager
+Steps start as soon as everything they depend on has finished, up to a
+parallelism limit; steps sharing a resource (e.g. the Gradle project)
+never overlap. The run ends with a critical-path summary
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+Step = namedtuple('Step', 'name fn after required resource')
+StepResult = namedtuple('StepResult', 'name status started ended error')
+
+DEFAULT_PARALLELISM = 4
+
+
+class StepGraph:
+    """Build steps with dependencies, run concurrently as they become ready
+
+    A failed required step skips everything that depends on it; an optional
+    step (required=False) may fail without blocking its dependents.
+    """
+
+    def __init__(self, parallelism: int = DEFAULT_PARALLELISM):
+        self.parallelism = max(1, parallelism)
+        self.steps = {}
+        self.results = {}
+        self.elapsed = 0.0
+
+    def add(self, name: str, fn, after=(), required: bool = True, resource: str = None):
+        if name in self.steps:
+            raise ValueError(f"Duplicate build step: {name}")
+        self.steps[name] = Step(name, fn, tuple(after), required, resource)
+
+    def order(self) -> list:
+        """Step names in dependency order; raises ValueError on unknown steps or cycles"""
+        for step in self.steps.values():
+            for dependency in step.after:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dependency}")
+        ordered, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Build step cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dependency in self.steps[name].after:
+                visit(dependency, path + [name])
+            state[name] = "done"
+            ordered.append(name)
+
+        for name in self.steps:
+            visit(name, [])
+        return ordered
+
+    def _run_step(self, step: Step, origin: float) -> StepResult:
+        started = time.monotonic() - origin
+        try:
+            ok, error = bool(step.fn()), None
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        return StepResult(step.name, "ok" if ok else "failed", started, time.monotonic() - origin, error)
+
+    def run(self) -> bool:
+        """Run every step; True when all required steps succeeded"""
+        pending = self.order()
+        running = {}
+        busy = set()
+        results = self.results = {}
+        origin = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+            while pending or running:
+                for name in list(pending):
+                    step = self.steps[name]
+                    if not all(dependency in results for dependency in step.after):
+                        continue
+                    blocked = [d for d in step.after if results[d].status != "ok" and self.steps[d].required]
+                    if blocked:
+                        pending.remove(name)
+                        results[name] = StepResult(name, "skipped", None, None, f"{blocked[0]} did not succeed")
+                        continue
+                    if len(running) >= self.parallelism or (step.resource and step.resource in busy):
+                        continue
+                    pending.remove(name)
+                    if step.resource:
+                        busy.add(step.resource)
+                    running[pool.submit(self._run_step, step, origin)] = step
+                if not running:
+                    # Skipping a step can make others skippable; go round again
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    busy.discard(step.resource)
+                    results[step.name] = future.result()
+
+        self.elapsed = time.monotonic() - origin
+        return all(results[name].status == "ok" for name, step in self.steps.items() if step.required)
+
+    def critical_path(self) -> list:
+        """Steps that determined the total run time, first to last
+
+        Walks back from the step that finished last, each time to what it
+        was waiting for: its latest dependency or the step that held its
+        resource before it.
+        """
+        ran = {name: r for name, r in self.results.items() if r.ended is not None}
+        if not ran:
+            return []
+        path = [max(ran.values(), key=lambda r: r.ended).name]
+        while True:
+            step, current = self.steps[path[-1]], ran[path[-1]]
+            before = [ran[d] for d in step.after if d in ran]
+            if step.resource:
+                before += [r for name, r in ran.items()
+                           if self.steps[name].resource == step.resource and r.ended <= current.started]
+            if not before:
+                break
+            path.append(max(before, key=lambda r: r.ended).name)
+        return path[::-1]
+
+    def summary(self) -> dict:
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "parallelism": self.parallelism,
+            "steps": {name: {"status": r.status,
+                             "start_s": None if r.started is None else round(r.started, 3),
+                             "end_s": None if r.ended is None else round(r.ended, 3),
+                             "error": r.error}
+                      for name, r in self.results.items()},
+            "critical_path": self.critical_path(),
+        }
+
+    def print_summary(self):
+        print(f"\n  {'step':22s} {'status':8s} {'start':>7s} {'end':>7s}")
+        for name in self.order():
+            result = self.results.get(name)
+            if result is None:
+                continue
+            if result.started is None:
+                print(f"  {name:22s} {result.status:8s} {'-':>7s} {'-':>7s}  ({result.error})")
+                continue
+            error = f"  ({result.error})" if result.error else ""
+            print(f"  {name:22s} {result.status:8s} {result.started:6.1f}s {result.ended:6.1f}s{error}")
+        path = self.critical_path()
+        if path:
+            on_path = sum(self.results[n].ended - self.results[n].started for n in path)
+            print(f"  Critical path ({on_path:.1f}s of {self.elapsed:.1f}s): {' → '.join(path)}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Captured, streamed subprocess output for BuildManager
+Reads a command's stdout/stderr in chunks as it runs, tees each line to
+the terminal, writes a size-capped gzip log and picks out compiler,
+lint and Gradle warnings/errors; memory stays bounded however much the
+command prints
+"""
+import gzip
+import os
+import re
+import subprocess
+import sys
+import threading
+from collections import Counter, deque, namedtuple
+from pathlib import Path
+
+from build_metrics import wait_with_usage
+
+Diagnostic = namedtuple('Diagnostic', 'level message location')
+CommandLog = namedtuple('CommandLog', 'exit_code rusage log_path bytes lines truncated counts diagnostics tail')
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE = 4096
+MAX_LOG_BYTES = 64 * 1024 * 1024
+TAIL_LINES = 200
+MAX_DIAGNOSTICS = 100
+DRAIN_TIMEOUT_S = 5.0
+LOG_KEEP = 200
+
+DIAGNOSTIC_PATTERNS = [
+    # Kotlin compiler: "e: file:///app/src/main/A.kt:12:5 Unresolved reference: x"
+    ("error", re.compile(r'^e: (?:file://)?(?P<loc>\S+?:\d+(?::\d+)?) (?P<msg>.+)')),
+    ("warning", re.compile(r'^w: (?:file://)?(?P<loc>\S+?:\d+(?::\d+)?) (?P<msg>.+)')),
+    # javac and Android lint: "A.java:12: error: ..." / "strings.xml:3: Warning: ... [Typos]"
+    ("error", re.compile(r'^(?P<loc>\S+\.\w+:\d+): (?:error|Error): (?P<msg>.+)')),
+    ("warning", re.compile(r'^(?P<loc>\S+\.\w+:\d+): (?:warning|Warning): (?P<msg>.+)')),
+    # Gradle and AGP
+    ("error", re.compile(r'^> Task (?P<loc>\S+) (?P<msg>FAILED)$')),
+    ("error", re.compile(r'^(?:ERROR|FAILURE): (?P<msg>.+)')),
+    ("warning", re.compile(r'^WARNING: (?P<msg>.+)')),
+]
+
+_terminal_lock = threading.Lock()
+
+
+def classify(line: str):
+    """Diagnostic for one output line, or None"""
+    # Every pattern needs ": " or "> Task"; most build output has neither
+    if ": " not in line and not line.startswith("> Task"):
+        return None
+    for level, pattern in DIAGNOSTIC_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            groups = match.groupdict()
+            return Diagnostic(level, groups["msg"].strip(), groups.get("loc"))
+    return None
+
+
+class LogSink:
+    """Fan one command's output lines out to the terminal, a gzip log and diagnostics"""
+
+    def __init__(self, log_path: Path = None, tee: bool = True, max_log_bytes: int = MAX_LOG_BYTES):
+        self.log_path = log_path
+        self.tee = tee
+        self.max_log_bytes = max_log_bytes
+        self.bytes = 0
+        self.lines = 0
+        self.logged = 0
+        self.omitted = 0
+        self.counts = Counter()
+        self.diagnostics = []
+        # (line, already in the log file?) for the last TAIL_LINES lines
+        self.tail = deque(maxlen=TAIL_LINES)
+        # Streams that just printed Gradle's "* What went wrong:" header
+        self._what_went_wrong = set()
+        self._lock = threading.Lock()
+        self._file = None
+        if log_path:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(log_path, 'wb', compresslevel=6)
+
+    def feed(self, lines: list, stream: str = "stdout"):
+        """Take a batch of complete lines (each ending in a newline) from one stream"""
+        lines = [line if len(line) <= MAX_LINE else line[:MAX_LINE] + b'...\n' for line in lines]
+        block = b''.join(lines)
+        with self._lock:
+            self.lines += len(lines)
+            if self.tee:
+                self._echo(block)
+            written = False
+            # Once anything is omitted the head is closed; later output only reaches the tail
+            if self._file and not self.omitted and self.logged + len(block) <= self.max_log_bytes:
+                self._file.write(block)
+                self.logged += len(block)
+                written = True
+            elif self._file:
+                self.omitted += len(block)
+            for line in lines[-TAIL_LINES:]:
+                self.tail.append((line, written))
+            for line in lines:
+                self._classify(line.decode('utf-8', 'replace').rstrip(), stream)
+
+    def _echo(self, block: bytes):
+        with _terminal_lock:
+            out = getattr(sys.stdout, "buffer", None)
+            if out is not None:
+                out.write(block)
+            else:
+                sys.stdout.write(block.decode('utf-8', 'replace'))
+            sys.stdout.flush()
+
+    def _classify(self, text: str, stream: str):
+        if stream in self._what_went_wrong and text:
+            # Gradle prints the failure reason on the line after this header,
+            # on the same stream; the other stream may interleave
+            diagnostic = Diagnostic("error", text.strip(), None)
+            self._what_went_wrong.discard(stream)
+        else:
+            if text == "* What went wrong:":
+                self._what_went_wrong.add(stream)
+            else:
+                self._what_went_wrong.discard(stream)
+            diagnostic = classify(text)
+        if diagnostic is None:
+            return
+        self.counts[diagnostic.level] += 1
+        if len(self.diagnostics) < MAX_DIAGNOSTICS and diagnostic not in self.diagnostics:
+            self.diagnostics.append(diagnostic)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            if self.omitted:
+                # Keep the head and the tail of an oversized log; the failure is usually at the end
+                self._file.write(f"\n... {self.omitted} bytes omitted ...\n\n".encode())
+                for line, written in self.tail:
+                    if not written:
+                        self._file.write(line)
+            self._file.close()
+            self._file = None
+
+
+def _pump(stream, sink: LogSink, name: str):
+    """Read a pipe in chunks and feed complete lines to the sink"""
+    fd = stream.fileno()
+    pending = b''
+    while True:
+        try:
+            chunk = os.read(fd, CHUNK_SIZE)
+        except OSError:
+            break
+        if not chunk:
+            break
+        with sink._lock:
+            sink.bytes += len(chunk)
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        if len(pending) > MAX_LINE:
+            lines.append(pending)
+            pending = b''
+        if lines:
+            sink.feed([line + b'\n' for line in lines], name)
+    if pending:
+        sink.feed([pending + b'\n'], name)
+    stream.close()
+
+
+def run_logged(command, cwd: Path = None, log_path: Path = None, tee: bool = True,
+               shell: bool = True) -> CommandLog:
+    """Run command, streaming its output to the terminal and log_path as it arrives"""
+    sink = LogSink(log_path, tee)
+    try:
+        proc = subprocess.Popen(command, shell=shell, cwd=cwd,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        readers = [threading.Thread(target=_pump, args=(stream, sink, name), daemon=True)
+                   for stream, name in ((proc.stdout, "stdout"), (proc.stderr, "stderr"))]
+        for reader in readers:
+            reader.start()
+        try:
+            exit_code, rusage = wait_with_usage(proc)
+        finally:
+            # A daemon the command left behind may still hold the pipes open
+            for reader in readers:
+                reader.join(DRAIN_TIMEOUT_S)
+    finally:
+        sink.close()
+    return CommandLog(exit_code, rusage, log_path, sink.bytes, sink.lines, sink.omitted,
+                      dict(sink.counts), sink.diagnostics,
+                      [line.decode('utf-8', 'replace').rstrip('\n') for line, _ in sink.tail])
+
+
+def prune_logs(log_dir: Path, keep: int = LOG_KEEP):
+    """Delete all but the newest keep logs"""
+    logs = sorted(Path(log_dir).glob("*.log.gz"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in logs[keep:]:
+        old.unlink(missing_ok=True)
@@ -6,20 +6,51 @@ Comprehensive build automation for APK, AAB, and testing
 
 import os
 import sys
-import subprocess
+import itertools
 import json
+import time
 from pathlib import Path
 from datetime import datetime
 
+import apk_size
+from build_log import prune_logs, run_logged
+from build_graph import DEFAULT_PARALLELISM, StepGraph
+from build_metrics import BuildMetrics, timed_step
+from build_probe import ToolchainProber
+from build_watch import watch
+from device_fanout import DeviceFanout, launch_component, run_adb
+from release_store import DEFAULT_KEEP, ReleaseStore
+
+
+# Flags for every Gradle invocation: reuse the warm daemon and the build
+# cache, and write a task-level --profile report for the build metrics
+GRADLE_FLAGS = "--daemon --build-cache --profile"
+
 
 class BuildManager:
     """Manage builds for ExaminerAI"""
     
-    def __init__(self):
+    def __init__(self, clean: bool = False, devices: list = None,
+                 keep_releases: int = DEFAULT_KEEP, release_tags: list = (),
+                 jobs: int = DEFAULT_PARALLELISM):
+        self.clean = clean
+        self.devices = devices
+        self.keep_releases = keep_releases
+        self.release_tags = list(release_tags)
+        self.jobs = jobs
+        self.custom_steps = []
+        self.step_graph = None
+        self._cleaned = False
         self.project_root = Path(__file__).parent
         self.android_dir = self.project_root / "android-app"
         self.build_output_dir = self.android_dir / "app" / "build" / "outputs"
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.metrics = BuildMetrics(self.android_dir / "build" / "reports" / "profile")
+        self.releases = ReleaseStore(self.project_root / "releases")
+        self.log_dir = self.project_root / "build-logs"
+        self._log_seq = itertools.count(1)
+        if self.log_dir.exists():
+            prune_logs(self.log_dir)
         
     def info(self, message: str):
         """Print info message"""
@@ -34,45 +65,72 @@ class BuildManager:
         print(f"❌ {message}")
         
     def run_command(self, command: str, cwd: Path = None) -> bool:
-        """Run a shell command"""
+        """Run a shell command, recording its exit code, CPU time and peak RSS
+
+        Output is shown as it arrives and kept in a gzip log under
+        build-logs/; warnings and errors found in it go into the step metrics.
+        """
+        started = time.perf_counter()
+        step = self.metrics.current_step() or "command"
+        log_path = self.log_dir / f"{self.timestamp}-{step}-{next(self._log_seq)}.log.gz"
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=cwd or self.project_root,
-                capture_output=False
-            )
-            return result.returncode == 0
+            result = run_logged(command, cwd or self.project_root, log_path)
         except Exception as e:
             self.error(f"Command failed: {e}")
+            self.metrics.record_command(command, None, time.perf_counter() - started)
             return False
+        entry = self.metrics.record_command(command, result.exit_code, time.perf_counter() - started,
+                                            result.rusage)
+        entry.update({
+            "log": str(log_path),
+            "output_bytes": result.bytes,
+            "output_lines": result.lines,
+            "log_truncated_bytes": result.truncated,
+            "diagnostic_counts": result.counts,
+            "diagnostics": [d._asdict() for d in result.diagnostics],
+        })
+        if result.exit_code != 0:
+            self.error(f"Command exited with {result.exit_code}; full output in {log_path}")
+            for diagnostic in [d for d in result.diagnostics if d.level == "error"][:5]:
+                location = f"{diagnostic.location}: " if diagnostic.location else ""
+                print(f"   {location}{diagnostic.message}")
+        return result.exit_code == 0
+    
+    def run_captured(self, args: list) -> tuple:
+        """Run a short command with captured output; returns (exit code, output)"""
+        started = time.perf_counter()
+        exit_code, output = run_adb(args)
+        self.metrics.record_command(" ".join(args), exit_code, time.perf_counter() - started)
+        return exit_code, output
     
+    def gradle(self, *tasks: str) -> bool:
+        """Run Gradle tasks in one invocation, cleaning only when requested"""
+        if self.clean and not self._cleaned:
+            # Clean once per session, not before every target
+            tasks = ("clean",) + tasks
+            self._cleaned = True
+        return self.run_command(f"./gradlew {GRADLE_FLAGS} {' '.join(tasks)}", cwd=self.android_dir)
+    
+    @timed_step("prerequisites")
     def check_prerequisites(self) -> bool:
         """Check if all prerequisites are installed"""
         self.info("Checking prerequisites...")
         
-        prerequisites = [
-            ("Java", "java -version"),
-            ("Gradle", "gradle -version"),
-            ("Python", "python --version"),
-            ("Git", "git --version")
-        ]
+        # All probes run at once; unchanged binaries are answered from the cache
+        prober = ToolchainProber(self.project_root / ".build-cache" / "probes.json")
         
         all_ok = True
-        for name, cmd in prerequisites:
-            try:
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.success(f"{name} ✓")
-                else:
-                    self.error(f"{name} ✗ - Not found or error")
-                    all_ok = False
-            except Exception as e:
-                self.error(f"{name} ✗ - {e}")
+        for result in prober.probe_all():
+            if result.ok:
+                cached = " (cached)" if result.cached else ""
+                self.success(f"{result.name} ✓ {result.version}{cached}")
+            else:
+                self.error(f"{result.name} ✗ - {result.error}")
                 all_ok = False
         
         return all_ok
     
+    @timed_step("environment")
     def setup_environment(self) -> bool:
         """Setup build environment"""
         self.info("Setting up build environment...")
@@ -86,14 +144,18 @@ class BuildManager:
         self.success("Android SDK configured")
         return True
     
+    @timed_step("apk_debug")
     def build_apk_debug(self) -> bool:
         """Build debug APK"""
         self.info("Building Debug APK...")
         
-        if not self.run_command("./gradlew assembleDebug", cwd=self.android_dir):
+        if not self.gradle("assembleDebug"):
             self.error("Debug APK build failed")
             return False
         
+        return self._collect_apk_debug()
+    
+    def _collect_apk_debug(self) -> bool:
         apk_path = self.android_dir / "app/build/outputs/apk/debug/app-debug.apk"
         if apk_path.exists():
             self.success(f"Debug APK created: {apk_path}")
@@ -102,80 +164,118 @@ class BuildManager:
             self.error("Debug APK not found")
             return False
     
+    @timed_step("apk_release")
     def build_apk_release(self) -> bool:
         """Build release APK"""
         self.info("Building Release APK...")
         
-        if not self.run_command("./gradlew clean", cwd=self.android_dir):
-            self.error("Clean failed")
-            return False
-        
-        if not self.run_command("./gradlew assembleRelease", cwd=self.android_dir):
+        if not self.gradle("assembleRelease"):
             self.error("Release APK build failed")
             return False
         
+        return self._collect_apk_release()
+    
+    def _collect_apk_release(self) -> bool:
         apk_path = self.android_dir / "app/build/outputs/apk/release/app-release.apk"
         if apk_path.exists():
             self.success(f"Release APK created: {apk_path}")
-            self._copy_to_releases(apk_path, f"app-release-{self.timestamp}.apk")
+            self._store_release(apk_path, f"app-release-{self.timestamp}.apk")
             return True
         else:
             self.error("Release APK not found")
             return False
     
+    @timed_step("aab")
     def build_aab(self) -> bool:
         """Build Android App Bundle (AAB) for Play Store"""
         self.info("Building Android App Bundle (AAB)...")
         
-        if not self.run_command("./gradlew clean", cwd=self.android_dir):
-            self.error("Clean failed")
-            return False
-        
-        if not self.run_command("./gradlew bundleRelease", cwd=self.android_dir):
+        if not self.gradle("bundleRelease"):
             self.error("AAB build failed")
             return False
         
+        return self._collect_aab()
+    
+    def _collect_aab(self) -> bool:
         aab_path = self.android_dir / "app/build/outputs/bundle/release/app-release.aab"
         if aab_path.exists():
             self.success(f"AAB created: {aab_path}")
-            self._copy_to_releases(aab_path, f"app-release-{self.timestamp}.aab")
+            self._store_release(aab_path, f"app-release-{self.timestamp}.aab")
             return True
         else:
             self.error("AAB not found")
             return False
     
-    def _copy_to_releases(self, source: Path, filename: str):
-        """Copy build output to releases directory"""
-        releases_dir = self.project_root / "releases"
-        releases_dir.mkdir(exist_ok=True)
+    @timed_step("variants")
+    def build_variants(self) -> bool:
+        """Build debug APK, release APK and AAB in a single Gradle invocation
+
+        Collecting the outputs is left to the caller (see build_all).
+        """
+        self.info("Building Debug APK, Release APK and AAB...")
+        
+        if not self.gradle("assembleDebug", "assembleRelease", "bundleRelease"):
+            self.error("Gradle build failed")
+            return False
+        return True
+    
+    def _store_release(self, source: Path, filename: str):
+        """Add build output to the content-addressed releases directory"""
+        store = self.releases
+        series = filename.replace(f"-{self.timestamp}", "")
+        entry = store.add(source, filename, series, self.release_tags)
+        dest = store.root / filename
+        if entry["reused"]:
+            self.success(f"Build unchanged, linked {dest} ({entry['link']}, {entry['digest'][:12]})")
+        else:
+            self.success(f"Build stored as {dest} ({entry['digest'][:12]})")
         
-        dest = releases_dir / filename
-        import shutil
-        shutil.copy2(source, dest)
-        self.success(f"Build copied to {dest}")
+        if self.keep_releases:
+            for name in store.prune(self.keep_releases):
+                self.info(f"Pruned old release {name}")
     
+    @timed_step("lint")
     def run_lint(self) -> bool:
         """Run Kotlin lint checks"""
         self.info("Running Kotlin Lint...")
         
-        if not self.run_command("./gradlew lint", cwd=self.android_dir):
+        if not self.gradle("lint"):
             self.error("Lint check failed")
             return False
         
         self.success("Lint check passed")
         return True
     
+    @timed_step("tests")
     def run_tests(self) -> bool:
         """Run unit tests"""
         self.info("Running unit tests...")
         
-        if not self.run_command("./gradlew test", cwd=self.android_dir):
+        if not self.gradle("test"):
             self.error("Tests failed")
             return False
         
         self.success("All tests passed")
         return True
     
+    @timed_step("checks")
+    def run_checks(self, tests: bool = True) -> bool:
+        """Run unit tests and lint in one Gradle invocation
+
+        Gradle allows one build per project at a time, so separate test and
+        lint invocations would queue; --parallel runs their tasks side by
+        side and --continue reports every failure, not just the first.
+        """
+        tasks = ("test", "lint") if tests else ("lint",)
+        self.info(f"Running {' and '.join(tasks)}...")
+        
+        if not self.gradle("--parallel", "--continue", *tasks):
+            self.error("Checks failed")
+            return False
+        
+        self.success("All checks passed")
+        return True
+    
     def generate_build_report(self) -> bool:
         """Generate build report"""
         self.info("Generating build report...")
@@ -183,7 +283,10 @@ class BuildManager:
         report = {
             "timestamp": self.timestamp,
             "project": "ExaminerAI",
-            "builds_completed": [],
+            "builds_completed": self.metrics.steps,
+            "timing": self.metrics.summary(self.step_graph["elapsed_s"] if self.step_graph else None),
+            "diagnostics": self.metrics.diagnostics(),
+            "step_graph": self.step_graph,
             "artifacts": []
         }
         
@@ -202,6 +305,8 @@ class BuildManager:
                 "size_mb": aab.stat().st_size / (1024 * 1024)
             })
         
+        self._attribute_sizes(report)
+        
         report_path = self.project_root / f"build-report-{self.timestamp}.json"
         with open(report_path, 'w') as f:
             json.dump(report, f, indent=2)
@@ -209,73 +314,158 @@ class BuildManager:
         self.success(f"Build report saved to {report_path}")
         return True
     
+    def _previous_report(self) -> dict:
+        """Most recent earlier build report, or None"""
+        for path in sorted(self.project_root.glob("build-report-*.json"), reverse=True):
+            if path.name == f"build-report-{self.timestamp}.json":
+                continue
+            try:
+                with open(path) as f:
+                    return {"path": path.name, **json.load(f)}
+            except (OSError, ValueError):
+                continue
+        return None
+    
+    def _attribute_sizes(self, report: dict):
+        """Add a size breakdown to every artifact and diff it against the previous report"""
+        artifacts = report["artifacts"]
+        if not artifacts:
+            return
+        try:
+            breakdowns = apk_size.size_breakdowns([a["path"] for a in artifacts])
+        except Exception as e:
+            self.error(f"Size attribution failed: {e}")
+            return
+        for artifact, breakdown in zip(artifacts, breakdowns):
+            artifact["breakdown"] = breakdown
+        
+        previous = self._previous_report()
+        if previous is None:
+            return
+        # Gradle output names (app-debug.apk, app-release.aab) are stable across builds
+        before = {Path(a["path"]).name: a["breakdown"]
+                  for a in previous.get("artifacts", []) if "breakdown" in a}
+        diffs = {}
+        for artifact in artifacts:
+            name = Path(artifact["path"]).name
+            if name in before:
+                diffs[name] = apk_size.diff_breakdowns(before[name], artifact["breakdown"])
+        report["size_diff"] = {"against": previous["path"], "artifacts": diffs}
+        for name, diff in diffs.items():
+            self.info(f"{name} vs {previous['path']}:")
+            apk_size.print_diff(diff)
+    
+    def _ready_devices(self, fanout: DeviceFanout) -> list:
+        try:
+            ready, unavailable = fanout.devices()
+        except RuntimeError as e:
+            self.error(f"adb devices failed: {e}")
+            return []
+        for serial, state in unavailable:
+            self.error(f"{serial} skipped ({state})")
+        if not ready:
+            self.error("No devices connected")
+        return ready
+    
+    def _report_devices(self, results: list) -> bool:
+        for result in results:
+            label = f"{result.serial} {result.model}".strip()
+            if result.ok:
+                self.success(f"{label}: {result.detail} ({result.elapsed:.1f}s)")
+            else:
+                self.error(f"{label}: {result.detail} ({result.elapsed:.1f}s)")
+        return bool(results) and all(result.ok for result in results)
+    
+    def _debug_apk(self, apk_path: str = None) -> Path:
+        return Path(apk_path) if apk_path else self.android_dir / "app/build/outputs/apk/debug/app-debug.apk"
+    
+    @timed_step("install")
     def install_on_device(self, apk_path: str = None) -> bool:
-        """Install APK on connected device"""
-        self.info("Installing APK on device...")
-        
-        if not apk_path:
-            apk_path = self.android_dir / "app/build/outputs/apk/debug/app-debug.apk"
+        """Install APK on every connected device at once"""
+        self.info("Installing APK on devices...")
         
-        if not Path(apk_path).exists():
+        apk_path = self._debug_apk(apk_path)
+        if not apk_path.exists():
             self.error(f"APK not found at {apk_path}")
             return False
         
-        if not self.run_command(f"adb install -r {apk_path}"):
+        fanout = DeviceFanout(serials=self.devices, run=self.metrics.bind(self.run_captured))
+        devices = self._ready_devices(fanout)
+        if not devices:
+            return False
+        
+        if not self._report_devices(fanout.install_all(devices, apk_path)):
             self.error("Installation failed")
             return False
         
-        self.success("APK installed successfully")
+        self.success(f"APK installed on {len(devices)} device(s)")
         return True
     
-    def run_on_device(self) -> bool:
-        """Run app on connected device"""
-        self.info("Running app on device...")
+    @timed_step("run")
+    def run_on_device(self, apk_path: str = None) -> bool:
+        """Run app on every connected device at once"""
+        self.info("Running app on devices...")
+        
+        component = launch_component(self._debug_apk(apk_path))
+        fanout = DeviceFanout(serials=self.devices, run=self.metrics.bind(self.run_captured))
+        devices = self._ready_devices(fanout)
+        if not devices:
+            return False
         
-        cmd = "adb shell am start -n com.example.examinerai/.MainActivity"
-        if not self.run_command(cmd):
+        if not self._report_devices(fanout.launch_all(devices, component)):
             self.error("Failed to start app")
             return False
         
-        self.success("App started on device")
+        self.success(f"App started on {len(devices)} device(s)")
         return True
     
+    def add_step(self, name: str, fn, after=("environment",), required: bool = True, resource: str = None):
+        """Register a custom step for build_all: fn() -> bool runs once its dependencies succeed
+
+        Steps that drive Gradle should pass resource="gradle" so they never
+        overlap another Gradle invocation on the same project.
+        """
+        self.custom_steps.append((name, fn, tuple(after), required, resource))
+    
+    def _timed(self, name: str, fn):
+        def step():
+            with self.metrics.step(name) as record:
+                record["ok"] = bool(fn())
+                return record["ok"]
+        return step
+    
+    def build_graph(self, skip_tests: bool = False) -> StepGraph:
+        """The build_all steps and their dependencies, custom steps included"""
+        graph = StepGraph(self.jobs)
+        graph.add("prerequisites", self.check_prerequisites)
+        graph.add("environment", self.setup_environment, after=["prerequisites"])
+        # Gradle runs one build per project at a time; its steps share the
+        # "gradle" resource and the variants go first so that collecting the
+        # outputs overlaps with the checks, which run tests and lint together
+        graph.add("variants", self.build_variants, after=["environment"], resource="gradle")
+        graph.add("checks", lambda: self.run_checks(tests=not skip_tests), after=["environment"],
+                  required=False, resource="gradle")
+        graph.add("debug_apk", self._timed("debug_apk", self._collect_apk_debug), after=["variants"])
+        graph.add("release_apk", self._timed("release_apk", self._collect_apk_release), after=["variants"])
+        graph.add("aab", self._timed("aab", self._collect_aab), after=["variants"])
+        for name, fn, after, required, resource in self.custom_steps:
+            graph.add(name, self._timed(name, fn), after, required, resource)
+        return graph
+    
     def build_all(self, skip_tests: bool = False) -> bool:
-        """Build everything (APK, AAB)"""
+        """Build everything (APK, AAB) as a graph of concurrent steps"""
         self.info("Starting complete build process...")
         self.info(f"Timestamp: {self.timestamp}")
         
-        # Check prerequisites
-        if not self.check_prerequisites():
-            self.error("Prerequisites check failed")
-            return False
-        
-        # Setup environment
-        if not self.setup_environment():
-            self.error("Environment setup failed")
-            return False
-        
-        # Optional: Run tests
-        if not skip_tests:
-            if not self.run_tests():
-                self.error("Tests failed - continuing anyway")
-        
-        # Run lint
-        if not self.run_lint():
-            self.error("Lint check failed - continuing anyway")
-        
-        # Build APK (debug)
-        if not self.build_apk_debug():
-            self.error("Debug APK build failed")
-            return False
-        
-        # Build APK (release)
-        if not self.build_apk_release():
-            self.error("Release APK build failed")
-            return False
+        graph = self.build_graph(skip_tests)
+        ok = graph.run()
+        graph.print_summary()
+        self.step_graph = graph.summary()
         
-        # Build AAB
-        if not self.build_aab():
-            self.error("AAB build failed")
+        if not ok:
+            failed = [name for name, r in graph.results.items()
+                      if r.status != "ok" and graph.steps[name].required]
+            self.error(f"Build failed: {', '.join(failed)}")
             return False
         
         # Generate report
@@ -324,6 +514,44 @@ def main():
         action="store_true",
         help="Run app on device"
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild the debug APK whenever android-app/ changes (with --install/--run: deploy each build)"
+    )
+    parser.add_argument(
+        "--devices",
+        nargs="+",
+        metavar="SERIAL",
+        help="Limit --install/--run to these devices (default: all connected)"
+    )
+    parser.add_argument(
+        "--keep-releases",
+        type=int,
+        default=DEFAULT_KEEP,
+        metavar="N",
+        help=f"Keep the newest N untagged releases of each artifact (0 keeps all, default {DEFAULT_KEEP})"
+    )
+    parser.add_argument(
+        "--tag",
+        action="append",
+        default=[],
+        help="Tag this build's releases so pruning never removes them"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_PARALLELISM,
+        metavar="N",
+        help=f"Run up to N independent --all steps at once (default {DEFAULT_PARALLELISM})"
+    )
+    parser.add_argument(
+        "--step",
+        action="append",
+        default=[],
+        metavar="NAME[:AFTER,...]=COMMAND",
+        help="Add a shell command step to --all, after the given steps (default: environment)"
+    )
     parser.add_argument(
         "--test",
         action="store_true",
@@ -339,18 +567,36 @@ def main():
         action="store_true",
         help="Skip tests when building"
     )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Run 'gradlew clean' before building"
+    )
     
     args = parser.parse_args()
     
-    manager = BuildManager()
+    manager = BuildManager(clean=args.clean, devices=args.devices,
+                           keep_releases=args.keep_releases, release_tags=args.tag, jobs=args.jobs)
+    for spec in args.step:
+        name, _, command = spec.partition("=")
+        name, _, after = name.partition(":")
+        if not name or not command:
+            parser.error(f"--step expects NAME[:AFTER,...]=COMMAND, got {spec!r}")
+        manager.add_step(name, lambda command=command: manager.run_command(command),
+                         after=after.split(",") if after else ("environment",),
+                         resource="gradle" if "gradlew" in command else None)
     
     # If no args provided, show help
-    if not any(vars(args).values()):
+    if not any(value for name, value in vars(args).items() if name not in ("keep_releases", "jobs")):
         parser.print_help()
         return
     
     # Execute requested operations
     try:
+        if args.watch:
+            watch(manager, install=args.install, run=args.run)
+            return
+        
         if args.all:
             manager.build_all(skip_tests=args.skip_tests)
         
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Build step instrumentation for BuildManager
+Records wall/CPU time, exit codes and peak RSS of every step's
+subprocesses, plus Gradle task timings parsed from --profile reports
+"""
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_PROFILE_ROW = re.compile(
+    r'<td>(:[^<]+)</td>\s*<td class="numeric">([^<]+)</td>\s*<td>([^<]*)</td>')
+_DURATION_PART = re.compile(r'([\d.]+)(ms|h|m|s)')
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(text: str):
+    """'1m2.345s' -> 62.345 (None when the cell is not a duration)"""
+    parts = _DURATION_PART.findall(text.strip())
+    if not parts:
+        return None
+    return round(sum(float(value) * _DURATION_UNITS[unit] for value, unit in parts), 3)
+
+
+def parse_gradle_profile(path: Path) -> list:
+    """Extract per-task timings from a Gradle --profile HTML report"""
+    html = path.read_text(encoding="utf-8", errors="replace")
+    # Only the "Task Execution" tab lists individual tasks
+    start = html.find("Task Execution")
+    if start >= 0:
+        html = html[start:]
+    tasks = []
+    for name, duration, result in _PROFILE_ROW.findall(html):
+        seconds = parse_duration(duration)
+        # Per-project "(total)" rows are not tasks
+        if seconds is None or result.strip() == "(total)":
+            continue
+        tasks.append({"task": name, "seconds": seconds, "result": result.strip()})
+    tasks.sort(key=lambda t: t["seconds"], reverse=True)
+    return tasks
+
+
+def _maxrss_mb(rusage) -> float:
+    # ru_maxrss is bytes on macOS and kilobytes everywhere else
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rusage.ru_maxrss / divisor, 1)
+
+
+def wait_with_usage(proc):
+    """Wait for a Popen and return (exit_code, rusage or None)"""
+    if hasattr(os, "wait4"):
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return proc.returncode, rusage
+    return proc.wait(), None
+
+
+class BuildMetrics:
+    """Collect one record per BuildManager step"""
+
+    def __init__(self, profile_dir: Path = None):
+        self.profile_dir = profile_dir
+        self.steps = []
+        # Steps may run concurrently; each thread attributes commands to its own step
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_step(self) -> str:
+        """Name of the innermost step running on this thread, or None"""
+        return self._stack[-1]["step"] if self._stack else None
+
+    def bind(self, fn):
+        """Wrap fn so the commands it records go to the calling thread's step
+
+        Use it for work handed to helper threads (e.g. one per device), which
+        would otherwise start with an empty step stack.
+        """
+        stack = list(self._stack)
+
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            saved = self._stack
+            self._local.stack = list(stack)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.stack = saved
+        return bound
+
+    @contextmanager
+    def step(self, name: str):
+        record = {"step": name, "ok": False, "commands": []}
+        started = time.time()
+        wall0 = time.perf_counter()
+        thread0 = time.thread_time()
+        self._stack.append(record)
+        try:
+            yield record
+        finally:
+            self._stack.pop()
+            commands = record["commands"]
+            record["wall_s"] = round(time.perf_counter() - wall0, 3)
+            # Process-wide os.times() would mix in concurrent steps: count this
+            # thread's own CPU plus the rusage of the commands it waited for
+            record["cpu_user_s"] = round(time.thread_time() - thread0
+                                         + sum(c.get("cpu_user_s", 0) for c in commands), 3)
+            record["cpu_system_s"] = round(sum(c.get("cpu_system_s", 0) for c in commands), 3)
+            rss = [c["peak_rss_mb"] for c in commands if c.get("peak_rss_mb") is not None]
+            record["peak_rss_mb"] = max(rss) if rss else None
+            ran_gradle = any("gradlew" in c["command"] for c in commands)
+            record["gradle_tasks"] = self._gradle_tasks_since(started) if ran_gradle else []
+            self.steps.append(record)
+
+    def record_command(self, command, exit_code, wall_s, rusage=None):
+        """Attach one subprocess result to the innermost running step"""
+        entry = {"command": command, "exit_code": exit_code, "wall_s": round(wall_s, 3)}
+        if rusage is not None:
+            entry["cpu_user_s"] = round(rusage.ru_utime, 3)
+            entry["cpu_system_s"] = round(rusage.ru_stime, 3)
+            entry["peak_rss_mb"] = _maxrss_mb(rusage)
+        if self._stack:
+            self._stack[-1]["commands"].append(entry)
+        return entry
+
+    def _gradle_tasks_since(self, started: float) -> list:
+        if not self.profile_dir or not self.profile_dir.exists():
+            return []
+        tasks = []
+        for report in sorted(self.profile_dir.glob("profile-*.html")):
+            if report.stat().st_mtime >= started:
+                tasks.extend(parse_gradle_profile(report))
+        return tasks
+
+    def diagnostics(self, limit: int = 50) -> dict:
+        """Warning/error counts and the first messages of every recorded command"""
+        counts = {"warning": 0, "error": 0}
+        messages = {"warning": [], "error": []}
+        for record in self.steps:
+            for command in record["commands"]:
+                for level, count in command.get("diagnostic_counts", {}).items():
+                    counts[level] = counts.get(level, 0) + count
+                for diagnostic in command.get("diagnostics", []):
+                    bucket = messages.setdefault(diagnostic["level"], [])
+                    if len(bucket) < limit:
+                        bucket.append({"step": record["step"], **diagnostic})
+        return {"counts": counts, "warnings": messages["warning"], "errors": messages["error"]}
+
+    def summary(self, elapsed_s: float = None) -> dict:
+        """Totals over all steps; pass elapsed_s when steps ran concurrently
+
+        Summed step wall times overstate a run whose steps overlapped.
+        """
+        wall_s = elapsed_s if elapsed_s is not None else sum(s["wall_s"] for s in self.steps)
+        return {
+            "steps": len(self.steps),
+            "failed_steps": [s["step"] for s in self.steps if not s["ok"]],
+            "wall_s": round(wall_s, 3),
+            "cpu_s": round(sum(s["cpu_user_s"] + s["cpu_system_s"] for s in self.steps), 3),
+        }
+
+
+def timed_step(name: str):
+    """Decorate a BuildManager method so it is recorded as a build step"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.step(name) as record:
+                ok = method(self, *args, **kwargs)
+                record["ok"] = bool(ok)
+                return ok
+        return wrapper
+    return decorator
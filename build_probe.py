@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Concurrent toolchain probing for BuildManager
+Runs every "--version" probe at once with its own timeout and remembers
+the answers on disk, keyed by the resolved executable and its mtime
+"""
+import json
+import os
+import shutil
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ProbeResult = namedtuple('ProbeResult', 'name ok version path error cached')
+
+DEFAULT_PROBES = [
+    ("Java", ["java", "-version"]),
+    ("Gradle", ["gradle", "-version"]),
+    ("Python", ["python", "--version"]),
+    ("Git", ["git", "--version"]),
+]
+DEFAULT_TIMEOUT = 30
+
+
+class ToolchainProber:
+    """Probe tool versions concurrently with an on-disk result cache"""
+
+    def __init__(self, cache_path: Path = None, timeout: float = DEFAULT_TIMEOUT):
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self._cache = self._load()
+
+    def _load(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.cache_path.with_suffix(".tmp")
+        with open(partial, 'w') as f:
+            json.dump(self._cache, f, indent=2)
+        os.replace(partial, self.cache_path)
+
+    def probe(self, name: str, command: list) -> ProbeResult:
+        """Run one probe, answering from the cache when the binary is unchanged"""
+        executable = shutil.which(command[0])
+        if not executable:
+            return ProbeResult(name, False, None, None, "not found on PATH", False)
+        resolved = os.path.realpath(executable)
+
+        key = f"{resolved}|{os.stat(resolved).st_mtime_ns}|{' '.join(command[1:])}"
+        hit = self._cache.get(key)
+        if hit and hit["ok"]:
+            return ProbeResult(name, True, hit["version"], resolved, None, True)
+
+        try:
+            result = subprocess.run([executable] + command[1:], capture_output=True,
+                                    text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return ProbeResult(name, False, None, resolved, f"timed out after {self.timeout}s", False)
+        except OSError as e:
+            return ProbeResult(name, False, None, resolved, str(e), False)
+
+        output = (result.stdout.strip() or result.stderr.strip()).splitlines()
+        version = output[0] if output else ""
+        ok = result.returncode == 0
+        error = None if ok else f"exit code {result.returncode}"
+        if ok:
+            # A failure may be transient (a JDK mid-install, a license prompt); always retry it
+            self._cache[key] = {"ok": ok, "version": version}
+        else:
+            self._cache.pop(key, None)
+        return ProbeResult(name, ok, version, resolved, error, False)
+
+    def probe_all(self, probes=DEFAULT_PROBES) -> list:
+        """Run all probes at once; results keep the order of probes"""
+        with ThreadPoolExecutor(max_workers=max(1, len(probes))) as pool:
+            results = list(pool.map(lambda p: self.probe(*p), probes))
+        self._save()
+        return results
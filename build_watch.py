@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Watch mode for BuildManager
+Watches android-app/ (inotify on Linux, mtime polling elsewhere), waits
+for a burst of edits to settle, then runs only the Gradle tasks those
+edits affect on the already-warm daemon
+"""
+import abc
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import time
+from pathlib import Path, PurePath
+
+from build_log import prune_logs
+
+DEBOUNCE_S = 0.5
+POLL_INTERVAL_S = 1.0
+IGNORED_DIRS = {"build", ".gradle", ".idea", ".git", ".cxx", ".kotlin", "captures"}
+IGNORED_NAMES = (".*", "*~", "*.swp", "*.tmp", "4913")  # editor swap and backup files
+CONFIG_FILES = ("*.gradle", "*.gradle.kts", "gradle.properties", "*.versions.toml", "proguard-rules.pro")
+ASSEMBLE = "assembleDebug"
+UNIT_TESTS = "testDebugUnitTest"
+EVERYTHING = "*"
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+def _ignored(name):
+    return name in IGNORED_DIRS or any(fnmatch.fnmatchcase(name, p) for p in IGNORED_NAMES)
+
+
+class Watcher(abc.ABC):
+    """Base watcher: read(timeout) returns the set of changed relative paths"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @abc.abstractmethod
+    def read(self, timeout):
+        """Changed paths seen within timeout seconds (None waits forever)"""
+
+    def changes(self, debounce=DEBOUNCE_S):
+        """Block until something changes, then until debounce seconds pass quietly"""
+        changed = set()
+        while not changed:
+            changed = self.read(None)
+        while True:
+            more = self.read(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InotifyWatcher(Watcher):
+    """Recursive inotify watch through libc, adding watches for new directories"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        self._add_tree(self.root)
+
+    def _add_tree(self, directory):
+        for current, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not _ignored(d)]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = Path(current)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(EVERYTHING)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            name = os.fsdecode(name)
+            if directory is None or not name or _ignored(name):
+                continue
+            path = directory / name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files written into a new directory before its watch exists count too
+                self._add_tree(path)
+                changed.update(str(p.relative_to(self.root)) for p in path.rglob("*") if p.is_file())
+            changed.add(str(path.relative_to(self.root)))
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher(Watcher):
+    """Portable fallback: compare (mtime, size) snapshots of the tree"""
+
+    def __init__(self, root, interval=POLL_INTERVAL_S):
+        super().__init__(root)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for current, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not _ignored(d)]
+            for name in files:
+                if _ignored(name):
+                    continue
+                path = os.path.join(current, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[os.path.relpath(path, self.root)] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+            snapshot = self._scan()
+            changed = {path for path in set(snapshot) | set(self._snapshot)
+                       if snapshot.get(path) != self._snapshot.get(path)}
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def open_watcher(root):
+    """inotify where the platform has it, polling otherwise"""
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError):
+        return PollingWatcher(root)
+
+
+def tasks_for(paths):
+    """Narrowest Gradle task list covering the changed paths (may be empty)"""
+    tasks = set()
+    for path in paths:
+        if path == EVERYTHING:
+            tasks.add(ASSEMBLE)
+            continue
+        parts = PurePath(path).parts
+        if any(fnmatch.fnmatchcase(parts[-1], p) for p in CONFIG_FILES):
+            tasks.add(ASSEMBLE)
+        elif "src" in parts[:-1]:
+            source_set = parts[parts.index("src") + 1]
+            if source_set == "test":
+                tasks.add(UNIT_TESTS)
+            elif source_set != "androidTest":
+                # Kotlin/Java sources, res/, assets/ and the manifest all feed the APK
+                tasks.add(ASSEMBLE)
+    return sorted(tasks)
+
+
+def watch(manager, install=False, run=False, debounce=DEBOUNCE_S):
+    """Rebuild on every settled burst of relevant edits until Ctrl-C"""
+    with open_watcher(manager.android_dir) as watcher:
+        kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+        manager.info(f"Watching {manager.android_dir} ({kind}); Ctrl-C to stop")
+        # The first cycle starts the daemon and fills the incremental caches
+        pending = [ASSEMBLE]
+        while True:
+            if pending:
+                started = time.perf_counter()
+                ok = manager.gradle(*pending)
+                if ok and ASSEMBLE in pending:
+                    if install:
+                        ok = manager.install_on_device()
+                    if ok and run:
+                        ok = manager.run_on_device()
+                elapsed = time.perf_counter() - started
+                if ok:
+                    manager.success(f"{' '.join(pending)} done in {elapsed:.1f}s")
+                else:
+                    manager.error(f"{' '.join(pending)} failed after {elapsed:.1f}s")
+                # Every cycle writes a log; a long session must not grow build-logs/ forever
+                if manager.log_dir.exists():
+                    prune_logs(manager.log_dir)
+            changed = watcher.changes(debounce)
+            pending = tasks_for(changed)
+            shown = ", ".join(sorted(changed)[:3]) + (f" (+{len(changed) - 3})" if len(changed) > 3 else "")
+            if pending:
+                manager.info(f"Changed: {shown}")
+            else:
+                print(f"  (ignored: {shown})")
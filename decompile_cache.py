@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Content-addressed decompilation cache
+Stores the Java tree generated for each DEX under the SHA-256 of the DEX
+plus the decompiler identity, with size-bounded LRU eviction
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(".decompile-cache")
+DEFAULT_MAX_MB = 4096
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tool_id(name, tool_path=None, version=None, flags=()):
+    """Identify a decompiler build: name, version (or jar digest) and flags"""
+    if version is None and tool_path and Path(tool_path).is_file():
+        version = file_sha256(tool_path)[:16]
+    return f"{name}:{version or 'unknown'}:{' '.join(flags)}"
+
+
+def _tree_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _has_java(path):
+    return next(Path(path).rglob("*.java"), None) is not None
+
+
+class DecompileCache:
+    """Map (DEX digest, decompiler id) -> decompiled Java tree"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.entries_dir = self.root / "entries"
+        self.index_path = self.root / "index.json"
+        self._lock = threading.Lock()
+        # Entries being copied out; eviction leaves them alone
+        self._pinned = Counter()
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self._index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        partial = self.index_path.with_suffix(".tmp")
+        with open(partial, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(partial, self.index_path)
+
+    def key(self, dex_path, tool):
+        return hashlib.sha256(f"{file_sha256(dex_path)}|{tool}".encode()).hexdigest()
+
+    def _copy_out(self, key, output_dir):
+        """Copy a pinned entry into output_dir, then unpin it"""
+        try:
+            shutil.copytree(self.entries_dir / key, output_dir, dirs_exist_ok=True)
+        finally:
+            with self._lock:
+                self._pinned[key] -= 1
+                if not self._pinned[key]:
+                    del self._pinned[key]
+
+    def restore(self, key, output_dir):
+        """Copy a cached tree into output_dir; False on a miss"""
+        entry = self.entries_dir / key
+        with self._lock:
+            if key not in self._index or not entry.is_dir():
+                self.misses += 1
+                return False
+            if not self._index[key]["size"] or not _has_java(entry):
+                # Written by an older version that cached failed runs
+                del self._index[key]
+                shutil.rmtree(entry, ignore_errors=True)
+                self._save_index()
+                self.misses += 1
+                return False
+            self._index[key]["last_used"] = time.time()
+            self._save_index()
+            self._pinned[key] += 1
+            self.hits += 1
+        self._copy_out(key, output_dir)
+        return True
+
+    def store(self, key, tree_dir):
+        """Move a freshly decompiled tree into the cache and evict LRU entries
+
+        The new entry comes back pinned; release it with _copy_out.
+        """
+        entry = self.entries_dir / key
+        size = _tree_size(tree_dir)
+        with self._lock:
+            if entry.exists() and not self._pinned[key]:
+                shutil.rmtree(entry)
+            if not entry.exists():
+                os.replace(tree_dir, entry)
+            self._index[key] = {"size": size, "last_used": time.time()}
+            self._pinned[key] += 1
+            self._evict()
+            self._save_index()
+        return entry
+
+    def _evict(self):
+        total = sum(e["size"] for e in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if self._pinned[key]:
+                continue
+            total -= self._index.pop(key)["size"]
+            shutil.rmtree(self.entries_dir / key, ignore_errors=True)
+
+    def wrap(self, make_task, output_dir, tool):
+        """Wrap a scheduler task factory so each DEX goes through the cache.
+
+        make_task(out_dir) must return a task(dex, timeout) that decompiles
+        into out_dir. On a hit the cached tree is copied into output_dir;
+        on a miss the task runs into a private staging directory that is
+        then cached and merged into output_dir.
+        """
+        output_dir = Path(output_dir)
+
+        def task(dex_file, timeout):
+            key = self.key(dex_file, tool)
+            if self.restore(key, output_dir):
+                return True
+
+            staging = Path(tempfile.mkdtemp(prefix="staging-", dir=self.root))
+            try:
+                if not make_task(staging)(dex_file, timeout):
+                    return False
+                if not _has_java(staging):
+                    # Nothing decompiled: pass the result through, never cache it
+                    shutil.copytree(staging, output_dir, dirs_exist_ok=True)
+                    return True
+                self.store(key, staging)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            self._copy_out(key, output_dir)
+            return True
+        return task
+
+    def summary(self):
+        return f"cache: {self.hits} hits, {self.misses} misses"
+
+
+def add_arguments(parser):
+    """Register the shared cache flags on an argparse parser"""
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Decompile every DEX even if a cached result exists")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                        help="Decompilation cache directory")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_MB,
+                        help="Evict least recently used entries beyond this size")
+
+
+def from_args(args):
+    """Return a DecompileCache, or None when --no-cache was given"""
+    if args.no_cache:
+        return None
+    return DecompileCache(args.cache_dir, args.cache_size_mb)
+
+
+def cached(cache, make_task, output_dir, tool):
+    """Return the task for output_dir, routed through cache when enabled"""
+    if cache is None:
+        return make_task(output_dir)
+    return cache.wrap(make_task, output_dir, tool)
@@ -9,6 +9,12 @@ import sys
 import json
 from pathlib import Path
 
+import decompile_pool
+from decompile_pool import DecompileScheduler, cfr_command, command_task
+import decompile_cache
+import jvm_worker
+from recovery_pipeline import recovery_pipeline
+
 def try_download_cfr_mirror():
     """Try alternative CFR download sources"""
     
@@ -37,8 +43,9 @@ def try_download_cfr_mirror():
     
     return None
 
-def decompile_with_cfr(cfr_path):
+def decompile_with_cfr(cfr_path, scheduler=None, cache=None, workers=None):
     """Decompile all DEX files with CFR"""
+    scheduler = scheduler or DecompileScheduler()
     
     print(f"\n🔄 Starting decompilation with CFR...\n")
     
@@ -50,33 +57,19 @@ def decompile_with_cfr(cfr_path):
     
     print(f"📊 Found {len(dex_files)} DEX files to decompile\n")
     
-    success_count = 0
-    for i, dex_file in enumerate(dex_files, 1):
-        try:
-            print(f"  [{i}/{len(dex_files)}] {dex_file.name}...", end=" ", flush=True)
-            
-            cmd = [
-                "java", "-jar", str(cfr_path),
-                str(dex_file),
-                "--outputdir", str(output_dir)
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, timeout=180, text=True)
-            
-            # CFR often exits with code 1 but still produces output
-            if output_dir.glob("**/*.java"):
-                print("✅")
-                success_count += 1
-            else:
-                print("⚠️")
-                success_count += 1
-                
-        except subprocess.TimeoutExpired:
-            print("⏱️ timeout")
-        except Exception as e:
-            print(f"❌")
+    # CFR often exits with code 1 but still produces output
+    def make_task(out, options):
+        if workers:
+            return workers.task(out, options)
+        return command_task(lambda dex: cfr_command(cfr_path, dex, out, scheduler.jvm_heap_mb))
+
+    pipeline = recovery_pipeline(output_dir, make_task, scheduler, cache, ("cfr", cfr_path), install_prefix=None)
+    recovered = pipeline.run(dex_files)
+    pipeline.print_summary()
+    success_count = pipeline.stage("decompile").items_out
     
-    print(f"\n✅ Decompilation complete: {success_count}/{len(dex_files)} processed\n")
+    print(f"\n✅ Decompilation complete: {success_count}/{len(dex_files)} processed, "
+          f"{len(recovered)} source files\n")
     return success_count > 0
 
 def restore_source_to_project():
@@ -109,6 +102,14 @@ def restore_source_to_project():
     return True
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decompile DEX files with CFR")
+    decompile_pool.add_arguments(parser)
+    decompile_cache.add_arguments(parser)
+    jvm_worker.add_arguments(parser)
+    args = parser.parse_args()
+
     print("=" * 70)
     print("🚀 SOURCE CODE RECOVERY - CFR DECOMPILATION")
     print("=" * 70)
@@ -133,7 +134,14 @@ def main():
         print(f"✅ CFR found at: {cfr_path}\n")
     
     # Step 2: Decompile
-    if not decompile_with_cfr(cfr_path):
+    scheduler = decompile_pool.from_args(args)
+    workers = jvm_worker.from_args(args, scheduler, cfr_path)
+    try:
+        decompiled = decompile_with_cfr(cfr_path, scheduler, decompile_cache.from_args(args), workers)
+    finally:
+        if workers:
+            workers.close()
+    if not decompiled:
         print("❌ Decompilation failed")
         return False
     
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Bounded parallel scheduler for per-DEX decompilation
+Runs several CFR/JADX subprocesses at once, capped by CPU count and by
+how many JVM heaps fit in the memory that is currently available
+"""
+import os
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+DEFAULT_TIMEOUT = 180
+DEFAULT_RETRIES = 1
+DEFAULT_JVM_HEAP_MB = 1536
+
+DecompileResult = namedtuple('DecompileResult', 'item ok attempts elapsed error')
+
+
+def available_memory_mb():
+    """Best-effort available physical memory in MB (None if unknown)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def jvm_slots(jvm_heap_mb=DEFAULT_JVM_HEAP_MB):
+    """How many JVMs of jvm_heap_mb fit in available memory (None if unknown)"""
+    free_mb = available_memory_mb()
+    if free_mb is None:
+        return None
+    return max(1, free_mb // jvm_heap_mb)
+
+
+def cfr_command(cfr_jar, input_file, output_dir, heap_mb=None, extra_args=()):
+    cmd = ["java"]
+    if heap_mb:
+        cmd.append(f"-Xmx{heap_mb}m")
+    cmd += ["-jar", str(cfr_jar), str(input_file), "--outputdir", str(output_dir)]
+    return cmd + list(extra_args)
+
+
+def jadx_command(jadx_exe, input_file, output_dir, extra_args=()):
+    return [str(jadx_exe), "-d", str(output_dir)] + list(extra_args) + [str(input_file)]
+
+
+def command_task(build_command, accept=None):
+    """Wrap a command builder as a scheduler task.
+
+    build_command(item) returns the argv to run; accept(item, completed)
+    decides success and defaults to "the process ran to completion", since
+    CFR and JADX both exit non-zero on warnings.
+    """
+    def task(item, timeout):
+        completed = subprocess.run(build_command(item), capture_output=True, timeout=timeout)
+        if accept is None:
+            return True
+        return accept(item, completed)
+    return task
+
+
+class DecompileScheduler:
+    """Run one decompile task per DEX on a bounded worker pool"""
+
+    def __init__(self, workers=None, max_jvms=None, jvm_heap_mb=DEFAULT_JVM_HEAP_MB,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        self.jvm_heap_mb = jvm_heap_mb
+        self.timeout = timeout
+        self.retries = retries
+
+        workers = workers or os.cpu_count() or 1
+        if max_jvms is None:
+            max_jvms = jvm_slots(jvm_heap_mb)
+        self.workers = max(1, min(workers, max_jvms) if max_jvms else workers)
+
+    def attempt(self, task, item):
+        """Run task on one item with the scheduler's timeout and retries"""
+        start = time.monotonic()
+        error = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                if task(item, self.timeout):
+                    return DecompileResult(item, True, attempt, time.monotonic() - start, None)
+                error = "no output"
+            except subprocess.TimeoutExpired:
+                error = f"timeout after {self.timeout}s"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        return DecompileResult(item, False, self.retries + 1, time.monotonic() - start, error)
+
+    def run(self, items, task):
+        """Yield a DecompileResult for each item as soon as it finishes"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.attempt, task, item) for item in items]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run_all(self, items, task, label=lambda item: Path(item).name):
+        """Run every item, printing one line per result; returns success count"""
+        items = list(items)
+        total = len(items)
+        print(f"  ⚙️  {total} jobs on {self.workers} workers "
+              f"(timeout {self.timeout}s, {self.retries} retries)")
+
+        success_count = 0
+        for done, result in enumerate(self.run(items, task), 1):
+            status = "✓" if result.ok else f"❌ {result.error}"
+            retry = f", {result.attempts} attempts" if result.attempts > 1 else ""
+            print(f"  [{done}/{total}] {label(result.item)} {status} ({result.elapsed:.1f}s{retry})")
+            if result.ok:
+                success_count += 1
+        return success_count
+
+
+def add_arguments(parser, timeout=DEFAULT_TIMEOUT):
+    """Register the shared scheduler flags on an argparse parser"""
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel decompiler processes (default: CPU count)")
+    parser.add_argument("--max-jvms", type=int, default=None,
+                        help="Cap on concurrent JVMs (default: from available memory)")
+    parser.add_argument("--timeout", type=int, default=timeout,
+                        help="Per-DEX timeout in seconds")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="Retries for a DEX that fails or times out")
+
+
+def from_args(args):
+    return DecompileScheduler(workers=args.workers, max_jvms=args.max_jvms,
+                              timeout=args.timeout, retries=args.retries)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Parallel install and launch on every connected Android device
+Enumerates `adb devices`, then runs the same adb steps on each device
+at once and returns one result per device
+"""
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from apk_manifest import read_manifest
+
+Device = namedtuple('Device', 'serial state model')
+DeviceResult = namedtuple('DeviceResult', 'serial model ok elapsed detail')
+
+DEFAULT_COMPONENT = "com.example.examinerai/.MainActivity"
+DEFAULT_TIMEOUT = 300
+# adb streams the APK straight into `cmd package` on Android 7+; Android 11
+# can also install incrementally when the APK has a v4 signature (.idsig)
+STREAMING_SDK = 24
+INCREMENTAL_SDK = 30
+
+
+def run_adb(args: list, timeout: float = DEFAULT_TIMEOUT) -> tuple:
+    """Run one adb command; returns (exit code or None, combined output)"""
+    try:
+        proc = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return None, str(e)
+    return proc.returncode, (proc.stdout + proc.stderr).strip()
+
+
+def list_devices(adb: str = "adb", run=run_adb) -> list:
+    """Every device `adb devices -l` reports, ready or not"""
+    exit_code, output = run([adb, "devices", "-l"])
+    if exit_code != 0:
+        raise RuntimeError(output or "adb devices failed")
+    devices = []
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) < 2 or line.startswith(("List of devices", "*")):
+            continue
+        props = dict(field.split(":", 1) for field in fields[2:] if ":" in field)
+        devices.append(Device(fields[0], fields[1], props.get("model", "")))
+    return devices
+
+
+def install_flags(apk_path: Path, sdk: int) -> list:
+    """Fastest `adb install` mode the device supports"""
+    if sdk >= INCREMENTAL_SDK and Path(f"{apk_path}.idsig").exists():
+        return ["--incremental"]
+    if sdk >= STREAMING_SDK:
+        return ["--streaming"]
+    return ["--no-streaming"]
+
+
+def launch_component(apk_path: Path) -> str:
+    """package/activity of the APK's launcher activity, from its manifest"""
+    try:
+        manifest = read_manifest(apk_path)
+    except Exception:
+        return DEFAULT_COMPONENT
+    if not manifest.package or not manifest.launcher:
+        return DEFAULT_COMPONENT
+    return f"{manifest.package}/{manifest.launcher}"
+
+
+class DeviceFanout:
+    """Run install and launch steps on many devices concurrently"""
+
+    def __init__(self, adb: str = "adb", serials: list = None, run=run_adb):
+        self.adb = adb
+        self.serials = serials
+        self.run = run
+
+    def devices(self) -> tuple:
+        """(ready devices, [(serial, state)] of devices that cannot be used)"""
+        ready, unavailable = [], []
+        for device in list_devices(self.adb, self.run):
+            if self.serials and device.serial not in self.serials:
+                continue
+            if device.state == "device":
+                ready.append(device)
+            else:
+                unavailable.append((device.serial, device.state))
+        if self.serials:
+            found = {device.serial for device in ready} | {serial for serial, _ in unavailable}
+            unavailable += [(serial, "not connected") for serial in self.serials if serial not in found]
+        return ready, unavailable
+
+    def _adb(self, device: Device, *args) -> tuple:
+        return self.run([self.adb, "-s", device.serial, *args])
+
+    def sdk_level(self, device: Device) -> int:
+        exit_code, output = self._adb(device, "shell", "getprop", "ro.build.version.sdk")
+        try:
+            return int(output) if exit_code == 0 else 0
+        except ValueError:
+            return 0
+
+    def install(self, device: Device, apk_path: Path) -> str:
+        """Install on one device; returns the mode used, raises on failure"""
+        flags = install_flags(apk_path, self.sdk_level(device))
+        exit_code, output = self._adb(device, "install", "-r", *flags, str(apk_path))
+        if exit_code != 0 and flags == ["--incremental"]:
+            # Incremental needs the device's data loader; streaming always works on 11+
+            flags = ["--streaming"]
+            exit_code, output = self._adb(device, "install", "-r", *flags, str(apk_path))
+        if exit_code != 0 or "Failure" in output:
+            raise RuntimeError(output.splitlines()[-1] if output else f"exit code {exit_code}")
+        return flags[0].lstrip("-")
+
+    def launch(self, device: Device, component: str) -> str:
+        """Start component on one device and wait for it to draw"""
+        exit_code, output = self._adb(device, "shell", "am", "start", "-W", "-n", component)
+        # am start exits 0 even when the activity does not exist
+        if exit_code != 0 or "Error" in output:
+            raise RuntimeError(next((line for line in output.splitlines() if "Error" in line), output))
+        total = next((line.split(":", 1)[1].strip() for line in output.splitlines()
+                      if line.startswith("TotalTime:")), None)
+        return f"started in {total} ms" if total else "started"
+
+    def for_each(self, devices: list, step) -> list:
+        """Run step(device) on every device at once; results keep device order"""
+        def attempt(device):
+            started = time.monotonic()
+            try:
+                detail, ok = step(device), True
+            except Exception as e:
+                detail, ok = str(e) or type(e).__name__, False
+            return DeviceResult(device.serial, device.model, ok, time.monotonic() - started, detail)
+
+        if not devices:
+            return []
+        with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            return list(pool.map(attempt, devices))
+
+    def install_all(self, devices: list, apk_path: Path) -> list:
+        return self.for_each(devices, lambda device: self.install(device, apk_path))
+
+    def launch_all(self, devices: list, component: str) -> list:
+        return self.for_each(devices, lambda device: self.launch(device, component))
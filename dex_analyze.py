@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Parallel structure analysis of every DEX file in one or more APKs
+Each worker process parses headers, map lists and class counts of one
+DEX and returns a compact summary; the summaries merge into one report
+"""
+import fnmatch
+import json
+import os
+import sys
+import zipfile
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dex_reader import DexFile
+
+DexSummary = namedtuple('DexSummary', 'source name size version strings types protos fields methods '
+                                      'classes sections packages error')
+
+DEX_PATTERNS = ("classes*.dex", "*/dex/classes*.dex")
+PACKAGE_DEPTH = 2
+
+MAP_TYPES = {
+    0x0000: "header", 0x0001: "string_ids", 0x0002: "type_ids", 0x0003: "proto_ids",
+    0x0004: "field_ids", 0x0005: "method_ids", 0x0006: "class_defs", 0x0007: "call_site_ids",
+    0x0008: "method_handles", 0x1000: "map_list", 0x1001: "type_lists",
+    0x1002: "annotation_set_ref_lists", 0x1003: "annotation_sets", 0x2000: "class_data",
+    0x2001: "code", 0x2002: "string_data", 0x2003: "debug_info", 0x2004: "annotations",
+    0x2005: "encoded_arrays", 0x2006: "annotations_directories", 0xF000: "hiddenapi_class_data",
+}
+
+
+def package_of(class_name, depth=PACKAGE_DEPTH):
+    """'androidx.compose.ui.Modifier' -> 'androidx.compose'"""
+    parts = class_name.split('.')[:-1]
+    return '.'.join(parts[:depth]) or '(default)'
+
+
+def _summarize(dex, source, name):
+    h = dex.header
+    items = sorted(dex.map_list(), key=lambda item: item.offset)
+    sections = {}
+    for item, following in zip(items, items[1:] + [None]):
+        end = following.offset if following else h.file_size
+        sections[MAP_TYPES.get(item.type, f"0x{item.type:04x}")] = (item.size, end - item.offset)
+    packages = Counter(package_of(class_name) for class_name in dex.class_names())
+    return DexSummary(source, name, h.file_size, dex.version, h.string_ids_size, h.type_ids_size,
+                      h.proto_ids_size, h.field_ids_size, h.method_ids_size, h.class_defs_size,
+                      sections, dict(packages), None)
+
+
+def summarize(job):
+    """Worker: summarize one (path, member) job; member None means path is a DEX file"""
+    path, member = job
+    # Loose DEX files are grouped by directory, archive members by archive
+    source = path if member else str(Path(path).parent)
+    name = member or Path(path).name
+    try:
+        if member is None:
+            with DexFile(path) as dex:
+                return _summarize(dex, source, name)
+        with DexFile.from_zip(path, member) as dex:
+            return _summarize(dex, source, name)
+    except Exception as e:
+        return DexSummary(source, name, 0, None, 0, 0, 0, 0, 0, 0, {}, {}, str(e))
+
+
+def iter_jobs(inputs):
+    """Expand DEX files, directories and APK/AAB archives into analysis jobs"""
+    for path in map(Path, inputs):
+        if path.is_dir():
+            for dex_file in sorted(path.glob("classes*.dex")):
+                yield str(dex_file), None
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                members = [n for n in zf.namelist() if any(fnmatch.fnmatchcase(n, p) for p in DEX_PATTERNS)]
+            for member in sorted(members):
+                yield str(path), member
+        else:
+            yield str(path), None
+
+
+def analyze(inputs, workers=None):
+    """Summarize every DEX in inputs across a process pool (results keep input order)"""
+    jobs = list(iter_jobs(inputs))
+    if not jobs:
+        return []
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers == 1:
+        return [summarize(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(summarize, jobs))
+
+
+def merge(summaries):
+    """Combine DEX summaries into one report with per-source and overall totals"""
+    fields = ("size", "strings", "types", "protos", "fields", "methods", "classes")
+    totals = Counter()
+    by_source = {}
+    packages = Counter()
+    sections = Counter()
+    for s in summaries:
+        if s.error:
+            continue
+        source = by_source.setdefault(s.source, Counter(dex_files=0))
+        source["dex_files"] += 1
+        for field in fields:
+            value = getattr(s, field)
+            source[field] += value
+            totals[field] += value
+        packages.update(s.packages)
+        for section, (_, size) in s.sections.items():
+            sections[section] += size
+    totals["dex_files"] = sum(1 for s in summaries if not s.error)
+    return {
+        "totals": dict(totals),
+        "sources": {source: dict(values) for source, values in by_source.items()},
+        "dex_files": [s._asdict() for s in summaries],
+        "packages": dict(packages.most_common()),
+        "section_bytes": dict(sections.most_common()),
+        "errors": {f"{s.source}:{s.name}": s.error for s in summaries if s.error},
+    }
+
+
+def print_report(report, top=10):
+    totals = report["totals"]
+    print(f"✓ {totals.get('dex_files', 0)} DEX files from {len(report['sources'])} sources: "
+          f"{totals.get('classes', 0)} classes, {totals.get('methods', 0)} methods, "
+          f"{totals.get('strings', 0)} strings, {totals.get('size', 0) / 1024 / 1024:.1f} MB")
+    for summary in report["dex_files"]:
+        if summary["error"]:
+            print(f"  ✗ {summary['name']}: {summary['error']}")
+            continue
+        print(f"  - {summary['name']}  Strings: {summary['strings']}, Types: {summary['types']}, "
+              f"Methods: {summary['methods']}, Classes: {summary['classes']}")
+    if report["packages"]:
+        print(f"\n  Top packages by class count:")
+        for package, count in list(report["packages"].items())[:top]:
+            print(f"    {count:7d}  {package}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze every DEX file in DEX files, directories or APKs")
+    parser.add_argument("inputs", nargs="*", help="DEX files, directories or APK/AAB files "
+                                                  "(default: apk-extracted)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--json", metavar="FILE", help="Write the merged report as JSON")
+    args = parser.parse_args(argv)
+
+    report = merge(analyze(args.inputs or ["apk-extracted"], args.workers))
+    if not report["dex_files"]:
+        print("❌ No DEX files found")
+        return 1
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report saved: {args.json}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
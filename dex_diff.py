@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Per-class fingerprints and diffs between DEX builds
+Hashes each class_def together with its code_items, resolving every
+string/type/field/method operand to its symbolic name so that index
+renumbering between builds does not mark untouched classes as changed
+"""
+import hashlib
+import struct
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from dex_reader import DexFile, read_sleb128, read_uleb128
+
+ClassDiff = namedtuple('ClassDiff', 'added removed changed')
+
+# Width in 16-bit code units of every Dalvik opcode
+_WIDTHS = [1] * 256
+for _ops, _width in (
+    ((0x02, 0x05, 0x08, 0x13, 0x15, 0x16, 0x19, 0x1a, 0x1c, 0x1f, 0x20, 0x22, 0x23,
+      0x29, 0xfe, 0xff), 2),
+    ((0x03, 0x06, 0x09, 0x14, 0x17, 0x1b, 0x24, 0x25, 0x26, 0x2a, 0x2b, 0x2c,
+      0xfc, 0xfd), 3),
+    ((0x18,), 5),
+    ((0xfa, 0xfb), 4),
+):
+    for _op in _ops:
+        _WIDTHS[_op] = _width
+for _first, _last, _width in ((0x2d, 0x3d, 2), (0x44, 0x72, 3), (0x74, 0x78, 3),
+                              (0x90, 0xaf, 2), (0xd0, 0xe2, 2)):
+    for _op in range(_first, _last + 1):
+        _WIDTHS[_op] = _width
+for _op in range(0x44, 0x6e):
+    _WIDTHS[_op] = 2
+
+# Which pool the 16-bit operand in code unit 1 refers to
+_STRING, _TYPE, _FIELD, _METHOD, _PROTO, _OTHER = range(6)
+_OPERAND = {0x1a: _STRING, 0x1c: _TYPE, 0x1f: _TYPE, 0x20: _TYPE, 0x22: _TYPE,
+            0x23: _TYPE, 0x24: _TYPE, 0x25: _TYPE, 0xfa: _METHOD, 0xfb: _METHOD,
+            0xfc: _OTHER, 0xfd: _OTHER, 0xfe: _OTHER, 0xff: _PROTO}
+for _op in range(0x52, 0x6e):
+    _OPERAND[_op] = _FIELD
+for _op in list(range(0x6e, 0x73)) + list(range(0x74, 0x79)):
+    _OPERAND[_op] = _METHOD
+
+_CODE_HEADER = struct.Struct('<HHHHII')
+
+
+def _payload_width(units, pc):
+    """Width of a packed-switch/sparse-switch/fill-array-data payload"""
+    ident = units[pc]
+    if ident == 0x0100:
+        return units[pc + 1] * 2 + 4
+    if ident == 0x0200:
+        return units[pc + 1] * 4 + 2
+    if ident == 0x0300:
+        element_width = units[pc + 1]
+        size = units[pc + 2] | (units[pc + 3] << 16)
+        return (element_width * size + 1) // 2 + 4
+    return 1
+
+
+class Symbols:
+    """Resolve pool indices to build-independent names (memoized)"""
+
+    def __init__(self, dex):
+        self.dex = dex
+        self._cache = {}
+
+    def resolve(self, kind, idx):
+        key = (kind, idx)
+        value = self._cache.get(key)
+        if value is None:
+            dex = self.dex
+            if kind == _STRING:
+                value = dex.string(idx)
+            elif kind == _TYPE:
+                value = dex.type_descriptor(idx)
+            elif kind == _FIELD:
+                field = dex.field_id(idx)
+                value = f"{dex.type_descriptor(field.class_idx)}->{dex.string(field.name_idx)}:" \
+                        f"{dex.type_descriptor(field.type_idx)}"
+            elif kind == _METHOD:
+                value = f"{dex.type_descriptor(dex.method_id(idx).class_idx)}->{dex.method_signature(idx)}"
+            elif kind == _PROTO:
+                value = dex.string(dex.proto_id(idx).shorty_idx)
+            else:
+                value = str(idx)
+            self._cache[key] = value
+        return value
+
+
+def code_hash(dex, code_off, symbols=None):
+    """SHA-256 of a code_item with every pool operand resolved to a name"""
+    digest = hashlib.sha256()
+    if not code_off:
+        return digest.hexdigest()
+    symbols = symbols or Symbols(dex)
+    buf = dex.buffer
+    registers, ins, outs, tries_size, _, insns_size = _CODE_HEADER.unpack_from(buf, code_off)
+    digest.update(struct.pack('<HHHH', registers, ins, outs, tries_size))
+
+    start = code_off + _CODE_HEADER.size
+    units = struct.unpack_from(f'<{insns_size}H', buf, start)
+    pc = 0
+    while pc < insns_size:
+        unit = units[pc]
+        op = unit & 0xFF
+        if op == 0 and unit:
+            width = _payload_width(units, pc)
+            digest.update(struct.pack(f'<{width}H', *units[pc:pc + width]))
+            pc += width
+            continue
+
+        width = _WIDTHS[op]
+        kind = _OPERAND.get(op)
+        if op == 0x1b:
+            digest.update(struct.pack('<H', unit))
+            digest.update(dex.string(units[pc + 1] | (units[pc + 2] << 16)).encode('utf-8', 'surrogatepass'))
+        elif kind is not None and pc + 1 < insns_size:
+            rest = list(units[pc:pc + width])
+            rest[1] = 0
+            if op in (0xfa, 0xfb):
+                digest.update(symbols.resolve(_PROTO, rest[3]).encode('utf-8', 'surrogatepass'))
+                rest[3] = 0
+            digest.update(struct.pack(f'<{len(rest)}H', *rest))
+            digest.update(symbols.resolve(kind, units[pc + 1]).encode('utf-8', 'surrogatepass'))
+        else:
+            digest.update(struct.pack(f'<{min(width, insns_size - pc)}H', *units[pc:pc + width]))
+        pc += width
+
+    if tries_size:
+        offset = start + 2 * insns_size + (2 if insns_size & 1 else 0)
+        digest.update(buf[offset:offset + 8 * tries_size])
+        offset += 8 * tries_size
+        count, offset = read_uleb128(buf, offset)
+        for _ in range(count):
+            size, offset = read_sleb128(buf, offset)
+            digest.update(str(size).encode())
+            for _ in range(abs(size)):
+                type_idx, offset = read_uleb128(buf, offset)
+                addr, offset = read_uleb128(buf, offset)
+                digest.update(f"{symbols.resolve(_TYPE, type_idx)}@{addr}".encode('utf-8', 'surrogatepass'))
+            if size <= 0:
+                addr, offset = read_uleb128(buf, offset)
+                digest.update(f"*@{addr}".encode())
+    return digest.hexdigest()
+
+
+def class_hash(dex, class_def, symbols=None, methods=None):
+    """Fingerprint one class: flags, hierarchy, members and method bodies
+
+    When methods is a dict it receives {method signature: code hash}.
+    """
+    symbols = symbols or Symbols(dex)
+    digest = hashlib.sha256()
+    parts = [dex.type_descriptor(class_def.class_idx), str(class_def.access_flags),
+             str(dex.type_descriptor(class_def.superclass_idx))]
+    if class_def.interfaces_off:
+        (size,) = struct.unpack_from('<I', dex.buffer, class_def.interfaces_off)
+        parts += [dex.type_descriptor(t) for t in
+                  struct.unpack_from(f'<{size}H', dex.buffer, class_def.interfaces_off + 4)]
+    digest.update("\0".join(parts).encode('utf-8', 'surrogatepass'))
+
+    data = dex.class_data(class_def)
+    if data:
+        for field in data.static_fields + data.instance_fields:
+            digest.update(f"F{symbols.resolve(_FIELD, field.field_idx)}:{field.access_flags}\0"
+                          .encode('utf-8', 'surrogatepass'))
+        for method in data.direct_methods + data.virtual_methods:
+            body = code_hash(dex, method.code_off, symbols)
+            if methods is not None:
+                methods[dex.method_signature(method.method_idx)] = f"{method.access_flags}:{body}"
+            digest.update(f"M{symbols.resolve(_METHOD, method.method_idx)}:{method.access_flags}:"
+                          f"{body}\0".encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def class_fingerprints(dex_path, prefix=None):
+    """Return {class name: fingerprint} for classes whose descriptor starts with prefix"""
+    fingerprints = {}
+    with DexFile(dex_path) as dex:
+        symbols = Symbols(dex)
+        for class_def in dex.iter_class_defs():
+            descriptor = dex.type_descriptor(class_def.class_idx)
+            if prefix and not descriptor.startswith(prefix):
+                continue
+            fingerprints[descriptor[1:-1].replace('/', '.')] = class_hash(dex, class_def, symbols)
+    return fingerprints
+
+
+def diff_fingerprints(old, new):
+    """Compare two {class: fingerprint} maps"""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(name for name in set(old) & set(new) if old[name] != new[name])
+    return ClassDiff(added, removed, changed)
+
+
+def top_level_class(name):
+    """'com.examinerai.Quiz$Answer' -> 'com.examinerai.Quiz'"""
+    return name.split('$', 1)[0]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Usage: dex_diff.py <old.dex> <new.dex>")
+        return 1
+    diff = diff_fingerprints(class_fingerprints(Path(argv[0])), class_fingerprints(Path(argv[1])))
+    for label, names in zip(("+", "-", "~"), diff):
+        for name in names:
+            print(f"{label} {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+On-disk class/method/field index over every classes*.dex
+Parses the DEX files natively and stores class -> methods -> fields with
+their source DEX and file offsets in SQLite for millisecond lookups
+"""
+import hashlib
+import sqlite3
+import sys
+from pathlib import Path
+
+from dex_reader import DexFile, descriptor_to_class_name
+
+DEFAULT_INDEX = Path(".dex-index.sqlite")
+CLASS_DEF_SIZE = 32
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dex_files (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    class_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    dex_id INTEGER NOT NULL REFERENCES dex_files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    superclass TEXT,
+    access_flags INTEGER NOT NULL,
+    class_def_off INTEGER NOT NULL,
+    class_data_off INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS methods (
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    access_flags INTEGER NOT NULL,
+    code_off INTEGER NOT NULL,
+    code_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    access_flags INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS code_hashes (
+    sha256 TEXT NOT NULL,
+    class TEXT NOT NULL,
+    member TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS classes_name ON classes(name);
+CREATE INDEX IF NOT EXISTS code_hashes_sha ON code_hashes(sha256);
+CREATE INDEX IF NOT EXISTS methods_class ON methods(class_id);
+CREATE INDEX IF NOT EXISTS methods_name ON methods(name);
+CREATE INDEX IF NOT EXISTS fields_class ON fields(class_id);
+"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+
+
+class DexIndex:
+    """SQLite-backed index of the classes, methods and fields in DEX files"""
+
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def dex_id(self, sha256):
+        row = self.db.execute("SELECT id FROM dex_files WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else None
+
+    def add_dex(self, dex_path, sha256=None):
+        """Index one DEX file; a file whose content is already indexed is skipped"""
+        dex_path = Path(dex_path)
+        sha256 = sha256 or file_sha256(dex_path)
+        existing = self.dex_id(sha256)
+        if existing is not None:
+            return existing, False
+
+        with DexFile(dex_path) as dex, self.db:
+            header = dex.header
+            cur = self.db.execute(
+                "INSERT INTO dex_files (sha256, name, path, size, class_count) VALUES (?, ?, ?, ?, ?)",
+                (sha256, dex_path.name, str(dex_path), header.file_size, header.class_defs_size))
+            dex_id = cur.lastrowid
+
+            for i, class_def in enumerate(dex.iter_class_defs()):
+                cur = self.db.execute(
+                    "INSERT INTO classes (dex_id, name, superclass, access_flags, class_def_off, class_data_off) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (dex_id, dex.type_name(class_def.class_idx), dex.type_name(class_def.superclass_idx),
+                     class_def.access_flags, header.class_defs_off + CLASS_DEF_SIZE * i,
+                     class_def.class_data_off))
+                class_id = cur.lastrowid
+
+                data = dex.class_data(class_def)
+                if not data:
+                    continue
+                self.db.executemany(
+                    "INSERT INTO methods (class_id, name, signature, access_flags, code_off, code_size) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(class_id, dex.method_name(m.method_idx), dex.method_signature(m.method_idx),
+                      m.access_flags, m.code_off, dex.code_item_size(m.code_off) if m.code_off else 0)
+                     for m in data.direct_methods + data.virtual_methods])
+                self.db.executemany(
+                    "INSERT INTO fields (class_id, name, type, access_flags) VALUES (?, ?, ?, ?)",
+                    [(class_id, dex.field_name(f.field_idx),
+                      descriptor_to_class_name(dex.type_descriptor(dex.field_id(f.field_idx).type_idx)),
+                      f.access_flags)
+                     for f in data.static_fields + data.instance_fields])
+        return dex_id, True
+
+    def build(self, dex_files, prune=True):
+        """Index every DEX file; returns (indexed, reused, removed) counts
+
+        With prune, DEX files no longer in dex_files are dropped so lookups
+        never list classes from an older build. Pass prune=False when several
+        sets of DEX files share one index.
+        """
+        indexed = reused = 0
+        live = set()
+        for dex_path in map(Path, dex_files):
+            dex_id, added = self.add_dex(dex_path)
+            live.add(dex_id)
+            if added:
+                indexed += 1
+                continue
+            reused += 1
+            with self.db:
+                # Same content, new location: lookups report where it is now
+                self.db.execute("UPDATE dex_files SET name = ?, path = ? WHERE id = ? AND path != ?",
+                                (dex_path.name, str(dex_path), dex_id, str(dex_path)))
+        removed = 0
+        if prune:
+            stale = [row[0] for row in self.db.execute("SELECT id FROM dex_files") if row[0] not in live]
+            with self.db:
+                self.db.executemany("DELETE FROM dex_files WHERE id = ?", [(i,) for i in stale])
+            removed = len(stale)
+        return indexed, reused, removed
+
+    def load_code_hashes(self, sha256):
+        """Cached {class: {member: hash}} of a DEX by content digest (None if absent)
+
+        The member '' holds the fingerprint of the class itself.
+        """
+        hashes = {}
+        for class_name, member, digest in self.db.execute(
+                "SELECT class, member, hash FROM code_hashes WHERE sha256 = ?", (sha256,)):
+            hashes.setdefault(class_name, {})[member] = digest
+        return hashes or None
+
+    def store_code_hashes(self, sha256, hashes):
+        with self.db:
+            self.db.execute("DELETE FROM code_hashes WHERE sha256 = ?", (sha256,))
+            self.db.executemany(
+                "INSERT INTO code_hashes (sha256, class, member, hash) VALUES (?, ?, ?, ?)",
+                [(sha256, class_name, member, digest)
+                 for class_name, members in hashes.items() for member, digest in members.items()])
+
+    def find_classes(self, pattern, substring=False, limit=None):
+        """Return (class, dex name, class_def offset) rows by prefix or substring"""
+        query = ("SELECT c.name, d.name, c.class_def_off FROM classes c "
+                 "JOIN dex_files d ON d.id = c.dex_id ")
+        if substring:
+            query += "WHERE instr(c.name, ?) > 0 "
+            params = [pattern]
+        elif pattern:
+            # A range scan on the name index is much faster than LIKE 'x%'
+            query += "WHERE c.name >= ? AND c.name < ? "
+            params = [pattern, _prefix_upper_bound(pattern)]
+        else:
+            params = []
+        query += "ORDER BY c.name"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return self.db.execute(query, params).fetchall()
+
+    def find_methods(self, pattern, substring=False, limit=None):
+        """Return (class, method signature, dex name, code offset) rows"""
+        query = ("SELECT c.name, m.signature, d.name, m.code_off FROM methods m "
+                 "JOIN classes c ON c.id = m.class_id JOIN dex_files d ON d.id = c.dex_id ")
+        if substring:
+            query += "WHERE instr(m.name, ?) > 0 "
+            params = [pattern]
+        elif pattern:
+            query += "WHERE m.name >= ? AND m.name < ? "
+            params = [pattern, _prefix_upper_bound(pattern)]
+        else:
+            params = []
+        query += "ORDER BY c.name, m.signature"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return self.db.execute(query, params).fetchall()
+
+    def class_members(self, class_name):
+        """Return (methods, fields) of one class"""
+        methods = self.db.execute(
+            "SELECT m.signature, m.access_flags, m.code_off, m.code_size FROM methods m "
+            "JOIN classes c ON c.id = m.class_id WHERE c.name = ? ORDER BY m.signature",
+            (class_name,)).fetchall()
+        fields = self.db.execute(
+            "SELECT f.name, f.type, f.access_flags FROM fields f "
+            "JOIN classes c ON c.id = f.class_id WHERE c.name = ? ORDER BY f.name",
+            (class_name,)).fetchall()
+        return methods, fields
+
+
+def build_index(dex_files, index_path=DEFAULT_INDEX):
+    """Build or refresh the index for dex_files and return it open"""
+    index = DexIndex(index_path)
+    indexed, reused, removed = index.build(dex_files)
+    print(f"✓ Indexed {indexed} DEX files ({reused} unchanged, {removed} removed)")
+    return index
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search classes and methods across DEX files")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX), help="Index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index DEX files (default: apk-extracted/classes*.dex)")
+    build.add_argument("dex", nargs="*")
+
+    for name in ("classes", "methods"):
+        query = sub.add_parser(name, help=f"Find {name} by prefix")
+        query.add_argument("pattern")
+        query.add_argument("--substring", action="store_true", help="Match anywhere in the name")
+        query.add_argument("--limit", type=int, default=200)
+
+    show = sub.add_parser("show", help="List the methods and fields of one class")
+    show.add_argument("class_name")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        dex_files = [Path(p) for p in args.dex] or sorted(Path("apk-extracted").glob("classes*.dex"))
+        if not dex_files:
+            print("❌ No DEX files found in apk-extracted/")
+            return 1
+        build_index(dex_files, args.index).close()
+        return 0
+
+    with DexIndex(args.index) as index:
+        if args.command == "classes":
+            for name, dex_name, offset in index.find_classes(args.pattern, args.substring, args.limit):
+                print(f"{name}\t{dex_name}@0x{offset:x}")
+        elif args.command == "methods":
+            for class_name, signature, dex_name, offset in index.find_methods(args.pattern, args.substring,
+                                                                               args.limit):
+                print(f"{class_name}.{signature}\t{dex_name}@0x{offset:x}")
+        else:
+            methods, fields = index.class_members(args.class_name)
+            for name, type_name, flags in fields:
+                print(f"  field  {type_name} {name}  [0x{flags:x}]")
+            for signature, flags, offset, size in methods:
+                print(f"  method {signature}  [0x{flags:x}] code@0x{offset:x} ({size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Zero-copy DEX reader
+Memory-maps classes*.dex files (or windows of an APK) and decodes the
+id tables lazily
+"""
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+
+DEX_MAGIC = b'dex\n'
+NO_INDEX = 0xFFFFFFFF
+
+HEADER_FORMAT = '<8sI20s20I'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+DexHeader = namedtuple('DexHeader', [
+    'magic', 'checksum', 'signature', 'file_size', 'header_size',
+    'endian_tag', 'link_size', 'link_off', 'map_off',
+    'string_ids_size', 'string_ids_off', 'type_ids_size', 'type_ids_off',
+    'proto_ids_size', 'proto_ids_off', 'field_ids_size', 'field_ids_off',
+    'method_ids_size', 'method_ids_off', 'class_defs_size', 'class_defs_off',
+    'data_size', 'data_off',
+])
+
+ProtoId = namedtuple('ProtoId', 'shorty_idx return_type_idx parameters_off')
+FieldId = namedtuple('FieldId', 'class_idx type_idx name_idx')
+MethodId = namedtuple('MethodId', 'class_idx proto_idx name_idx')
+ClassDef = namedtuple('ClassDef', [
+    'class_idx', 'access_flags', 'superclass_idx', 'interfaces_off',
+    'source_file_idx', 'annotations_off', 'class_data_off', 'static_values_off',
+])
+MapItem = namedtuple('MapItem', 'type size offset')
+EncodedField = namedtuple('EncodedField', 'field_idx access_flags')
+EncodedMethod = namedtuple('EncodedMethod', 'method_idx access_flags code_off')
+ClassData = namedtuple('ClassData', 'static_fields instance_fields direct_methods virtual_methods')
+
+_U4 = struct.Struct('<I')
+_PROTO = struct.Struct('<III')
+_MEMBER = struct.Struct('<HHI')
+_CLASS_DEF = struct.Struct('<8I')
+_MAP_ITEM = struct.Struct('<HHII')
+_CODE_HEADER = struct.Struct('<HHHHII')
+_LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+SPOOL_CHUNK = 1024 * 1024
+
+
+class DexFormatError(ValueError):
+    """Raised when a buffer is not a readable DEX file"""
+
+
+def read_uleb128(buf, offset):
+    """Decode an unsigned LEB128 value, returning (value, next_offset)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def read_sleb128(buf, offset):
+    """Decode a signed LEB128 value, returning (value, next_offset)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                result -= 1 << shift
+            return result, offset
+
+
+def decode_mutf8(data):
+    """Decode Modified UTF-8 as used by string_data_item"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    # Embedded NULs are stored as C0 80 and supplementary characters as
+    # surrogate pairs, neither of which the strict codec accepts.
+    text = data.replace(b'\xc0\x80', b'\x00').decode('utf-8', 'surrogatepass')
+    return text.encode('utf-16-le', 'surrogatepass').decode('utf-16-le', 'replace')
+
+
+def descriptor_to_class_name(descriptor):
+    """Convert 'Lcom/examinerai/MainActivity;' to 'com.examinerai.MainActivity'"""
+    if descriptor.startswith('L') and descriptor.endswith(';'):
+        return descriptor[1:-1].replace('/', '.')
+    return descriptor
+
+
+class DexFile:
+    """Lazily decoded view over a single DEX file.
+
+    The file is memory-mapped and every table is read in place through a
+    memoryview; nothing is decoded until it is asked for.
+    """
+
+    def __init__(self, path=None, buffer=None, name=None, offset=0, length=None):
+        self.path = Path(path) if path is not None else None
+        self.name = name or (self.path.name if self.path else '<buffer>')
+        self._file = None
+        self._mmap = None
+
+        if buffer is None:
+            self._file = open(self.path, 'rb')
+            try:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self._file.close()
+                raise DexFormatError(f"{self.name}: empty file")
+            buffer = self._mmap
+
+        self._buf = memoryview(buffer)
+        if offset or length is not None:
+            # Keep only the window; the slice alone holds the export
+            whole = self._buf
+            self._buf = whole[offset:offset + length if length is not None else None]
+            whole.release()
+        if len(self._buf) < HEADER_SIZE or bytes(self._buf[:4]) != DEX_MAGIC:
+            self.close()
+            raise DexFormatError(f"{self.name}: not a DEX file")
+
+        self.header = DexHeader._make(struct.unpack_from(HEADER_FORMAT, self._buf, 0))
+        self._strings = {}
+
+    @classmethod
+    def from_zip(cls, zip_path, member, spool_dir=None):
+        """Open a DEX inside an APK without reading it into memory
+
+        A stored member is mapped in place as a window of the archive; a
+        deflated one is inflated in chunks into an anonymous temporary
+        file which is then mapped.
+        """
+        with zipfile.ZipFile(zip_path) as zf:
+            info = zf.getinfo(member)
+            if info.compress_type == zipfile.ZIP_STORED:
+                backing = open(zip_path, 'rb')
+                backing.seek(info.header_offset)
+                local = _LOCAL_HEADER.unpack(backing.read(_LOCAL_HEADER.size))
+                offset = info.header_offset + _LOCAL_HEADER.size + local[-2] + local[-1]
+            else:
+                backing = tempfile.TemporaryFile(dir=spool_dir)
+                with zf.open(info) as src:
+                    shutil.copyfileobj(src, backing, SPOOL_CHUNK)
+                backing.flush()
+                offset = 0
+        try:
+            mapped = mmap.mmap(backing.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            backing.close()
+            raise DexFormatError(f"{member}: empty file")
+        try:
+            dex = cls(buffer=mapped, name=member, offset=offset, length=info.file_size)
+        except Exception:
+            mapped.close()
+            backing.close()
+            raise
+        dex._mmap = mapped
+        dex._file = backing
+        return dex
+
+    def close(self):
+        """Release the memoryview and the underlying map"""
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def buffer(self):
+        return self._buf
+
+    @property
+    def version(self):
+        return self.header.magic[4:7].decode('ascii', 'replace')
+
+    def _table(self, record, offset, count):
+        """Iterate raw tuples of a fixed-size table without copying it"""
+        if not count:
+            return iter(())
+        end = offset + record.size * count
+        return record.iter_unpack(self._buf[offset:end])
+
+    # -- strings -----------------------------------------------------------
+
+    def string_data_off(self, idx):
+        return _U4.unpack_from(self._buf, self.header.string_ids_off + 4 * idx)[0]
+
+    def string(self, idx):
+        """Return string_ids[idx] as text (cached)"""
+        value = self._strings.get(idx)
+        if value is None:
+            value = self._decode_string_at(self.string_data_off(idx))
+            self._strings[idx] = value
+        return value
+
+    def _decode_string_at(self, offset):
+        utf16_size, start = read_uleb128(self._buf, offset)
+        # Each UTF-16 unit takes at most 3 MUTF-8 bytes, so the terminating
+        # NUL lies within this window
+        data = bytes(self._buf[start:start + 3 * utf16_size + 1])
+        end = data.find(b'\0')
+        return decode_mutf8(data[:end] if end >= 0 else data)
+
+    def iter_strings(self):
+        """Yield every string in string_ids order"""
+        for (data_off,) in self._table(_U4, self.header.string_ids_off, self.header.string_ids_size):
+            yield self._decode_string_at(data_off)
+
+    # -- ids ---------------------------------------------------------------
+
+    def type_descriptor(self, idx):
+        if idx == NO_INDEX:
+            return None
+        return self.string(_U4.unpack_from(self._buf, self.header.type_ids_off + 4 * idx)[0])
+
+    def type_name(self, idx):
+        descriptor = self.type_descriptor(idx)
+        return descriptor_to_class_name(descriptor) if descriptor else None
+
+    def proto_id(self, idx):
+        return ProtoId._make(_PROTO.unpack_from(self._buf, self.header.proto_ids_off + _PROTO.size * idx))
+
+    def field_id(self, idx):
+        return FieldId._make(_MEMBER.unpack_from(self._buf, self.header.field_ids_off + _MEMBER.size * idx))
+
+    def method_id(self, idx):
+        return MethodId._make(_MEMBER.unpack_from(self._buf, self.header.method_ids_off + _MEMBER.size * idx))
+
+    def class_def(self, idx):
+        return ClassDef._make(_CLASS_DEF.unpack_from(self._buf, self.header.class_defs_off + _CLASS_DEF.size * idx))
+
+    def iter_type_ids(self):
+        for (descriptor_idx,) in self._table(_U4, self.header.type_ids_off, self.header.type_ids_size):
+            yield descriptor_idx
+
+    def iter_proto_ids(self):
+        h = self.header
+        return map(ProtoId._make, self._table(_PROTO, h.proto_ids_off, h.proto_ids_size))
+
+    def iter_field_ids(self):
+        h = self.header
+        return map(FieldId._make, self._table(_MEMBER, h.field_ids_off, h.field_ids_size))
+
+    def iter_method_ids(self):
+        h = self.header
+        return map(MethodId._make, self._table(_MEMBER, h.method_ids_off, h.method_ids_size))
+
+    def iter_class_defs(self):
+        h = self.header
+        return map(ClassDef._make, self._table(_CLASS_DEF, h.class_defs_off, h.class_defs_size))
+
+    def map_list(self):
+        """Return the map_list entries describing every section"""
+        if not self.header.map_off:
+            return []
+        (count,) = _U4.unpack_from(self._buf, self.header.map_off)
+        return [MapItem._make(t[:1] + t[2:]) for t in self._table(_MAP_ITEM, self.header.map_off + 4, count)]
+
+    # -- names -------------------------------------------------------------
+
+    def class_names(self):
+        """Return the dotted name of every class defined in this file"""
+        type_name = self.type_name
+        return [type_name(cd[0]) for cd in self._table(_CLASS_DEF, self.header.class_defs_off,
+                                                        self.header.class_defs_size)]
+
+    def method_name(self, idx):
+        return self.string(self.method_id(idx).name_idx)
+
+    def field_name(self, idx):
+        return self.string(self.field_id(idx).name_idx)
+
+    def method_signature(self, idx):
+        """Return 'name(params)return' using type descriptors"""
+        method = self.method_id(idx)
+        proto = self.proto_id(method.proto_idx)
+        params = ''
+        if proto.parameters_off:
+            (size,) = _U4.unpack_from(self._buf, proto.parameters_off)
+            items = struct.unpack_from(f'<{size}H', self._buf, proto.parameters_off + 4)
+            params = ''.join(self.type_descriptor(t) for t in items)
+        return f"{self.string(method.name_idx)}({params}){self.type_descriptor(proto.return_type_idx)}"
+
+    # -- class data --------------------------------------------------------
+
+    def class_data(self, class_def):
+        """Decode class_data_item for a class_def (None for marker classes)"""
+        offset = class_def.class_data_off
+        if not offset:
+            return None
+        buf = self._buf
+        sizes = []
+        for _ in range(4):
+            value, offset = read_uleb128(buf, offset)
+            sizes.append(value)
+
+        def fields(count, offset):
+            items = []
+            idx = 0
+            for _ in range(count):
+                diff, offset = read_uleb128(buf, offset)
+                flags, offset = read_uleb128(buf, offset)
+                idx += diff
+                items.append(EncodedField(idx, flags))
+            return items, offset
+
+        def methods(count, offset):
+            items = []
+            idx = 0
+            for _ in range(count):
+                diff, offset = read_uleb128(buf, offset)
+                flags, offset = read_uleb128(buf, offset)
+                code_off, offset = read_uleb128(buf, offset)
+                idx += diff
+                items.append(EncodedMethod(idx, flags, code_off))
+            return items, offset
+
+        static_fields, offset = fields(sizes[0], offset)
+        instance_fields, offset = fields(sizes[1], offset)
+        direct_methods, offset = methods(sizes[2], offset)
+        virtual_methods, offset = methods(sizes[3], offset)
+        return ClassData(static_fields, instance_fields, direct_methods, virtual_methods)
+
+    def code_item_size(self, code_off):
+        """Return the byte length of the code_item at code_off"""
+        buf = self._buf
+        _, _, _, tries_size, _, insns_size = _CODE_HEADER.unpack_from(buf, code_off)
+        end = code_off + _CODE_HEADER.size + 2 * insns_size
+        if tries_size:
+            if insns_size & 1:
+                end += 2
+            end += 8 * tries_size
+            count, end = read_uleb128(buf, end)
+            for _ in range(count):
+                size, end = read_sleb128(buf, end)
+                for _ in range(abs(size)):
+                    _, end = read_uleb128(buf, end)
+                    _, end = read_uleb128(buf, end)
+                if size <= 0:
+                    _, end = read_uleb128(buf, end)
+        return end - code_off
+
+    def code_item(self, code_off):
+        """Return a zero-copy view of the code_item bytes (empty if abstract)"""
+        if not code_off:
+            return self._buf[0:0]
+        return self._buf[code_off:code_off + self.code_item_size(code_off)]
+
+
+def list_classes(path):
+    """Return every class name defined in one DEX file"""
+    with DexFile(path) as dex:
+        return dex.class_names()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    paths = [Path(p) for p in argv] or sorted(Path("apk-extracted").glob("classes*.dex"))
+    if not paths:
+        print("❌ No DEX files found in apk-extracted/")
+        return 1
+    for path in paths:
+        for name in list_classes(path):
+            print(f"{path.name}\t{name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
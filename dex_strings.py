@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Global string pool across every classes*.dex
+Decodes the MUTF-8 string_data_items of all DEX files in parallel and
+interns them into one deduplicated pool for lookups, greps and audits
+"""
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dex_reader import DexFile
+
+# Preset patterns for --scan
+SCANS = {
+    "secrets": (r"(?i)api[_-]?key|client[_-]?secret|passw(?:or)?d\s*[=:]|bearer\s|"
+                r"AIza[0-9A-Za-z_\-]{35}|AKIA[0-9A-Z]{16}|sk_live_[0-9A-Za-z]{16,}|"
+                r"-----BEGIN [A-Z ]*PRIVATE KEY-----"),
+    "urls": r"^(?:https?|wss?)://",
+    "flags": r"(?i)^(?:feature|flag|experiment)s?[._]",
+}
+
+
+def read_strings(dex_path):
+    """Decode every string of one DEX file (runs in a worker process)"""
+    with DexFile(dex_path) as dex:
+        return list(dex.iter_strings())
+
+
+class StringPool:
+    """Deduplicated strings of several DEX files, each tagged with the files using it"""
+
+    def __init__(self):
+        self.sources = []
+        self.strings = []
+        self.total = 0
+        self._ids = {}
+        self._masks = []
+
+    def add(self, source, strings):
+        """Intern the strings of one DEX file"""
+        bit = 1 << len(self.sources)
+        self.sources.append(source)
+        ids, pool, masks = self._ids, self.strings, self._masks
+        for value in strings:
+            idx = ids.get(value)
+            if idx is None:
+                ids[value] = len(pool)
+                pool.append(value)
+                masks.append(bit)
+            else:
+                masks[idx] |= bit
+        self.total += len(strings)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __contains__(self, value):
+        return value in self._ids
+
+    def _names(self, mask):
+        return [name for bit, name in enumerate(self.sources) if mask >> bit & 1]
+
+    def where(self, value):
+        """Return the DEX files containing value (empty when absent)"""
+        idx = self._ids.get(value)
+        return [] if idx is None else self._names(self._masks[idx])
+
+    def grep(self, pattern, literal=False, ignore_case=False):
+        """Yield (string, DEX files) for every pooled string matching pattern"""
+        if literal and not ignore_case:
+            matches = (i for i, value in enumerate(self.strings) if pattern in value)
+        else:
+            regex = re.compile(re.escape(pattern) if literal else pattern, re.IGNORECASE if ignore_case else 0)
+            search = regex.search
+            matches = (i for i, value in enumerate(self.strings) if search(value))
+        for idx in matches:
+            yield self.strings[idx], self._names(self._masks[idx])
+
+    def summary(self):
+        duplicates = self.total - len(self.strings)
+        share = 100 * duplicates / self.total if self.total else 0
+        return (f"{len(self.strings)} unique strings from {self.total} across "
+                f"{len(self.sources)} DEX files ({share:.0f}% duplicates)")
+
+
+def build_pool(dex_files, workers=None):
+    """Decode dex_files in parallel and merge them into one StringPool"""
+    dex_files = [Path(p) for p in dex_files]
+    pool = StringPool()
+    if not dex_files:
+        return pool
+    workers = workers or min(len(dex_files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() keeps input order, so every build of the pool is identical
+        for dex_file, strings in zip(dex_files, executor.map(read_strings, dex_files)):
+            pool.add(dex_file.name, strings)
+    return pool
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search the strings of all DEX files")
+    parser.add_argument("dex", nargs="*", help="DEX files (default: apk-extracted/classes*.dex)")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--grep", metavar="PATTERN", help="Regular expression to search for")
+    query.add_argument("--scan", choices=sorted(SCANS), help="Run a preset audit")
+    query.add_argument("--where", metavar="STRING", help="Show which DEX files contain STRING exactly")
+    parser.add_argument("--literal", action="store_true", help="Treat --grep PATTERN as plain text")
+    parser.add_argument("-i", "--ignore-case", action="store_true")
+    parser.add_argument("--workers", type=int, default=None, help="Decoder processes")
+    args = parser.parse_args(argv)
+
+    dex_files = [Path(p) for p in args.dex] or sorted(Path("apk-extracted").glob("classes*.dex"))
+    if not dex_files:
+        print("❌ No DEX files found in apk-extracted/")
+        return 1
+
+    pool = build_pool(dex_files, args.workers)
+    print(f"✓ {pool.summary()}", file=sys.stderr)
+
+    if args.where is not None:
+        sources = pool.where(args.where)
+        print(", ".join(sources) if sources else "(not found)")
+        return 0 if sources else 1
+
+    pattern = SCANS[args.scan] if args.scan else args.grep
+    if pattern is None:
+        return 0
+    count = 0
+    for value, sources in pool.grep(pattern, args.literal and not args.scan, args.ignore_case):
+        print(f"{value!r}\t{','.join(sources)}")
+        count += 1
+    print(f"✓ {count} matching strings", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
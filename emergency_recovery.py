@@ -5,51 +5,24 @@ Extracts compiled classes and provides decompilation instructions
 """
 import os
 import zipfile
-import struct
 from pathlib import Path
 import subprocess
 import sys
 
-def analyze_dex_file(dex_path):
-    """Analyze DEX file structure to extract class names"""
-    try:
-        with open(dex_path, 'rb') as f:
-            # DEX magic bytes
-            magic = f.read(8)
-            if magic[:4] != b'dex\n':
-                return []
-            
-            # Read file size and string IDs
-            f.seek(0x20)  # String IDs start offset
-            string_ids_off = struct.unpack('<I', f.read(4))[0]
-            string_ids_size = struct.unpack('<I', f.read(4))[0]
-            
-            # Type IDs offset and size
-            type_ids_off = struct.unpack('<I', f.read(4))[0]
-            type_ids_size = struct.unpack('<I', f.read(4))[0]
-            
-            print(f"  Strings: {string_ids_size}, Types: {type_ids_size}")
-            return True
-    except Exception as e:
-        print(f"  Error analyzing: {e}")
-        return False
+from dex_analyze import analyze, merge, print_report
 
-def setup_recovery():
+def setup_recovery(inputs=None):
     """Setup tools for source recovery"""
     print("🆘 EMERGENCY SOURCE CODE RECOVERY")
     print("=" * 70)
     print()
     
-    # Check for DEX files
-    dex_dir = Path("apk-extracted")
-    if dex_dir.exists():
-        dex_files = list(dex_dir.glob("classes*.dex"))
-        print(f"✓ Found {len(dex_files)} DEX files:")
-        for dex in sorted(dex_files)[:3]:
-            print(f"  - {dex.name}", end=" ")
-            analyze_dex_file(dex)
-        if len(dex_files) > 3:
-            print(f"  ... and {len(dex_files)-3} more")
+    # Analyze every DEX file (apk-extracted/ or the APKs given)
+    inputs = inputs or [p for p in [Path("apk-extracted")] if p.exists()]
+    if inputs:
+        report = merge(analyze(inputs))
+        if report["dex_files"]:
+            print_report(report)
     
     print()
     print("🔧 RECOVERY OPTIONS (Choose One):")
@@ -82,4 +55,4 @@ def setup_recovery():
     print()
 
 if __name__ == "__main__":
-    setup_recovery()
+    setup_recovery(sys.argv[1:])
@@ -3,34 +3,33 @@
 COMPLETE SOURCE CODE RECOVERY
 Decompiles all DEX files and restores full source tree
 """
-import os
+import re
 import sys
-import zipfile
+import json
 import shutil
 import subprocess
+import time
 from pathlib import Path
-import urllib.request
-import urllib.error
 
-def download_file(url, target_file, timeout=300):
-    """Download file with progress"""
-    print(f"  ⏳ Downloading: {target_file}...", end=" ", flush=True)
-    try:
-        urllib.request.urlretrieve(url, target_file)
-        print("✓")
-        return True
-    except urllib.error.URLError as e:
-        print(f"✗ ({e})")
-        return False
-    except Exception as e:
-        print(f"✗ ({type(e).__name__})")
-        return False
+from apk_extract import EXTRACT_ALL, iter_extract
+import decompile_pool
+from decompile_pool import DecompileScheduler, cfr_command, command_task
+import decompile_cache
+import jvm_worker
+from tool_fetch import ToolFetcher, install as install_tool
+from dex_diff import class_fingerprints, diff_fingerprints, top_level_class
+from recovery_pipeline import INSTALL_PREFIX, install_file, recovery_pipeline
+
+RECOVERY_STATE_FILE = Path(".recovery-state.json")
+INSTALL_DESCRIPTOR_PREFIX = "Lcom/examinerai/"
+JAVA_ROOT = Path("android-app/app/src/main/java")
+INSTALL_DIR = JAVA_ROOT / "com/examinerai"
 
-def extract_zip(zip_file, target_dir):
-    """Extract ZIP file"""
+def extract_zip(zip_file, target_dir, selector=EXTRACT_ALL):
+    """Extract the ZIP entries matching selector"""
     try:
-        with zipfile.ZipFile(zip_file, 'r') as z:
-            z.extractall(target_dir)
+        for _ in iter_extract(zip_file, target_dir, selector):
+            pass
         return True
     except Exception as e:
         print(f"  ❌ Extraction failed: {e}")
@@ -41,18 +40,20 @@ def setup_tools():
     print("📥 SETTING UP DECOMPILATION TOOLS")
     print("=" * 70)
     
-    # Download dex2jar
-    dex2jar_url = "https://github.com/ThexXTURBOXx/dex2jar/releases/download/v2.0/dex2jar-2.0.zip"
-    cfr_url = "https://www.benf.org/other/cfr/cfr.jar"
+    wanted = []
+    if not Path("dex2jar").exists():
+        wanted.append("dex2jar")
+    if not Path("cfr.jar").exists():
+        wanted.append("cfr")
     
-    dex2jar_zip = "dex2jar-2.0.zip"
-    cfr_jar = "cfr.jar"
+    # Both downloads run at once and resume from the shared tool cache
+    fetched = ToolFetcher().fetch_all(wanted) if wanted else {}
     
     # Need dex2jar
-    if not Path("dex2jar").exists():
-        if download_file(dex2jar_url, dex2jar_zip):
+    if "dex2jar" in fetched:
+        if fetched["dex2jar"]:
             print("  ✓ Extracting dex2jar...", end=" ", flush=True)
-            if extract_zip(dex2jar_zip, "."):
+            if extract_zip(fetched["dex2jar"], "."):
                 print("✓")
             else:
                 return False
@@ -60,8 +61,9 @@ def setup_tools():
             print("  ⚠️  dex2jar download failed, will use alternative method")
     
     # Need CFR
-    if not Path(cfr_jar).exists():
-        if download_file(cfr_url, cfr_jar):
+    if "cfr" in fetched:
+        if fetched["cfr"]:
+            install_tool(fetched["cfr"], "cfr.jar")
             print("  ✓ CFR ready for decompilation")
         else:
             print("  ⚠️  CFR download failed")
@@ -69,56 +71,89 @@ def setup_tools():
     
     return True
 
-def convert_dex_to_jar(dex_file, output_jar):
-    """Convert DEX to JAR using dex2jar"""
-    print(f"\n  Converting {dex_file.name} to JAR...", end=" ", flush=True)
-    
-    try:
-        dex2jar_cmd = Path("dex2jar/d2j-dex2jar.sh")
-        if not dex2jar_cmd.exists():
-            dex2jar_cmd = Path("dex2jar/d2j-dex2jar.bat")
-        
-        if dex2jar_cmd.exists():
-            result = subprocess.run(
-                [str(dex2jar_cmd), str(dex_file), "-o", str(output_jar)],
-                capture_output=True,
-                timeout=120
-            )
-            if result.returncode == 0 or output_jar.exists():
-                print("✓")
-                return True
-    except Exception as e:
-        pass
-    
-    print("⚠️  (will try CFR directly on dex)")
-    return False
+def dex2jar_command(dex_file, output_jar):
+    """Return the dex2jar command line, or None if dex2jar is missing"""
+    dex2jar_cmd = Path("dex2jar/d2j-dex2jar.sh")
+    if not dex2jar_cmd.exists():
+        dex2jar_cmd = Path("dex2jar/d2j-dex2jar.bat")
+    if not dex2jar_cmd.exists():
+        return None
+    return [str(dex2jar_cmd), str(dex_file), "-o", str(output_jar)]
 
-def decompile_with_cfr(input_file, output_dir):
-    """Decompile JAR or DEX using CFR"""
-    print(f"  Decompiling {input_file.name} to Java...", end=" ", flush=True)
-    
-    try:
-        result = subprocess.run(
-            ["java", "-jar", "cfr.jar", str(input_file), "--outputdir", str(output_dir)],
-            capture_output=True,
-            timeout=180
-        )
-        # CFR often exits with 1 even on success
-        if output_dir.exists() and list(output_dir.glob("**/*.java")):
-            print("✓")
+def decompile_dex_task(output_dir, heap_mb=None, workers=None, cfr_options=None):
+    """Scheduler task: CFR on the DEX, falling back to dex2jar + CFR
+
+    With a JvmWorkerPool the CFR runs go to an already running JVM.
+    cfr_options(dex_file) may return extra CFR options such as jarfilter.
+    The timeout covers the whole job, fallback included.
+    """
+    def cfr(input_file, timeout, options):
+        if workers:
+            return workers.decompile(input_file, output_dir, timeout, options).ok
+        extra_args = [arg for k, v in options.items() for arg in (f"--{k}", v)]
+        result = subprocess.run(cfr_command("cfr.jar", input_file, output_dir, heap_mb, extra_args),
+                                capture_output=True, timeout=timeout)
+        return result.returncode == 0
+
+    def task(dex_file, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise subprocess.TimeoutExpired(str(dex_file), timeout)
+            return left
+
+        options = cfr_options(dex_file) if cfr_options else {}
+        if cfr(dex_file, remaining(), options):
             return True
-        else:
-            print("⚠️")
+
+        jar_file = output_dir / f"{dex_file.stem}.jar"
+        cmd = dex2jar_command(dex_file, jar_file)
+        if not cmd:
             return False
-    except subprocess.TimeoutExpired:
-        print("⏱️ timeout")
-        return False
-    except Exception as e:
-        print(f"❌ {e}")
+        subprocess.run(cmd, capture_output=True, timeout=remaining())
+        if not jar_file.exists():
+            return False
+        cfr(jar_file, remaining(), options)
+        return True
+    return task
+
+def run_recovery(dex_files, make_task, tool, scheduler, cache=None, packages=None):
+    """Stream dex_files through the recovery pipeline into the Android project"""
+    output_dir = Path("src-recovered-full")
+    print(f"\n📂 Decompiling {len(dex_files)} DEX files...\n")
+    pipeline = recovery_pipeline(output_dir, make_task, scheduler, cache, tool,
+                                 packages=packages, install_root=JAVA_ROOT)
+    installed = pipeline.run(dex_files)
+    pipeline.print_summary()
+    if cache:
+        print(f"  {cache.summary()}")
+
+    if not installed:
+        print(f"\n⚠️  No {INSTALL_PREFIX}* classes recovered in {output_dir}")
         return False
 
-def recover_source():
-    """Main recovery process"""
+    print("\n" + "=" * 70)
+    print("✅ SOURCE CODE RECOVERY COMPLETE!")
+    print("=" * 70)
+    written = sum(1 for result in installed if result.written)
+    print(f"\nRestored {len(installed)} source files ({written} written, "
+          f"{len(installed) - written} unchanged) to:")
+    print(f"  {INSTALL_DIR}\n")
+    
+    print("📝 NOTE: Files are in Java format (.java)")
+    print("   IDE will auto-convert to Kotlin or rebuild with Java\n")
+    return True
+
+def recover_source(scheduler=None, cache=None, workers=None, packages=None):
+    """Main recovery process
+
+    packages limits decompilation to the classes under those package prefixes.
+    """
+    scheduler = scheduler or DecompileScheduler()
     print("\n" + "=" * 70)
     print("🚀 COMPLETE SOURCE CODE RECOVERY")
     print("=" * 70 + "\n")
@@ -126,7 +161,7 @@ def recover_source():
     # Setup
     if not setup_tools():
         print("\n❌ Tool setup failed. Trying alternative...\n")
-        return recover_with_cfr_only()
+        return recover_with_cfr_only(scheduler, cache, workers, packages)
     
     # Find DEX files
     apk_dir = Path("apk-extracted")
@@ -135,115 +170,174 @@ def recover_source():
     if not dex_files:
         print("❌ No DEX files found in apk-extracted/")
         return False
-    
-    # Create output directory
-    output_dir = Path("src-recovered-full")
-    output_dir.mkdir(exist_ok=True)
-    
-    print(f"\n📂 Decompiling {len(dex_files)} DEX files...\n")
-    
-    success_count = 0
-    
-    for i, dex_file in enumerate(dex_files, 1):
-        print(f"[{i}/{len(dex_files)}] {dex_file.name}")
-        
-        # Try direct CFR decompilation on DEX
-        if decompile_with_cfr(dex_file, output_dir):
-            success_count += 1
+
+    def make_task(out, options):
+        return decompile_dex_task(out, scheduler.jvm_heap_mb, workers,
+                                  (lambda dex: options) if options else None)
+
+    if not run_recovery(dex_files, make_task, ("cfr+dex2jar", "cfr.jar"), scheduler, cache, packages):
+        return False
+    save_recovery_state(recovered_snapshot(dex_files, packages))
+    return True
+
+def snapshot_classes(dex_files):
+    """Fingerprint every installable class: {class: {"dex": name, "hash": digest}}"""
+    snapshot = {}
+    for dex_file in dex_files:
+        for name, digest in class_fingerprints(dex_file, INSTALL_DESCRIPTOR_PREFIX).items():
+            snapshot[name] = {"dex": dex_file.name, "hash": digest}
+    return snapshot
+
+def recovered_snapshot(dex_files, packages=None):
+    """snapshot_classes limited to what a recovery over packages actually installed
+
+    Classes outside the prefixes keep their previous fingerprint (or none),
+    so a later incremental run still recovers them.
+    """
+    snapshot = snapshot_classes(dex_files)
+    if not packages:
+        return snapshot
+    prefixes = tuple(p.rstrip(".") + "." for p in packages)
+    previous = load_recovery_state() or {}
+    for name in [n for n in snapshot if not n.startswith(prefixes)]:
+        if name in previous:
+            snapshot[name] = previous[name]
         else:
-            # Try dex2jar conversion first
-            jar_file = output_dir / f"{dex_file.stem}.jar"
-            if convert_dex_to_jar(dex_file, jar_file) and jar_file.exists():
-                decompile_with_cfr(jar_file, output_dir)
-                success_count += 1
-    
-    print(f"\n✓ Decompilation complete: {success_count}/{len(dex_files)} successful\n")
-    
-    return finalize_recovery(output_dir)
+            del snapshot[name]
+    return snapshot
+
+def load_recovery_state():
+    try:
+        with open(RECOVERY_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_recovery_state(snapshot):
+    with open(RECOVERY_STATE_FILE, 'w') as f:
+        json.dump(snapshot, f, indent=1, sort_keys=True)
+
+def class_filter(class_names):
+    """CFR jarfilter regex matching the given top-level classes and their inner classes"""
+    names = "|".join(re.escape(name) for name in sorted(class_names))
+    return f"^(?:{names})(?:\\$.*)?$"
+
+def recover_incremental(scheduler=None, workers=None):
+    """Re-decompile only classes whose bytecode changed since the last recovery"""
+    scheduler = scheduler or DecompileScheduler()
+    print("\n" + "=" * 70)
+    print("🔁 INCREMENTAL SOURCE CODE RECOVERY")
+    print("=" * 70 + "\n")
+
+    previous = load_recovery_state()
+    if previous is None:
+        print("⚠️  No previous recovery state, running full recovery")
+        return recover_source(scheduler, workers=workers)
+
+    dex_files = sorted(Path("apk-extracted").glob("classes*.dex"))
+    if not dex_files:
+        print("❌ No DEX files found in apk-extracted/")
+        return False
+
+    current = snapshot_classes(dex_files)
+    diff = diff_fingerprints({k: v["hash"] for k, v in previous.items()},
+                             {k: v["hash"] for k, v in current.items()})
+    print(f"✓ {len(current)} classes: {len(diff.added)} added, {len(diff.changed)} changed, "
+          f"{len(diff.removed)} removed")
+
+    # An inner class change means regenerating its whole top-level file
+    dirty = {top_level_class(name) for name in diff.added + diff.changed}
+    live = {top_level_class(name) for name in current}
+    gone = {top_level_class(name) for name in diff.removed} - live
+
+    if dirty:
+        per_dex = {}
+        for name, entry in current.items():
+            if top_level_class(name) in dirty:
+                per_dex.setdefault(entry["dex"], set()).add(top_level_class(name))
 
-def recover_with_cfr_only():
+        staging = Path("src-recovered-incremental")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        print(f"\n📂 Decompiling {len(dirty)} classes from {len(per_dex)} DEX files...\n")
+        filters = {name: {"jarfilter": class_filter(classes)} for name, classes in per_dex.items()}
+        task = decompile_dex_task(staging, scheduler.jvm_heap_mb, workers,
+                                  cfr_options=lambda dex: filters[dex.name])
+        scheduler.run_all([Path("apk-extracted") / name for name in sorted(per_dex)], task)
+
+        updated = 0
+        missing = set()
+        for name in sorted(dirty):
+            relative = Path(name.replace(".", "/") + ".java")
+            src_file = staging / relative
+            if src_file.exists():
+                updated += install_file(src_file, JAVA_ROOT / relative).written
+            else:
+                missing.add(name)
+                print(f"  ⚠️  {name} was not produced by the decompiler")
+        print(f"✓ Updated {updated} files")
+
+        if missing:
+            # Record what was installed, not what the DEX holds, so the next run retries these
+            for name in [n for n in current if top_level_class(n) in missing]:
+                if name in previous:
+                    current[name] = previous[name]
+                else:
+                    del current[name]
+            print(f"⚠️  {len(missing)} classes will be retried on the next run")
+
+    for name in sorted(gone):
+        stale = JAVA_ROOT / (name.replace(".", "/") + ".java")
+        if stale.exists():
+            stale.unlink()
+            print(f"  ✓ Removed {stale.name}")
+
+    save_recovery_state(current)
+    return True
+
+def recover_with_cfr_only(scheduler=None, cache=None, workers=None, packages=None):
     """Alternative: Direct CFR decompilation"""
     print("Using CFR directly on DEX files...")
+    scheduler = scheduler or DecompileScheduler()
     
     apk_dir = Path("apk-extracted")
     dex_files = sorted(apk_dir.glob("classes*.dex"))
-    output_dir = Path("src-recovered-full")
-    output_dir.mkdir(exist_ok=True)
     
-    for dex_file in dex_files:
-        print(f"\n  Decompiling {dex_file.name}...")
-        decompile_with_cfr(dex_file, output_dir)
-    
-    return finalize_recovery(output_dir)
+    def make_task(out, options):
+        if workers:
+            return workers.task(out, options)
+        extra_args = [arg for k, v in options.items() for arg in (f"--{k}", v)]
+        return command_task(lambda dex: cfr_command("cfr.jar", dex, out, scheduler.jvm_heap_mb, extra_args))
 
-def finalize_recovery(src_dir):
-    """Move recovered source to project"""
-    print("=" * 70)
-    print("📦 FINALIZING RECOVERY")
-    print("=" * 70 + "\n")
-    
-    # Find com/examinerai directory
-    recovered_src = None
-    for root, dirs, files in os.walk(src_dir):
-        if 'com' in dirs:
-            recovered_src = Path(root) / 'com' / 'examinerai'
-            if recovered_src.exists():
-                break
-    
-    if not recovered_src or not recovered_src.exists():
-        print("⚠️  Could not find com/examinerai in recovered source")
-        print(f"Checking {src_dir}...")
-        
-        # List what we have
-        for item in src_dir.rglob("*.java"):
-            print(f"  - {item.relative_to(src_dir)}")
-            break
-        
+    if not run_recovery(dex_files, make_task, ("cfr", "cfr.jar"), scheduler, cache, packages):
         return False
-    
-    # Count recovered files
-    java_files = list(recovered_src.glob("**/*.java"))
-    print(f"✓ Found {len(java_files)} Java source files\n")
-    
-    if len(java_files) == 0:
-        print("❌ No Java files found in decompiled output")
-        return False
-    
-    # Destination
-    dest_dir = Path("android-app/app/src/main/java/com/examinerai")
-    
-    # Remove old stub files
-    if dest_dir.exists():
-        print(f"Clearing old stub files from {dest_dir}...")
-        for item in dest_dir.glob("*.kt"):
-            item.unlink()
-            print(f"  ✓ Removed {item.name}")
-    else:
-        dest_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Copy recovered source
-    print(f"\nCopying recovered source to {dest_dir}...")
-    for src_file in java_files:
-        dest_file = dest_dir / src_file.name
-        shutil.copy2(src_file, dest_file)
-    
-    print(f"✓ Copied {len(java_files)} files")
-    
-    print("\n" + "=" * 70)
-    print("✅ SOURCE CODE RECOVERY COMPLETE!")
-    print("=" * 70)
-    print(f"\nRestored {len(java_files)} source files to:")
-    print(f"  {dest_dir}\n")
-    
-    print("📝 NOTE: Files are in Java format (.java)")
-    print("   IDE will auto-convert to Kotlin or rebuild with Java\n")
-    
+    save_recovery_state(recovered_snapshot(dex_files, packages))
     return True
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decompile all DEX files and restore the source tree")
+    decompile_pool.add_arguments(parser)
+    decompile_cache.add_arguments(parser)
+    jvm_worker.add_arguments(parser)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-decompile classes whose bytecode changed since the last run")
+    parser.add_argument("--packages", nargs="+", metavar="PREFIX",
+                        help="Only decompile classes under these packages (e.g. com.examinerai)")
+    args = parser.parse_args()
+
+    scheduler = decompile_pool.from_args(args)
+    workers = jvm_worker.from_args(args, scheduler)
+
     print("\n")
     try:
-        if recover_source():
+        if args.incremental:
+            recovered = recover_incremental(scheduler, workers)
+        else:
+            recovered = recover_source(scheduler, decompile_cache.from_args(args), workers, args.packages)
+        if recovered:
             print("\n✔️  PROJECT RECOVERY SUCCESSFUL!")
             print("\nNext steps:")
             print("1. Sync Gradle: File → Sync Now (in Android Studio)")
@@ -262,6 +356,9 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        if workers:
+            workers.close()
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,135 @@
+import org.benf.cfr.reader.api.CfrDriver;
+import org.benf.cfr.reader.api.OutputSinkFactory;
+import org.benf.cfr.reader.api.SinkReturns;
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.util.Arrays;
+import java.util.Collection;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+/**
+ * Long-lived CFR process driven by jvm_worker.py.
+ *
+ * Reads one job per line on stdin: id TAB input TAB outputdir [TAB key=value]...
+ * Writes CLASS / WARN lines while the job runs and a final DONE line:
+ *   CLASS id package.ClassName
+ *   WARN  id message
+ *   DONE  id ok|error [message]
+ * Anything CFR prints itself is redirected to stderr so stdout stays a clean
+ * protocol channel.
+ */
+public class CfrWorker {
+
+    private static PrintStream protocol;
+
+    public static void main(String[] args) throws IOException {
+        protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        System.setOut(System.err);
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        protocol.println("READY");
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] parts = line.split("\t");
+            String id = parts[0];
+            if (parts.length < 3) {
+                emit("DONE", id, "error", "malformed job");
+                continue;
+            }
+            Map<String, String> options = new HashMap<>();
+            for (String option : Arrays.asList(parts).subList(3, parts.length)) {
+                int eq = option.indexOf('=');
+                if (eq > 0) {
+                    options.put(option.substring(0, eq), option.substring(eq + 1));
+                }
+            }
+            try {
+                CfrDriver driver = new CfrDriver.Builder()
+                        .withOptions(options)
+                        .withOutputSink(new JobSink(id, new File(parts[2])))
+                        .build();
+                driver.analyse(Collections.singletonList(parts[1]));
+                emit("DONE", id, "ok");
+            } catch (Throwable t) {
+                emit("DONE", id, "error", String.valueOf(t));
+            }
+        }
+    }
+
+    private static synchronized void emit(String... fields) {
+        StringBuilder sb = new StringBuilder();
+        for (int i = 0; i < fields.length; i++) {
+            if (i > 0) {
+                sb.append('\t');
+            }
+            sb.append(fields[i].replace('\t', ' ').replace('\n', ' ').replace('\r', ' '));
+        }
+        protocol.println(sb);
+    }
+
+    /** Writes each decompiled class under outputdir and reports it. */
+    private static class JobSink implements OutputSinkFactory {
+        private final String id;
+        private final File outputDir;
+
+        JobSink(String id, File outputDir) {
+            this.id = id;
+            this.outputDir = outputDir;
+        }
+
+        @Override
+        public List<SinkClass> getSupportedSinks(SinkType sinkType, Collection<SinkClass> available) {
+            if (sinkType == SinkType.JAVA && available.contains(SinkClass.DECOMPILED)) {
+                return Collections.singletonList(SinkClass.DECOMPILED);
+            }
+            if (sinkType == SinkType.EXCEPTION && available.contains(SinkClass.EXCEPTION_MESSAGE)) {
+                return Collections.singletonList(SinkClass.EXCEPTION_MESSAGE);
+            }
+            return Collections.singletonList(SinkClass.STRING);
+        }
+
+        @Override
+        @SuppressWarnings("unchecked")
+        public <T> Sink<T> getSink(SinkType sinkType, SinkClass sinkClass) {
+            if (sinkType == SinkType.JAVA && sinkClass == SinkClass.DECOMPILED) {
+                return x -> writeClass((SinkReturns.Decompiled) x);
+            }
+            if (sinkType == SinkType.EXCEPTION && sinkClass == SinkClass.EXCEPTION_MESSAGE) {
+                return x -> {
+                    SinkReturns.ExceptionMessage e = (SinkReturns.ExceptionMessage) x;
+                    emit("WARN", id, e.getPath() + ": " + e.getMessage());
+                };
+            }
+            return x -> { };
+        }
+
+        private void writeClass(SinkReturns.Decompiled decompiled) {
+            String pkg = decompiled.getPackageName();
+            String name = decompiled.getClassName();
+            File dir = pkg.isEmpty() ? outputDir : new File(outputDir, pkg.replace('.', File.separatorChar));
+            try {
+                Files.createDirectories(dir.toPath());
+                Files.write(new File(dir, name + ".java").toPath(),
+                        decompiled.getJava().getBytes(StandardCharsets.UTF_8));
+                emit("CLASS", id, pkg.isEmpty() ? name : pkg + "." + name);
+            } catch (IOException e) {
+                emit("WARN", id, name + ": " + e);
+            }
+        }
+    }
+}
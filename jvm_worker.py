@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Persistent CFR worker
+Starts one JVM per worker slot and streams decompile jobs to it over
+stdin/stdout instead of paying JVM startup for every DEX or JAR
+"""
+import itertools
+import queue
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+WORKER_SOURCE = Path(__file__).parent / "java" / "CfrWorker.java"
+STARTUP_TIMEOUT = 120
+
+WorkerResult = namedtuple('WorkerResult', 'ok classes warnings error')
+
+
+class WorkerError(RuntimeError):
+    """Raised when the worker JVM dies or stops answering"""
+
+
+class JvmWorker:
+    """One long-lived CFR JVM speaking the CfrWorker line protocol"""
+
+    def __init__(self, cfr_jar="cfr.jar", heap_mb=None, java="java"):
+        self.cfr_jar = Path(cfr_jar)
+        self.heap_mb = heap_mb
+        self.java = java
+        self._proc = None
+        self._lines = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def command(self):
+        cmd = [self.java]
+        if self.heap_mb:
+            cmd.append(f"-Xmx{self.heap_mb}m")
+        # Java 11+ runs a single source file directly, no javac step needed
+        return cmd + ["-cp", str(self.cfr_jar), str(WORKER_SOURCE)]
+
+    def start(self):
+        if self._proc and self._proc.poll() is None:
+            return self
+        self._proc = subprocess.Popen(
+            self.command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines), daemon=True).start()
+        if self._next_line(STARTUP_TIMEOUT) != "READY":
+            self.close()
+            raise WorkerError("CFR worker did not start")
+        return self
+
+    @staticmethod
+    def _pump(proc, lines):
+        for line in proc.stdout:
+            lines.put(line.rstrip("\n"))
+        lines.put(None)
+
+    def _next_line(self, timeout):
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired(self.command(), timeout)
+        if line is None:
+            raise WorkerError("CFR worker exited")
+        return line
+
+    def decompile(self, input_file, output_dir, timeout=None, options=None):
+        """Decompile one DEX/JAR into output_dir and return a WorkerResult
+
+        timeout bounds the whole job, not each line of output.
+        """
+        with self._lock:
+            self.start()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            job_id = str(next(self._ids))
+            fields = [job_id, str(input_file), str(output_dir)]
+            fields += [f"{k}={v}" for k, v in (options or {}).items()]
+            try:
+                self._proc.stdin.write("\t".join(fields) + "\n")
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.close()
+                raise WorkerError("CFR worker exited")
+
+            classes, warnings = [], []
+            try:
+                while True:
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    kind, line_id, *rest = self._next_line(remaining).split("\t")
+                    if line_id != job_id:
+                        continue
+                    if kind == "CLASS":
+                        classes.append(rest[0])
+                    elif kind == "WARN":
+                        warnings.append(rest[0] if rest else "")
+                    elif kind == "DONE":
+                        ok = rest[0] == "ok"
+                        return WorkerResult(ok, classes, warnings, None if ok else " ".join(rest[1:]))
+            except (subprocess.TimeoutExpired, WorkerError):
+                # The JVM state is unknown after a timeout; start fresh next job
+                self.close(kill=True)
+                raise
+
+    def close(self, kill=False):
+        proc, self._proc = self._proc, None
+        if not proc:
+            return
+        if kill:
+            proc.kill()
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JvmWorkerPool:
+    """A fixed set of JvmWorkers handed out to scheduler tasks"""
+
+    def __init__(self, size, cfr_jar="cfr.jar", heap_mb=None, java="java"):
+        self._idle = queue.Queue()
+        self._workers = [JvmWorker(cfr_jar, heap_mb, java) for _ in range(max(1, size))]
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def decompile(self, input_file, output_dir, timeout=None, options=None):
+        worker = self._idle.get()
+        try:
+            return worker.decompile(input_file, output_dir, timeout, options)
+        finally:
+            self._idle.put(worker)
+
+    def task(self, output_dir, options=None):
+        """Scheduler task factory: decompile each item into output_dir"""
+        def task(input_file, timeout):
+            return self.decompile(input_file, output_dir, timeout, options).ok
+        return task
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_arguments(parser):
+    """Register the persistent-worker flag on an argparse parser"""
+    parser.add_argument("--persistent-jvm", action="store_true",
+                        help="Keep one CFR JVM per worker alive and stream every DEX to it")
+
+
+def from_args(args, scheduler, cfr_jar="cfr.jar"):
+    """Return a JvmWorkerPool sized to the scheduler, or None if not requested"""
+    if not args.persistent_jvm:
+        return None
+    return JvmWorkerPool(scheduler.workers, cfr_jar, scheduler.jvm_heap_mb)
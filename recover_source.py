@@ -26,8 +26,8 @@ def extract_apk_structure():
         # Try to extract META-INF for build info
         print("\n🔍 Looking for source references in manifest...")
         if 'AndroidManifest.xml' in z.namelist():
-            manifest = z.read('AndroidManifest.xml')
-            print(f"  - AndroidManifest.xml found ({len(manifest)} bytes)")
+            manifest = z.getinfo('AndroidManifest.xml')
+            print(f"  - AndroidManifest.xml found ({manifest.file_size} bytes)")
         
         # Extract resources
         resources = [f for f in z.namelist() if f.startswith('resources/') or f.startswith('res/')]
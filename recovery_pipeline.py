@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Staged streaming engine for source recovery
+Runs extract -> index -> filter -> decompile -> post-process -> install
+as threads connected by bounded queues, so every stage starts on the
+first item as soon as the previous stage emits it
+"""
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from apk_extract import DEFAULT_SELECTOR, iter_extract, is_dex
+import decompile_cache
+from dex_index import DexIndex
+from dex_reader import DexFile
+
+RecoveryJob = namedtuple('RecoveryJob', 'dex classes')
+InstallResult = namedtuple('InstallResult', 'path written')
+
+DEFAULT_QUEUE_SIZE = 4
+INSTALL_PREFIX = "com.examinerai."
+INSTALL_WORKERS = 8
+_PACKAGE_DECL = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: fn(item) returns an iterable of items for the next stage"""
+
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = []
+        self.busy = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def process(self, item, emit):
+        """Run fn on one item, passing its outputs to emit; errors drop the item"""
+        start = time.monotonic()
+        blocked = 0.0
+        out = 0
+        try:
+            for result in self.fn(item) or ():
+                # Time spent waiting on a full downstream queue is not work
+                put_start = time.monotonic()
+                emit(result)
+                blocked += time.monotonic() - put_start
+                out += 1
+        except Exception as e:
+            with self._lock:
+                self.errors.append((item, str(e) or type(e).__name__))
+        end = time.monotonic()
+        with self._lock:
+            self.items_in += 1
+            self.items_out += out
+            self.busy += end - start - blocked
+            self.first_start = start if self.first_start is None else min(self.first_start, start)
+            self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+
+class Pipeline:
+    """Chain of stages connected by bounded queues"""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.started = None
+        self.elapsed = 0.0
+
+    def stage(self, name):
+        return next(stage for stage in self.stages if stage.name == name)
+
+    def run(self, items):
+        """Push items through every stage; returns what the last stage emitted"""
+        stages = self.stages
+        queues = [queue.Queue(self.queue_size) for _ in stages]
+        remaining = [stage.workers for stage in stages]
+        lock = threading.Lock()
+        stop = threading.Event()
+        results = []
+
+        def emit(index, item):
+            if index + 1 < len(stages):
+                queues[index + 1].put(item)
+            else:
+                results.append(item)
+
+        def worker(index):
+            stage = stages[index]
+            while True:
+                item = queues[index].get()
+                if item is _DONE:
+                    break
+                if not stop.is_set():
+                    stage.process(item, lambda out: emit(index, out))
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            # The last worker out tells every worker of the next stage to finish
+            if last and index + 1 < len(stages):
+                for _ in range(stages[index + 1].workers):
+                    queues[index + 1].put(_DONE)
+
+        def feed():
+            try:
+                for item in items:
+                    if stop.is_set():
+                        break
+                    queues[0].put(item)
+            finally:
+                for _ in range(stages[0].workers):
+                    queues[0].put(_DONE)
+
+        threads = [threading.Thread(target=feed, name="feed", daemon=True)]
+        for index, stage in enumerate(stages):
+            threads += [threading.Thread(target=worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+
+        self.started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # join() with a timeout keeps Ctrl-C responsive
+                while thread.is_alive():
+                    thread.join(0.2)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+        finally:
+            self.elapsed = time.monotonic() - self.started
+        return results
+
+    def summary(self):
+        rows = []
+        for stage in self.stages:
+            rows.append({
+                "stage": stage.name,
+                "workers": stage.workers,
+                "in": stage.items_in,
+                "out": stage.items_out,
+                "errors": len(stage.errors),
+                "busy_s": round(stage.busy, 3),
+                "first_start_s": round(stage.first_start - self.started, 3) if stage.first_start else None,
+                "last_end_s": round(stage.last_end - self.started, 3) if stage.last_end else None,
+            })
+        return rows
+
+    def print_summary(self):
+        print(f"\n  {'stage':12s} {'in':>5s} {'out':>5s} {'err':>4s} {'busy':>8s} {'start':>7s} {'end':>7s}")
+        for row in self.summary():
+            start = f"{row['first_start_s']:.1f}s" if row['first_start_s'] is not None else "-"
+            end = f"{row['last_end_s']:.1f}s" if row['last_end_s'] is not None else "-"
+            print(f"  {row['stage']:12s} {row['in']:5d} {row['out']:5d} {row['errors']:4d} "
+                  f"{row['busy_s']:7.1f}s {start:>7s} {end:>7s}")
+        print(f"  total {self.elapsed:.1f}s")
+        for stage in self.stages:
+            for item, error in stage.errors:
+                print(f"  ❌ {stage.name}: {getattr(item, 'name', item)}: {error}")
+
+
+def package_filter(prefixes):
+    """CFR jarfilter regex matching every class under the given packages"""
+    packages = "|".join(re.escape(prefix.rstrip(".")) for prefix in sorted(prefixes))
+    return f"^(?:{packages})\\..*$"
+
+
+def declared_package(java_file):
+    """The package a .java file declares ('' for the default package)"""
+    with open(java_file, encoding="utf-8", errors="replace") as f:
+        match = _PACKAGE_DECL.search(f.read(64 * 1024))
+    return match.group(1) if match else ""
+
+
+def clear_stubs(dest_dir, source_root=None):
+    """Remove the placeholder .kt files the recovered .java files replace
+
+    With source_root, also remove .java files whose declared package does
+    not match their directory, such as the flattened copies older
+    recoveries wrote into dest_dir; they clash with the real classes.
+    """
+    if not dest_dir.exists():
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        return
+    print(f"Clearing old stub files from {dest_dir}...")
+    for item in dest_dir.glob("*.kt"):
+        item.unlink()
+        print(f"  ✓ Removed {item.name}")
+    if source_root is None:
+        return
+    for item in dest_dir.rglob("*.java"):
+        expected = ".".join(item.parent.relative_to(source_root).parts)
+        if declared_package(item) != expected:
+            item.unlink()
+            print(f"  ✓ Removed misplaced {item.relative_to(source_root)}")
+
+
+def install_file(src_file, dest_file):
+    """Copy src_file over dest_file unless its content is already there
+
+    The copy goes to a temporary file next to dest_file and is renamed into
+    place, so an interrupted install never leaves a truncated source file.
+    """
+    try:
+        unchanged = (dest_file.stat().st_size == src_file.stat().st_size
+                     and decompile_cache.file_sha256(dest_file) == decompile_cache.file_sha256(src_file))
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        return InstallResult(dest_file, False)
+
+    dest_file.parent.mkdir(parents=True, exist_ok=True)
+    partial = dest_file.with_name(f".{dest_file.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        shutil.copy2(src_file, partial)
+        os.replace(partial, dest_file)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return InstallResult(dest_file, True)
+
+
+def recovery_pipeline(output_dir, make_task, scheduler, cache=None, tool=("cfr", "cfr.jar"),
+                      extract_dir=None, packages=None, install_root=None,
+                      install_prefix=INSTALL_PREFIX, index_path=None, queue_size=DEFAULT_QUEUE_SIZE,
+                      install_workers=INSTALL_WORKERS):
+    """Build the recovery pipeline
+
+    Items are APK paths when extract_dir is given, DEX paths otherwise.
+    make_task(out_dir, cfr_options) is a scheduler task factory. packages
+    limits decompilation to those package prefixes; install_root is a
+    source root (e.g. app/src/main/java) that receives the recovered classes
+    under install_prefix at their package paths, as InstallResult items.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefixes = tuple(p.rstrip(".") + "." for p in packages) if packages else None
+    options = {"jarfilter": package_filter(packages)} if packages else {}
+    tool_id = decompile_cache.tool_id(tool[0], tool[1], flags=tuple(f"{k}={v}" for k, v in options.items()))
+    task = decompile_cache.cached(cache, lambda out: make_task(out, options), output_dir, tool_id)
+    stages = []
+
+    if extract_dir is not None:
+        def extract(apk):
+            for _, path in iter_extract(apk, extract_dir, DEFAULT_SELECTOR):
+                if is_dex(path):
+                    yield path
+        stages.append(Stage("extract", extract))
+
+    def index(dex_file):
+        if index_path:
+            with DexIndex(index_path) as db:
+                db.add_dex(dex_file)
+        with DexFile(dex_file) as dex:
+            yield RecoveryJob(dex_file, dex.class_names())
+    stages.append(Stage("index", index))
+
+    def select(job):
+        if prefixes is None:
+            yield job
+            return
+        wanted = [name for name in job.classes if name.startswith(prefixes)]
+        if wanted:
+            yield job._replace(classes=wanted)
+    stages.append(Stage("filter", select))
+
+    done = [0]
+    done_lock = threading.Lock()
+
+    def decompile(job):
+        result = scheduler.attempt(task, job.dex)
+        status = "✓" if result.ok else f"❌ {result.error}"
+        retry = f", {result.attempts} attempts" if result.attempts > 1 else ""
+        with done_lock:
+            done[0] += 1
+            print(f"  [{done[0]}] {job.dex.name} {status} ({result.elapsed:.1f}s{retry})")
+        if result.ok:
+            yield job
+    stages.append(Stage("decompile", decompile, scheduler.workers))
+
+    def postprocess(job):
+        # The class list says exactly which files this DEX produced; no tree walk
+        for name in job.classes:
+            if "$" in name or (install_prefix and not name.startswith(install_prefix)):
+                continue
+            src_file = output_dir / (name.replace(".", "/") + ".java")
+            if src_file.exists():
+                yield src_file
+    stages.append(Stage("postprocess", postprocess))
+
+    if install_root is not None:
+        install_root = Path(install_root)
+        stub_dir = install_root / install_prefix.rstrip(".").replace(".", "/") if install_prefix else install_root
+        clear_lock = threading.Lock()
+        cleared = []
+
+        def install(src_file):
+            with clear_lock:
+                if not cleared:
+                    clear_stubs(stub_dir, install_root)
+                    cleared.append(True)
+            yield install_file(src_file, install_root / src_file.relative_to(output_dir))
+        stages.append(Stage("install", install, install_workers))
+
+    return Pipeline(stages, queue_size)
+
+
+def main(argv=None):
+    import argparse
+
+    import decompile_pool
+    from decompile_pool import cfr_command, command_task
+
+    parser = argparse.ArgumentParser(description="Stream APKs or DEX files through the recovery pipeline")
+    parser.add_argument("inputs", nargs="*", help="APK files, or DEX files with --no-extract "
+                                                  "(default: apk-extracted/classes*.dex)")
+    parser.add_argument("--output", default="src-recovered", help="Decompiled output directory")
+    parser.add_argument("--packages", nargs="+", metavar="PREFIX", help="Only decompile these packages")
+    parser.add_argument("--install", action="store_true",
+                        help="Install recovered com.examinerai classes into android-app/")
+    decompile_pool.add_arguments(parser)
+    decompile_cache.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    inputs = [Path(p) for p in args.inputs] or sorted(Path("apk-extracted").glob("classes*.dex"))
+    if not inputs:
+        print("❌ Nothing to recover")
+        return 1
+    apks = [p for p in inputs if p.suffix != ".dex"]
+    if apks and len(apks) != len(inputs):
+        print("❌ Pass either APK files or DEX files, not both")
+        return 1
+
+    scheduler = decompile_pool.from_args(args)
+    cache = decompile_cache.from_args(args)
+
+    def make_task(out, options):
+        extra_args = [arg for k, v in options.items() for arg in (f"--{k}", v)]
+        return command_task(lambda dex: cfr_command("cfr.jar", dex, out, scheduler.jvm_heap_mb, extra_args))
+
+    pipeline = recovery_pipeline(
+        args.output, make_task, scheduler, cache,
+        extract_dir=Path("apk-extracted") if apks else None, packages=args.packages,
+        install_root=Path("android-app/app/src/main/java") if args.install else None)
+    results = pipeline.run(inputs)
+    pipeline.print_summary()
+    if args.install:
+        written = sum(1 for result in results if result.written)
+        print(f"\n✓ {len(results)} source files installed ({written} written, "
+              f"{len(results) - written} unchanged)")
+    else:
+        print(f"\n✓ {len(results)} source files recovered")
+    failed = [stage.name for stage in pipeline.stages if stage.errors]
+    if failed:
+        print(f"⚠️  Errors in: {', '.join(failed)}")
+    return 0 if results and not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,14 @@ Download and setup Java Decompiler tools
 import subprocess
 import os
 import sys
+import zipfile
 from pathlib import Path
 
+from apk_manifest import AxmlError, read_manifest
+from dex_reader import DexFile
+
+DEFAULT_APK = "android-app/app/build/outputs/apk/standard/debug/app-standard-debug.apk"
+
 def check_and_download_decompilers():
     """Setup decompilers to recover source code"""
     
@@ -37,10 +43,7 @@ def check_and_download_decompilers():
 
 def extract_class_names_from_apk():
     """Extract class names from DEX files"""
-    import zipfile
-    import struct
-    
-    apk = "android-app/app/build/outputs/apk/standard/debug/app-standard-debug.apk"
+    apk = DEFAULT_APK
     
     print(f"\n📱 Extracting class information from {apk}...\n")
     
@@ -49,28 +52,38 @@ def extract_class_names_from_apk():
         return
     
     with zipfile.ZipFile(apk, 'r') as z:
-        # Get main DEX file
-        dex_data = z.read('classes.dex')
-        
-        # DEX format: first string IDs are at offset 0x70+
-        # This is a simplified check
-        print("✅ APK contains multiple DEX files with compiled code:")
-        dex_files = [f for f in z.namelist() if f.startswith('classes') and f.endswith('.dex')]
-        print(f"   Total DEX files: {len(dex_files)}")
-        
-        print("\n📦 The compiled code is in bytecode format (dex).")
-        print("   To recover: use CFR or similar Java decompiler")
+        dex_files = sorted(f for f in z.namelist() if f.startswith('classes') and f.endswith('.dex'))
+
+    print("✅ APK contains multiple DEX files with compiled code:")
+    print(f"   Total DEX files: {len(dex_files)}")
+    # Each DEX is mapped (or spooled to a temp file) rather than read into memory
+    for name in dex_files:
+        with DexFile.from_zip(apk, name) as dex:
+            print(f"   - {name}: {dex.header.class_defs_size} classes, "
+                  f"{dex.header.method_ids_size} methods")
 
-def list_recovery_options():
+    print("\n📦 The compiled code is in bytecode format (dex).")
+    print("   To recover: use CFR or similar Java decompiler")
+
+def list_recovery_options(apk=DEFAULT_APK):
     print("\n" + "="*70)
     print("🆘 SOURCE CODE RECOVERY OPTIONS")
     print("="*70)
     
-    print("\n✅ GOOD NEWS:")
-    print("   • Your APK was built successfully (examinerai v1.1)")
-    print("   • Correct package name: com.examinerai ✓")
-    print("   • All compiled code is in the APK ✓")
-    print("   • APK is ready to install and test ✓")
+    try:
+        info = read_manifest(apk)
+    except (OSError, KeyError, zipfile.BadZipFile, AxmlError) as e:
+        print(f"\n⚠️  Could not read the APK manifest: {e}")
+        info = None
+
+    if info:
+        print("\n✅ GOOD NEWS:")
+        print(f"   • Your APK was built successfully ({info.label or info.package} v{info.version_name}, "
+              f"versionCode {info.version_code})")
+        print(f"   • Package name: {info.package} ✓")
+        print(f"   • {len(info.activities)} activities, launcher {info.launcher} ✓")
+        print(f"   • {len(info.permissions)} permissions: {', '.join(info.permissions) or 'none'}")
+        print("   • All compiled code is in the APK ✓")
     
     print("\n❌ BAD NEWS:")
     print("   • Source .kt files were accidentally deleted")
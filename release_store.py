@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Content-addressed release archive for BuildManager
+Each artifact is hashed once and stored under its digest; the timestamped
+release names are hard links (or symlinks) to the stored object, so an
+unchanged build costs no disk space and no copy
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_RELEASES_DIR = Path("releases")
+DEFAULT_KEEP = 10
+OBJECTS_DIR = ".objects"
+INDEX_NAME = "releases.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReleaseStore:
+    """releases/ as digest-named objects plus named links, with retention"""
+
+    def __init__(self, root: Path = DEFAULT_RELEASES_DIR):
+        self.root = Path(root)
+        self.objects = self.root / OBJECTS_DIR
+        self.index_path = self.root / INDEX_NAME
+        self.entries = self._load()
+        # Hashing runs unlocked; storing, linking and pruning are serialized
+        # so a prune never deletes an object that is being added
+        self._lock = threading.Lock()
+
+    def _load(self) -> list:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        partial = self.index_path.with_suffix(".tmp")
+        with open(partial, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(partial, self.index_path)
+
+    def object_path(self, digest: str, suffix: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}{suffix}"
+
+    def _link(self, target: Path, link: Path) -> str:
+        """Expose target as link; returns 'hardlink', 'symlink' or 'copy'"""
+        partial = link.with_name(f".{link.name}.tmp")
+        partial.unlink(missing_ok=True)
+        try:
+            os.link(target, partial)
+            mode = "hardlink"
+        except OSError:
+            # Hard links fail across filesystems and on some network shares
+            try:
+                os.symlink(os.path.relpath(target, link.parent), partial)
+                mode = "symlink"
+            except OSError:
+                shutil.copy2(target, partial)
+                mode = "copy"
+        os.replace(partial, link)
+        return mode
+
+    def add(self, source: Path, name: str, series: str = None, tags: list = ()) -> dict:
+        """Store source as release name; identical content reuses the stored object"""
+        source = Path(source)
+        digest = file_digest(source)
+        obj = self.object_path(digest, source.suffix)
+        with self._lock:
+            reused = obj.exists()
+            if not reused:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                partial = obj.with_name(f".{obj.name}.tmp")
+                shutil.copy2(source, partial)
+                # Every release name shares this inode; nobody may edit it in place
+                os.chmod(partial, 0o444)
+                os.replace(partial, obj)
+
+            entry = {
+                "name": name,
+                "series": series or name,
+                "digest": digest,
+                "size": obj.stat().st_size,
+                "time": time.time(),
+                "tags": sorted(set(tags)),
+                "link": self._link(obj, self.root / name),
+                "reused": reused,
+            }
+            self.entries = [e for e in self.entries if e["name"] != name]
+            self.entries.append(entry)
+            self._save()
+        return entry
+
+    def tag(self, name: str, tag: str) -> bool:
+        with self._lock:
+            for entry in self.entries:
+                if entry["name"] == name:
+                    entry["tags"] = sorted(set(entry["tags"]) | {tag})
+                    self._save()
+                    return True
+        return False
+
+    def prune(self, keep: int = DEFAULT_KEEP) -> list:
+        """Drop all but the newest keep releases of each series (tagged ones stay)
+
+        Returns the removed release names; objects nothing links to any more
+        are deleted too. keep <= 0 keeps everything.
+        """
+        if keep <= 0:
+            return []
+        with self._lock:
+            return self._prune(keep)
+
+    def _prune(self, keep: int) -> list:
+        kept, removed = [], []
+        by_series = {}
+        for entry in sorted(self.entries, key=lambda e: e["time"], reverse=True):
+            by_series.setdefault(entry["series"], []).append(entry)
+        for entries in by_series.values():
+            for position, entry in enumerate(entries):
+                (kept if position < keep or entry["tags"] else removed).append(entry)
+        if not removed:
+            return []
+
+        for entry in removed:
+            (self.root / entry["name"]).unlink(missing_ok=True)
+        self.entries = sorted(kept, key=lambda e: e["time"])
+        self._save()
+
+        live = {entry["digest"] for entry in self.entries}
+        for obj in self.objects.glob("*/*"):
+            if obj.name.split(".", 1)[0] not in live and not obj.name.startswith("."):
+                obj.unlink()
+        return [entry["name"] for entry in removed]
+
+    def disk_usage(self) -> int:
+        """Bytes actually stored: each object once, however many names link to it"""
+        return sum(obj.stat().st_size for obj in self.objects.glob("*/*"))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List, tag and prune the release archive")
+    parser.add_argument("--dir", default=str(DEFAULT_RELEASES_DIR), help="Release directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show every release")
+    tag = sub.add_parser("tag", help="Tag a release so pruning keeps it")
+    tag.add_argument("name")
+    tag.add_argument("tag")
+    prune = sub.add_parser("prune", help="Remove old untagged releases")
+    prune.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="Releases to keep per series (0 keeps all)")
+    args = parser.parse_args(argv)
+
+    store = ReleaseStore(Path(args.dir))
+    if args.command == "list":
+        for entry in store.entries:
+            tags = f"  [{', '.join(entry['tags'])}]" if entry["tags"] else ""
+            print(f"  {entry['name']:40s} {entry['digest'][:12]} {entry['size'] / 1024 / 1024:8.1f} MB{tags}")
+        logical = sum(entry["size"] for entry in store.entries)
+        print(f"✓ {len(store.entries)} releases, {logical / 1024 / 1024:.1f} MB "
+              f"stored as {store.disk_usage() / 1024 / 1024:.1f} MB")
+    elif args.command == "tag":
+        if not store.tag(args.name, args.tag):
+            print(f"❌ No release named {args.name}")
+            return 1
+        print(f"✓ Tagged {args.name}: {args.tag}")
+    else:
+        removed = store.prune(args.keep)
+        for name in removed:
+            print(f"  ✓ Removed {name}")
+        print(f"✓ {len(removed)} releases pruned, {len(store.entries)} kept")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
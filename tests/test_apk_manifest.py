@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+AXML and resources.arsc decoding on small hand-built fixtures
+"""
+import io
+import struct
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apk_manifest import (AxmlError, ResourceTable, TYPE_INT_BOOLEAN, TYPE_INT_DEC, TYPE_REFERENCE,
+                          TYPE_STRING, parse_axml, read_manifest)
+
+NO_ENTRY = 0xFFFFFFFF
+ATTR_NAME = 0x01010003
+ATTR_LABEL = 0x01010001
+
+
+def _pad4(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+def string_pool(strings, utf8):
+    """ResStringPool chunk holding strings"""
+    offsets, data = [], b''
+    for text in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = text.encode('utf-8')
+            data += bytes([len(text), len(encoded)]) + encoded + b'\0'
+        else:
+            data += struct.pack('<H', len(text)) + text.encode('utf-16-le') + b'\0\0'
+    data = _pad4(data)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    size = strings_start + len(data)
+    header = struct.pack('<HHIIIIII', 0x0001, header_size, size, len(strings), 0,
+                         0x100 if utf8 else 0, strings_start, 0)
+    return header + struct.pack(f'<{len(strings)}I', *offsets) + data
+
+
+def start_element(name, attrs):
+    """attrs: (name index, raw string index or NO_ENTRY, data type, data)"""
+    ext = struct.pack('<IIHHHHHH', NO_ENTRY, name, 20, 20, len(attrs), 0, 0, 0)
+    for attr_name, raw, data_type, data in attrs:
+        ext += struct.pack('<IIIHBBI', NO_ENTRY, attr_name, raw, 8, 0, data_type, data)
+    return struct.pack('<HHIII', 0x0102, 16, 16 + len(ext), 0, NO_ENTRY) + ext
+
+
+def end_element(name):
+    return struct.pack('<HHIIIII', 0x0103, 16, 24, 0, NO_ENTRY, NO_ENTRY, name)
+
+
+def axml(strings, resource_ids, body, utf8=True):
+    chunks = string_pool(strings, utf8)
+    chunks += struct.pack('<HHI', 0x0180, 8, 8 + 4 * len(resource_ids)) + struct.pack(
+        f'<{len(resource_ids)}I', *resource_ids)
+    chunks += body
+    return struct.pack('<HHI', 0x0003, 8, 8 + len(chunks)) + chunks
+
+
+def entry(data_type, data):
+    return struct.pack('<HHI', 8, 0, 0) + struct.pack('<HBBI', 8, 0, data_type, data)
+
+
+def compact_entry(data_type, data):
+    return struct.pack('<HHI', 0, 0x0008 | (data_type << 8), data)
+
+
+def type_chunk(type_id, entries, flags=0):
+    """ResTable_type with entries {index: entry bytes} in the layout flags selects"""
+    blob, table = b'', b''
+    count = max(entries) + 1 if entries else 0
+    if flags & 0x01:
+        for index in sorted(entries):
+            table += struct.pack('<HH', index, len(blob) // 4)
+            blob += entries[index]
+        count = len(entries)
+    elif flags & 0x02:
+        for index in range(count):
+            if index in entries:
+                table += struct.pack('<H', len(blob) // 4)
+                blob += entries[index]
+            else:
+                table += struct.pack('<H', 0xFFFF)
+    else:
+        for index in range(count):
+            if index in entries:
+                table += struct.pack('<I', len(blob))
+                blob += entries[index]
+            else:
+                table += struct.pack('<I', NO_ENTRY)
+    table = _pad4(table)
+    header_size = 24
+    entries_start = header_size + len(table)
+    header = struct.pack('<HHIBBHII', 0x0201, header_size, entries_start + len(blob), type_id, flags, 0,
+                         count, entries_start) + struct.pack('<I', 4)
+    return header + table + blob
+
+
+def resource_table(strings, types, utf8=False):
+    package = b''.join(types)
+    header_size = 288
+    package = struct.pack('<HHII', 0x0200, header_size, header_size + len(package), 0x7f) + \
+        b'\0' * (header_size - 12) + package
+    body = string_pool(strings, utf8) + package
+    return struct.pack('<HHII', 0x0002, 12, 12 + len(body), 1) + body
+
+
+def res_id(type_id, index):
+    return 0x7f000000 | (type_id << 16) | index
+
+
+class ResourceTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ResourceTable(resource_table(
+            ["Examiner", "unused"],
+            [
+                # string type: plain 32-bit offsets, with a hole at index 1
+                type_chunk(1, {0: entry(TYPE_STRING, 0), 2: entry(TYPE_REFERENCE, res_id(1, 0))}),
+                # bool type: sparse
+                type_chunk(2, {5: entry(TYPE_INT_BOOLEAN, 1), 9: entry(TYPE_INT_BOOLEAN, 0)}, flags=0x01),
+                # integer type: 16-bit offsets and a compact entry
+                type_chunk(3, {0: compact_entry(TYPE_INT_DEC, 42), 2: entry(TYPE_INT_DEC, 0xFFFFFFFF)},
+                           flags=0x02),
+            ]))
+
+    def test_plain_offsets(self):
+        self.assertEqual(self.table.resolve(res_id(1, 0)), "Examiner")
+        self.assertIsNone(self.table.resolve(res_id(1, 1)))
+
+    def test_reference_is_followed(self):
+        self.assertEqual(self.table.resolve(res_id(1, 2)), "Examiner")
+
+    def test_sparse_entries(self):
+        self.assertIs(self.table.resolve(res_id(2, 5)), True)
+        self.assertIs(self.table.resolve(res_id(2, 9)), False)
+        self.assertIsNone(self.table.resolve(res_id(2, 6)))
+
+    def test_offset16_and_compact_entries(self):
+        self.assertEqual(self.table.resolve(res_id(3, 0)), 42)
+        self.assertIsNone(self.table.resolve(res_id(3, 1)))
+        self.assertEqual(self.table.resolve(res_id(3, 2)), -1)
+
+    def test_unknown_type(self):
+        self.assertIsNone(self.table.resolve(res_id(9, 0)))
+
+    def test_truncated_table(self):
+        data = resource_table(["x"], [type_chunk(1, {0: entry(TYPE_STRING, 0)})])
+        with self.assertRaises(AxmlError):
+            ResourceTable(data[:40])
+
+
+class ParseAxmlTest(unittest.TestCase):
+
+    STRINGS = ["name", "label", "manifest", "package", "application", "activity", ".Main",
+               "com.example.app", "Fallback"]
+
+    def document(self, utf8=True, label=None):
+        # android:label is a reference when label is a resource id, else a raw string
+        label_attr = (1, NO_ENTRY, TYPE_REFERENCE, label) if label else (1, 8, TYPE_STRING, 8)
+        body = (start_element(2, [(3, 7, TYPE_STRING, 7)])
+                + start_element(4, [label_attr])
+                + start_element(5, [(0, 6, TYPE_STRING, 6)])
+                + end_element(5) + end_element(4) + end_element(2))
+        return axml(self.STRINGS, [ATTR_NAME, ATTR_LABEL], body, utf8)
+
+    def test_utf8_and_utf16_pools(self):
+        for utf8 in (True, False):
+            manifest = parse_axml(self.document(utf8))
+            self.assertEqual(manifest.tag, "manifest")
+            self.assertEqual(manifest.attrs["package"], "com.example.app")
+            application = manifest.children[0]
+            self.assertEqual(application.attrs["label"], "Fallback")
+            self.assertEqual(application.children[0].attrs["name"], ".Main")
+
+    def test_reference_resolved_through_resources(self):
+        table = ResourceTable(resource_table(["Examiner"], [type_chunk(1, {0: entry(TYPE_STRING, 0)})]))
+        manifest = parse_axml(self.document(label=res_id(1, 0)), table)
+        self.assertEqual(manifest.children[0].attrs["label"], "Examiner")
+
+    def test_unresolved_reference_kept_as_id(self):
+        manifest = parse_axml(self.document(label=res_id(1, 7)))
+        self.assertEqual(manifest.children[0].attrs["label"], "@0x7f010007")
+
+    def test_truncated_document_raises_axml_error(self):
+        data = self.document()
+        for size in (4, 40, len(data) // 2):
+            with self.assertRaises(AxmlError):
+                parse_axml(data[:size])
+
+    def test_read_manifest_from_apk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            apk = Path(tmp) / "app.apk"
+            with zipfile.ZipFile(apk, 'w') as zf:
+                zf.writestr("AndroidManifest.xml", self.document())
+            info = read_manifest(apk)
+        self.assertEqual(info.package, "com.example.app")
+        self.assertEqual(info.activities, ["com.example.app.Main"])
+        self.assertEqual(info.label, "Fallback")
+
+    def test_app_bundle_is_rejected(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as zf:
+            zf.writestr("base/manifest/AndroidManifest.xml", b"\x0a\x00")
+        with self.assertRaises(AxmlError):
+            read_manifest(buf)
+
+
+if __name__ == "__main__":
+    unittest.main()
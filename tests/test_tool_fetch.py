@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+tool_fetch against a local HTTP server with Range/If-Range support
+"""
+import hashlib
+import http.server
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import tool_fetch
+from tool_fetch import ChecksumError, ToolFetcher, ToolSpec
+
+ORIGINAL = bytes(range(256)) * 400
+CHANGED = bytes(reversed(range(256))) * 400
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves server.body with an ETag, honouring Range and If-Range"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.headers.get("Range"), self.headers.get("If-Range")))
+        body = server.body
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        offset = 0
+        requested = self.headers.get("Range")
+        if requested and self.headers.get("If-Range") in (None, etag):
+            offset = int(requested.split("=", 1)[1].rstrip("-"))
+            if offset >= len(body):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        part = body[offset:]
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(part)))
+        self.end_headers()
+        if server.cut_after is not None:
+            # Drop the connection mid-transfer, once
+            self.wfile.write(part[:server.cut_after])
+            server.cut_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(part)
+
+
+class ToolFetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.body = ORIGINAL
+        self.server.cut_after = None
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = Path(self.tmp.name)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/tool.jar"
+        # No real backoff between retries
+        patcher = mock.patch.object(tool_fetch.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def spec(self, sha256=None):
+        return ToolSpec("tool", self.url, "tool.jar", sha256)
+
+    def fetcher(self):
+        return ToolFetcher(self.cache, timeout=5, retries=3)
+
+    def test_fresh_download_matches_pinned_digest(self):
+        path = self.fetcher().fetch(self.spec(hashlib.sha256(ORIGINAL).hexdigest()))
+        self.assertEqual(path.read_bytes(), ORIGINAL)
+        self.assertEqual(self.server.requests, [(None, None)])
+
+    def test_pinned_digest_mismatch_is_rejected(self):
+        with self.assertRaises(ChecksumError):
+            self.fetcher().fetch(self.spec("0" * 64))
+        self.assertFalse((self.cache / "tool.jar").exists())
+        self.assertFalse((self.cache / "tool.jar.part").exists())
+
+    def test_interrupted_download_resumes_with_if_range(self):
+        self.server.cut_after = 10000
+        path = self.fetcher().fetch(self.spec(hashlib.sha256(ORIGINAL).hexdigest()))
+        self.assertEqual(path.read_bytes(), ORIGINAL)
+        (first, _), (resumed, validator) = self.server.requests
+        self.assertIsNone(first)
+        self.assertEqual(resumed, "bytes=10000-")
+        self.assertIsNotNone(validator)
+
+    def test_changed_upstream_restarts_instead_of_splicing(self):
+        self.server.cut_after = 10000
+        fetcher = self.fetcher()
+        partial = self.cache / "tool.jar.part"
+        with self.assertRaises(Exception):
+            fetcher._download(self.spec(), partial)
+        self.assertEqual(partial.stat().st_size, 10000)
+
+        self.server.body = CHANGED
+        path = fetcher.fetch(self.spec(hashlib.sha256(CHANGED).hexdigest()))
+        self.assertEqual(path.read_bytes(), CHANGED)
+        self.assertEqual(self.server.requests[-1][0], "bytes=10000-")
+
+    def test_complete_partial_is_not_downloaded_again(self):
+        fetcher = self.fetcher()
+        partial = self.cache / "tool.jar.part"
+        fetcher._download(self.spec(), partial)
+        path = fetcher.fetch(self.spec(hashlib.sha256(ORIGINAL).hexdigest()))
+        self.assertEqual(path.read_bytes(), ORIGINAL)
+        self.assertEqual(self.server.requests[-1][0], f"bytes={len(ORIGINAL)}-")
+
+    def test_unpinned_tool_is_trusted_on_first_use_only(self):
+        self.fetcher().fetch(self.spec())
+        (self.cache / "tool.jar").unlink()
+        self.server.body = CHANGED
+        with self.assertRaises(ChecksumError):
+            self.fetcher().fetch(self.spec())
+
+
+if __name__ == "__main__":
+    unittest.main()
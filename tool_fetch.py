@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Decompiler tool downloader
+Fetches dex2jar, CFR and JADX concurrently into a shared tool cache,
+resuming partial downloads with HTTP Range/If-Range and verifying SHA-256 digests
+"""
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ToolSpec = namedtuple('ToolSpec', 'name url filename sha256')
+
+# Every URL names a fixed release so its digest can be pinned here; run
+# `tool_fetch.py --pins` on a trusted machine to print the values to paste.
+# sha256=None falls back to "trust on first use": the digest of the first
+# complete download is pinned in the cache and later downloads must match.
+TOOLS = {
+    "dex2jar": ToolSpec("dex2jar",
+                        "https://github.com/ThexXTURBOXx/dex2jar/releases/download/v2.0/dex2jar-2.0.zip",
+                        "dex2jar-2.0.zip", None),
+    "cfr": ToolSpec("cfr", "https://github.com/leibnitz27/cfr/releases/download/0.152/cfr-0.152.jar",
+                    "cfr-0.152.jar", None),
+    "jadx": ToolSpec("jadx", "https://github.com/skylot/jadx/releases/download/v1.4.7/jadx-1.4.7.zip",
+                     "jadx-1.4.7.zip", None),
+}
+
+CHUNK_SIZE = 256 * 1024
+MIRROR_ENV = "EXAMINERAI_TOOL_MIRROR"
+
+
+class ChecksumError(Exception):
+    """Raised when a download does not match its pinned digest"""
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "examinerai" / "tools"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ToolFetcher:
+    """Download tools into a cache directory shared by every checkout"""
+
+    def __init__(self, cache_dir=None, mirror=None, timeout=60, retries=3, workers=4):
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.mirror = mirror or os.environ.get(MIRROR_ENV)
+        self.timeout = timeout
+        self.retries = retries
+        self.workers = workers
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._pins_path = self.cache_dir / "pins.json"
+        self._lock = threading.Lock()
+
+    def url_for(self, spec):
+        if self.mirror:
+            return f"{self.mirror.rstrip('/')}/{spec.filename}"
+        return spec.url
+
+    def _pinned(self, spec):
+        if spec.sha256:
+            return spec.sha256
+        try:
+            with open(self._pins_path) as f:
+                return json.load(f).get(spec.filename)
+        except (OSError, ValueError):
+            return None
+
+    def _pin(self, spec, digest):
+        with self._lock:
+            try:
+                with open(self._pins_path) as f:
+                    pins = json.load(f)
+            except (OSError, ValueError):
+                pins = {}
+            pins[spec.filename] = digest
+            with open(self._pins_path, 'w') as f:
+                json.dump(pins, f, indent=2)
+
+    def _verify(self, spec, path):
+        digest = _sha256(path)
+        expected = self._pinned(spec)
+        if expected and digest != expected:
+            raise ChecksumError(f"{spec.filename}: sha256 {digest} != pinned {expected}")
+        if not expected:
+            print(f"  ⚠️  {spec.filename}: no digest shipped, trusting sha256 {digest} from now on")
+            self._pin(spec, digest)
+        return digest
+
+    def _download(self, spec, partial):
+        """Append the missing bytes of spec to partial; returns when complete"""
+        validator_path = partial.with_name(partial.name + ".validator")
+        offset = partial.stat().st_size if partial.exists() else 0
+        validator = None
+        if offset:
+            try:
+                validator = validator_path.read_text().strip()
+            except OSError:
+                pass
+        if offset and not validator:
+            # Without a validator the server cannot tell us the file changed; start over
+            offset = 0
+        request = urllib.request.Request(self.url_for(spec))
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+            # The server answers 200 with the whole file if it changed since the partial
+            request.add_header("If-Range", validator)
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                return  # Range past the end: the partial file is already complete
+            raise
+        with response:
+            # A server that ignores Range (or whose file changed) sends it all again
+            if response.status != 206:
+                offset = 0
+                validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                if validator:
+                    validator_path.write_text(validator)
+                else:
+                    validator_path.unlink(missing_ok=True)
+            expected = response.headers.get("Content-Length")
+            with open(partial, 'ab' if offset else 'wb') as f:
+                shutil.copyfileobj(response, f, CHUNK_SIZE)
+        if expected is not None and partial.stat().st_size < offset + int(expected):
+            raise http.client.IncompleteRead(b'', offset + int(expected) - partial.stat().st_size)
+
+    def fetch(self, spec):
+        """Return the verified cached path of spec, downloading it if needed"""
+        final = self.cache_dir / spec.filename
+        if final.exists():
+            try:
+                self._verify(spec, final)
+                return final
+            except ChecksumError:
+                final.unlink()
+
+        partial = final.with_name(final.name + ".part")
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._download(spec, partial)
+                break
+            except (urllib.error.URLError, http.client.HTTPException, OSError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+
+        partial.with_name(partial.name + ".validator").unlink(missing_ok=True)
+        try:
+            self._verify(spec, partial)
+        except ChecksumError:
+            partial.unlink()
+            raise
+        os.replace(partial, final)
+        return final
+
+    def fetch_all(self, names):
+        """Fetch several tools concurrently; returns {name: path or None}"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, TOOLS[name]): name for name in names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                    print(f"  ✓ {name}: {results[name]}")
+                except Exception as e:
+                    results[name] = None
+                    print(f"  ✗ {name}: {e}")
+        return results
+
+
+def install(cached_path, target):
+    """Expose a cached tool at target (hard link when possible)"""
+    target = Path(target)
+    if target.exists():
+        return target
+    try:
+        os.link(cached_path, target)
+    except OSError:
+        shutil.copy2(cached_path, target)
+    return target
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    show_pins = "--pins" in argv
+    argv = [arg for arg in argv if arg != "--pins"]
+    names = argv or list(TOOLS)
+    unknown = [n for n in names if n not in TOOLS]
+    if unknown:
+        print(f"❌ Unknown tools: {', '.join(unknown)} (known: {', '.join(TOOLS)})")
+        return 1
+    fetcher = ToolFetcher()
+    print(f"📥 Fetching {', '.join(names)} into {fetcher.cache_dir}")
+    results = fetcher.fetch_all(names)
+    if show_pins:
+        # Digests of what was just downloaded, for the sha256 fields of TOOLS
+        for name, path in results.items():
+            if path:
+                print(f'  {name}: "{_sha256(path)}"')
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())